@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core_engine import vectrx_api_handler
+
+# ==========================================
+# API-SERVICE: JSON rein, JSON raus (asyncio + Micro-Batching)
+# ==========================================
+MAX_BODY_BYTES = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def run_batch(payloads):
+    """Läuft im Worker-Prozess: ein Engine-Aufruf pro Payload, Fehler pro Request."""
+    results = []
+    for payload in payloads:
+        try:
+            results.append(vectrx_api_handler(payload))
+        except Exception as exc:
+            results.append({"status": "error", "message": f"{type(exc).__name__}: {exc}"})
+    return results
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"{type(obj).__name__} ist nicht JSON-serialisierbar")
+
+
+def _json_safe(obj):
+    """NaN/inf (z.B. nicht erreichbare Prognosen) -> None, damit die Antwort gültiges JSON bleibt."""
+    if isinstance(obj, dict):
+        return {k: _json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _json_safe(obj.tolist())
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if math.isfinite(obj) else None
+    return obj
+
+
+class LatencyStats:
+    """Gleitendes Fenster der letzten Latenzen (ms) für p50/p99."""
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, ms, error=False):
+        self.samples.append(ms)
+        self.requests += 1
+        self.errors += int(error)
+
+    def snapshot(self):
+        lat = np.array(self.samples) if self.samples else np.zeros(1)
+        sizes = np.array(self.batch_sizes) if self.batch_sizes else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {"p50": round(float(np.percentile(lat, 50)), 3),
+                           "p99": round(float(np.percentile(lat, 99)), 3),
+                           "max": round(float(lat.max()), 3)},
+            "batches": len(self.batch_sizes),
+            "batch_size_mean": round(float(sizes.mean()), 2),
+        }
+
+
+class MicroBatcher:
+    """
+    Sammelt gleichzeitige Requests innerhalb von window_ms (max. max_batch) und
+    verteilt sie in etwa `workers` Teil-Batches parallel auf den Worker-Pool: das
+    Batching spart IPC, blockiert aber keine freien Worker. Jeder Teil-Batch wird
+    beantwortet, sobald er fertig ist; der Event-Loop blockiert nie.
+    """
+
+    def __init__(self, executor, stats, window_ms=5.0, max_batch=64, workers=1):
+        self.executor = executor
+        self.stats = stats
+        self.workers = max(1, workers)
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self._task = None
+        self._inflight = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, payload):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((payload, fut))
+        return await fut
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Nicht auf den Batch warten: der nächste kann schon sammeln
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        self.stats.batch_sizes.append(len(batch))
+        size = -(-len(batch) // self.workers)
+        await asyncio.gather(*(self._run_chunk(batch[i:i + size]) for i in range(0, len(batch), size)))
+
+    async def _run_chunk(self, chunk):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, run_batch, [p for p, _ in chunk])
+        except Exception as exc:
+            results = [{"status": "error", "message": f"{type(exc).__name__}: {exc}"}] * len(chunk)
+        for (_, fut), res in zip(chunk, results):
+            if not fut.done():
+                fut.set_result(res)
+
+
+class ApiServer:
+    """Minimaler HTTP/1.1-Server: POST /analyze, GET /metrics, GET /health."""
+
+    def __init__(self, host="0.0.0.0", port=8080, workers=None, window_ms=5.0, max_batch=64, executor=None):
+        self.host, self.port = host, port
+        workers = workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(self.executor, self.stats, window_ms, max_batch, workers)
+        self.server = None
+
+    async def start(self):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self.batcher.stop()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, version = lines[0].split(" ", 2)
+                headers = {k.strip().lower(): v.strip() for k, v in
+                           (line.split(":", 1) for line in lines[1:] if ":" in line)}
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"status": "error", "message": "Payload zu groß."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                code, result = await self._route(method, path.split("?", 1)[0], body)
+                await self._respond(writer, code, result, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        except ValueError:
+            await self._respond(writer, 400, {"status": "error", "message": "Ungültiger HTTP-Request."}, False)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.stats.snapshot()
+        if path != "/analyze":
+            return 404, {"status": "error", "message": "Unbekannter Pfad."}
+        if method != "POST":
+            return 405, {"status": "error", "message": "Nur POST erlaubt."}
+
+        t0 = time.perf_counter()
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError("Payload muss ein JSON-Objekt sein.")
+        except ValueError as exc:
+            self.stats.record((time.perf_counter() - t0) * 1000, error=True)
+            return 400, {"status": "error", "message": str(exc)}
+        result = await self.batcher.submit(payload)
+        self.stats.record((time.perf_counter() - t0) * 1000, error=result.get("status") == "error")
+        return 200, result
+
+    async def _respond(self, writer, code, result, keep_alive):
+        body = json.dumps(_json_safe(result), default=_json_default, allow_nan=False).encode()
+        head = (f"HTTP/1.1 {code} {REASONS.get(code, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VECTR-X HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Worker-Prozesse (Default: alle Kerne)")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Sammelfenster für Micro-Batches")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    server = ApiServer(args.host, args.port, args.workers, args.window_ms, args.max_batch)
+    print(f"VECTR-X API auf http://{args.host}:{args.port} (POST /analyze, GET /metrics)")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -1,22 +1,53 @@
 
+import time
+T_START = time.perf_counter()  # Skriptstart für die Time-to-first-Paint-Messung
+
 import streamlit as st
-from core_engine import calculate_metrics
-import matplotlib.pyplot as plt
+from threshold_engine import threshold_methods
+from chart_render import ChartCache, render_lactate_chart, lactate_chart_spec
+from compute_pool import ComputePool, PoolFull
+from athlete_store import AthleteStore
+from view_report import fmt_pace, fmt_time, zone_rows, forecast_rows
+import share_link
+import view_report
+import engine_profiling as profiling
 import numpy as np
 import urllib.parse
-import matplotlib
-
-# --- STABILISIERUNG ---
-matplotlib.use('Agg')
 
 # --- CONFIG ---
 st.set_page_config(page_title="VECTR-X // CYBER-LAB", layout="wide")
 
 # --- URL PARAMETER CHECK ---
 params = st.query_params
-is_athlete = "w" in params
 is_view_mode = params.get("mode", "edit") == "view"
 
+# --- SHARE-LINK (kompaktes Binärformat im Parameter "d") ---
+share = None
+if "d" in params:
+    try:
+        share = share_link.decode(params["d"])
+    except ValueError as exc:
+        st.error(str(exc))
+is_athlete = "w" in params or share is not None
+
+# --- COMPUTE-POOL (ein Pool pro Prozess, geteilt von allen Sessions) ---
+@st.cache_resource
+def get_pool():
+    return ComputePool.from_env()
+
+def pooled(call, *args, **kwargs):
+    """Rechnet über den geteilten Pool; bei Überlast oder Timeout Hinweis statt hängender Session."""
+    try:
+        return call(*args, **kwargs)
+    except (TimeoutError, PoolFull) as exc:
+        st.error(f"{exc} Bitte neu laden. / Please reload.")
+        st.stop()
+
+# --- VIEW-PFAD: geteilte Reports ohne Editor, CSS-Block und Matplotlib ---
+if is_view_mode or is_athlete:
+    view_report.render(st, params, share, T_START, compute=lambda *a, **kw: pooled(get_pool().metrics, *a, **kw))
+    st.stop()
+
 # --- NEU: ATHLETEN-ANTENNE (GLOBAL) ---
 # Diese Variablen holen sich die Daten direkt aus der URL, sobald die App startet
 f_name = params.get("fn", "")
@@ -26,20 +57,15 @@ sport = params.get("sp", "")
 gender = params.get("g", "")
 full_n = f"{f_name} {l_name}".strip()
 
+# --- ATHLETEN-ARCHIV (eine SQLite-Verbindung pro Prozess) ---
+@st.cache_resource
+def get_store():
+    return AthleteStore()
+
 # --- SPRACH-ENGINE ---
 if 'lang' not in st.session_state: st.session_state.lang = 'GER'
 def t(german, english): return german if st.session_state.lang == 'GER' else english
 
-# --- HELPER ---
-def fmt_pace(s):
-    if s <= 0.1: return "-:--"
-    sec = 3600 / s
-    return f"{int(sec//60)}:{int(sec%60):02d}"
-
-def fmt_time(seconds):
-    h, m, s = int(seconds // 3600), int((seconds % 3600) // 60), int(seconds % 60)
-    return f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
-
     # VECTR-X "HARD TRUTH" BENCHMARKS
 def get_benchmark_html(val, metric_type, color_hex):
     if metric_type == "vo2max": 
@@ -64,15 +90,7 @@ def get_benchmark_html(val, metric_type, color_hex):
         html_out += f"<div style='font-size:11px; {style}'>{label} <span style='font-size:9px; opacity:0.7;'>({range_txt})</span> {icon}</div>"
     return html_out + "</div>"
 
-# --- CSS (ORIGINAL V8 + FIX + VIEW MODE) ---
-hide_sidebar_style = ""
-if is_view_mode:
-    hide_sidebar_style = """
-        [data-testid="stSidebar"] {display: none;}
-        [data-testid="stSidebarNav"] {display: none;}
-        .st-emotion-cache-16ids99 {display: none;}
-    """
-
+# --- CSS (ORIGINAL V8 + FIX) ---
 st.markdown(f"""
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700&family=Inter:wght@400;700&display=swap');
@@ -81,7 +99,6 @@ st.markdown(f"""
     
     /* BRANDING HEADLINES */
     h1, h2, h3 {{ font-family: 'Orbitron', sans-serif; letter-spacing: 2px; color: #00F2FF; }}
-    {hide_sidebar_style}
     
     /* ANIMATIONS (Unverändert) */
     @keyframes pulse-green {{ 0% {{ color: #39FF14; text-shadow: 0 0 5px #39FF14; }} 50% {{ text-shadow: 0 0 25px #39FF14; color: #39FF14; }} 100% {{ color: #39FF14; text-shadow: 0 0 5px #39FF14; }} }}
@@ -151,6 +168,9 @@ weight, height, sw = w_def, h_def, s_def
 level_def = get_val("lvl", "Ambitioniert")
 level_select = level_def
 
+# Chart-Modus: STATIC (gecachtes PNG) oder INTERACTIVE (Vega-Lite, Zoom im Browser)
+chart_mode = "INTERACTIVE" if str(get_val("chart", "")).lower() == "interactive" else "STATIC"
+
 # All-Out & vMax Initialisierung
 ao_raw = get_val("ao", "true")
 is_all_out = True if str(ao_raw).lower() == "true" else False
@@ -174,6 +194,7 @@ hr_def = [float(x) for x in str(hr_raw).split(",")]
 v_max = v_def[-1]
 
 # --- SIDEBAR LOGIK ---
+# (Athleten-/View-Links enden oben im View-Pfad, hier läuft nur der Editor)
 if not is_athlete and not is_view_mode:
     with st.sidebar:
         st.markdown(f"## // VECTR-X LAB")
@@ -195,6 +216,7 @@ if not is_athlete and not is_view_mode:
         full_n = f"{f_name} {l_name}".strip()
         st.write("---")
         st.session_state.lang = st.radio("LANGUAGE", ["GER", "ENG"], horizontal=True)
+        chart_mode = st.radio("CHART", ["STATIC", "INTERACTIVE"], horizontal=True, index=0 if chart_mode == "STATIC" else 1)
         st.write("---")
         
         # --- NEU: PERFORMANCE SETUP (VLaMax & Flush Rate Steuerung) ---
@@ -253,57 +275,66 @@ if not is_athlete and not is_view_mode:
         
         # --- WICHTIG: ÜBERGABE AN DIE NEUE ENGINE ---
         # Wir übergeben jetzt v_max und is_all_out an die calculate_metrics Funktion
-        metrics_t1 = calculate_metrics(np.array(v1), np.array(l1), np.array(h1), v_max, is_all_out=is_all_out)
+        metrics_t1 = pooled(get_pool().metrics, np.array(v1), np.array(l1), np.array(h1), v_max, is_all_out=is_all_out, weight_kg=weight, height_cm=height, shoulder_width_cm=sw)
         
         metrics_t2 = None
+        store = get_store()
+        athlete = store.find_athlete(f_name, l_name, bday)
         if compare_mode:
-            v2, l2, h2 = input_block(t("ARCHIV_DATEN", "ARCHIVE_DATA"), "t2", v_def, [x+0.5 for x in l_def], [x+5 for x in hr_def])
-            metrics_t2 = calculate_metrics(np.array(v2), np.array(l2), np.array(h2), v_max, is_all_out=is_all_out)
+            # Referenz aus dem Archiv (letzte Tests des Athleten), sonst manuelle Eingabe
+            ref_tests = store.last_tests(athlete["id"], n=10) if athlete else []
+            if ref_tests:
+                ref_idx = st.selectbox(t("ARCHIV-TEST", "ARCHIVE TEST"), range(len(ref_tests)),
+                                       format_func=lambda i: f"{ref_tests[i]['test_date']} | LT2 {ref_tests[i]['lt2']:.2f}")
+                ref = ref_tests[ref_idx]
+                v2, l2, h2 = input_block(t("ARCHIV_DATEN", "ARCHIVE_DATA"), f"t2_{ref['id']}", ref["speeds"], ref["lactates"], ref["heart_rates"])
+                # Referenz mit ihren eigenen Testbedingungen rechnen (fehlende Werte: aktuelle Eingabe)
+                ref_kw = {"v_max": ref["v_max"] if ref["v_max"] is not None else v_max, "is_all_out": ref["is_all_out"],
+                          "weight_kg": ref["weight_kg"] or weight, "height_cm": ref["height_cm"] or height,
+                          "shoulder_width_cm": ref["shoulder_width_cm"] or sw}
+            else:
+                st.caption(t("Kein Archiv-Test gespeichert – manuelle Eingabe.", "No archived test – manual input."))
+                v2, l2, h2 = input_block(t("ARCHIV_DATEN", "ARCHIVE_DATA"), "t2", v_def, [x+0.5 for x in l_def], [x+5 for x in hr_def])
+                ref_kw = {"v_max": v_max, "is_all_out": is_all_out, "weight_kg": weight, "height_cm": height, "shoulder_width_cm": sw}
+            metrics_t2 = pooled(get_pool().metrics, np.array(v2), np.array(l2), np.array(h2), ref_kw["v_max"], is_all_out=ref_kw["is_all_out"],
+                                weight_kg=ref_kw["weight_kg"], height_cm=ref_kw["height_cm"], shoulder_width_cm=ref_kw["shoulder_width_cm"])
+
+        # --- TEST ARCHIVIEREN ---
+        st.write("---")
+        c_a1, c_a2 = st.columns(2)
+        test_date = c_a1.date_input(t("TESTDATUM", "TEST DATE"))
+        squad = c_a2.text_input(t("GRUPPE", "SQUAD"), value=(athlete or {}).get("squad") or "")
+        if st.button(t("TEST ARCHIVIEREN", "ARCHIVE TEST"), disabled=metrics_t1 is None):
+            athlete_id = store.upsert_athlete(f_name, l_name, bday, sport=sport, gender=gender, squad=squad or None)
+            store.save_test(athlete_id, v1, l1, h1, metrics_t1, test_date=test_date, weight_kg=weight, height_cm=height,
+                            shoulder_width_cm=sw, v_max=v_max, is_all_out=is_all_out)
+            st.success(t("Test gespeichert.", "Test saved."))
 
        # --- SHARE BUTTON LOGIK ---
         st.write("---")
-        share_query = urllib.parse.urlencode({
-            'fn': f_name,
-            'ln': l_name,
-            'bd': bday,
-            'sp': sport,
-            'g': gender,
-            'w': weight, 'h': height, 's': sw, 
-            'v': ",".join(map(str,v1)), 
-            'l': ",".join(map(str,l1)), 
-            'hr': ",".join(map(str,h1)), 
-            'mode': 'view'
-        })
+        # Kompakter Token (quantisierte Arrays + Ergebnis-Digest) statt Klartext-Listen
+        share_token = share_link.encode(v1, l1, h1, weight, height, sw, v_max=v_max, is_all_out=is_all_out,
+                                        first_name=f_name, last_name=l_name, birthday=bday, sport=sport,
+                                        gender=gender, metrics=metrics_t1)
+        share_query = urllib.parse.urlencode({'d': share_token, 'mode': 'view'})
         
         full_url = "https://vectr-x-system-4udwk2bg799tpknjor4hmb.streamlit.app/?" + share_query
         mail_link = f"mailto:?subject=VECTR-X%20Lab%20Report&body=Hi!%20Hier%20sind%20deine%20Performance-Daten:%0D%0A%0D%0A{urllib.parse.quote(full_url)}"
         st.markdown(f'<a href="{mail_link}" class="share-btn">✉ SEND TO ATHLETE</a>', unsafe_allow_html=True)
 
-else:
-    # --- ATHLETEN ANSICHT (EMPFÄNGER-LOGIK) ---
-    # Hier liest das Handy die Namen und Daten aus der URL
-    f_name = params.get("fn", "")
-    l_name = params.get("ln", "")
-    full_n = f"{f_name} {l_name}".strip()
-    bday = params.get("bd", "")
-    sport = params.get("sp", "")
-    gender = params.get("g", "")
-    
-    # Die biometrischen Daten und Session-Daten nutzen (wurden oben initialisiert)
-    weight, height, sw = w_def, h_def, s_def
-    v1, l1, h1 = v_def, l_def, hr_def
-    
-    # Sicherstellen, dass die Engine die richtigen Parameter bekommt:
-    # 1. Wir nutzen den Namen aus dem Import: calculate_metrics
-    # 2. Wir übergeben v_max und is_all_out statt height/weight
-    metrics_t1 = calculate_metrics(
-        v1, 
-        l1, 
-        h1, 
-        v_max=v_max, 
-        is_all_out=is_all_out
-    )
-    metrics_t2 = None
+        # --- DEBUG-PANEL (?debug=profile): Latenz je Engine-Stufe in diesem Prozess ---
+        # Nur wenn der Betreiber die Messung per VECTRX_PROFILE=1 eingeschaltet hat; der
+        # URL-Parameter allein schaltet nichts ein und zeigt keine Pool-/Cache-Zahlen.
+        if get_val("debug", "") == "profile" and profiling.is_enabled():
+            with st.expander("DEBUG // PROFILING"):
+                snap = profiling.snapshot()
+                st.dataframe([{"stage": k, **v} for k, v in snap["stages"].items()], hide_index=True)
+                st.json(snap["counters"])
+                st.caption("COMPUTE POOL")
+                st.json(get_pool().stats())
+                if st.button("RESET"):
+                    profiling.reset()
+
 # --- APP RENDERER ---
 if metrics_t1:
     full_n = f"{f_name} {l_name}".strip()
@@ -353,53 +384,32 @@ if metrics_t1:
                 st.markdown(f"""<div class="metric-wrapper"><span style='color:#8E8E93; font-size:13px; font-weight:600;'>{lab}</span><div class='{glow_class}' style='font-size:32px; font-weight:700;'>{v_disp} <span style='font-size:14px;'>{unit}</span></div>{pace_html}{hf_html}{delta_html}</div>""", unsafe_allow_html=True)
 
         st.divider()
-        fig, ax = plt.subplots(figsize=(10, 4.2), facecolor='#0A0A0B')
-        ax.set_facecolor('#0A0A0B')
-        ax.set_xlabel("SPEED (KM/H)", color='#E0E0E0', fontsize=9, fontweight='bold', labelpad=8)
-        ax.set_ylabel("LACTATE (MMOL)", color='#FFCC00', fontsize=9, fontweight='bold', labelpad=8)
-        ax.tick_params(axis='x', colors='#E0E0E0', labelsize=9)
-        ax.tick_params(axis='y', colors='#FFCC00', labelsize=9)
-        for spine in ax.spines.values(): spine.set_color('#2C2C2E')
-
-        if metrics_t2: ax.plot(metrics_t2["v_fine"], metrics_t2["l_fine"], '--', color='#6E3CBC', lw=1.5, alpha=0.5, label=t('ARCHIV', 'ARCHIVE'))
-        ax.plot(metrics_t1["v_fine"], metrics_t1["l_fine"], '-', color='#FFCC00', lw=2.5, label=t('LIVE', 'LIVE'))
-        ax.scatter(metrics_t1["v_orig"], metrics_t1["l_orig"], color='#FF00FF', s=40, edgecolors='white', zorder=6)
-        
-        ax2 = ax.twinx()
-        ax2.plot(metrics_t1["v_fine"], metrics_t1["h_fine"], ':', color='#FF3131', alpha=0.6, lw=1.5, label="HF")
-        ax2.set_ylabel("HF (BPM)", color='#FF3131', fontsize=9, fontweight='bold', rotation=270, labelpad=15)
-        ax2.tick_params(axis='y', colors='#FF3131', labelsize=9)
-        ax2.spines['right'].set_color('#2C2C2E')
-
-        ax.grid(True, color='#1C1C1E', lw=0.5)
-        ax.legend(loc='upper left', frameon=False, labelcolor='#E0E0E0', fontsize=9)
-        st.pyplot(fig)
-        plt.close(fig)
+        live_label, archive_label = t('LIVE', 'LIVE'), t('ARCHIV', 'ARCHIVE')
+        if chart_mode == "INTERACTIVE":
+            st.vega_lite_chart(spec=lactate_chart_spec(metrics_t1, metrics_t2, live_label, archive_label), theme=None, width="stretch")
+        else:
+            chart_key = ("chart", ChartCache.key(metrics_t1, metrics_t2, (live_label, archive_label), "png"))
+            st.image(pooled(get_pool().run, chart_key, render_lactate_chart, metrics_t1, metrics_t2, live_label, archive_label), width="stretch")
         
         m_type = metrics_t1['vlamax_label']
         res_class = "res-ultra" if metrics_t1['vlamax_val'] < 0.45 else "res-stable" if metrics_t1['vlamax_val'] < 0.75 else "res-critical"
         st.markdown(f'<div class="stability-box {res_class}">// {t("METABOLIC PROFILE", "METABOLIC PROFILE")} // <br><span style="font-size:18px; font-weight:700;">{m_type}</span><br><span style="font-size:12px; opacity:0.8;">FLUSH RATE™: {int(metrics_t1["stab"])}%</span></div>', unsafe_allow_html=True)
 
+        # --- METHODENVERGLEICH: alle Schwellen-Definitionen aus demselben Fit ---
+        with st.expander(t("SCHWELLEN // METHODENVERGLEICH", "THRESHOLDS // METHOD COMPARISON")):
+            methods = threshold_methods(np.array(v1), np.array(l1), np.array(h1)) or {}
+            st.dataframe([{t("METHODE", "METHOD"): name.upper(),
+                           "KM/H": r["speed_kmh"], "PACE": fmt_pace(r["speed_kmh"]) if r["speed_kmh"] else "-:--",
+                           "BPM": r["heart_rate"]} for name, r in methods.items()], hide_index=True)
+
     with tabs[1]: # ZONEN
         st.markdown(f"### // {t('ZONEN', 'ZONES')}")
-        l1, l2, fmax = metrics_t1["lt1"], metrics_t1["lt2"], metrics_t1["fatmax"]
-        hf1, hf2, hf_f = metrics_t1["hf_lt1"], metrics_t1["hf_lt2"], metrics_t1["hf_fatmax"]
-        z_data = [
-            ("blue-neon", t("RECOVERY", "RECOVERY"), f"< {fmax*0.9:.1f}", "KM/H", f"< {hf_f-10}"),
-            ("green-neon", t("LONG RUN", "LONG RUN"), f"{fmax*0.9:.1f}-{l1:.1f}", "KM/H", f"{hf_f-10}-{hf1}"),
-            ("yellow-neon", t("TEMPO", "TEMPO"), f"{l1:.1f}-{l2*0.95:.1f}", "KM/H", f"{hf1}-{int(hf2*0.95)}"),
-            ("orange-neon", t("SCHWELLE", "THRESHOLD"), f"{l2*0.95:.1f}-{l2*1.05:.1f}", "KM/H", f"{int(hf2*0.95)}-{int(hf2*1.03)}"),
-            ("red-neon", t("HIT", "HIT"), f"> {l2*1.05:.1f}", "KM/H", f"> {int(hf2*1.03)}")
-        ]
-        for cls, n, sp, unit, hf_r in z_data:
+        for cls, n, sp, unit, hf_r in zone_rows(metrics_t1, t):
             st.markdown(f"""<div class="set-card {cls}" style="padding: 12px; min-height: 70px; margin-bottom: 10px;"><div style="display: flex; justify-content: space-between; align-items: flex-start;"><div style="flex: 1;"><span class="card-title" style="font-size: 11px; margin-bottom: 4px;">{n}</span><div style="display: flex; align-items: baseline; gap: 4px;"><span style="font-size: 24px; font-weight: 700; color: white; font-family: monospace;">{sp}</span><span style="font-size: 12px; color: #8E8E93; font-weight: 600;">{unit}</span></div></div><div style="text-align: right; min-width: 80px;"><span style="font-size: 9px; font-weight: 800; color: #FF3131; text-transform: uppercase;">Ziel HF</span><span style="font-size: 20px; font-weight: 700; color: #FF3131; font-family: monospace; display: block; line-height: 1;">{hf_r}</span><span style="font-size: 9px; font-weight: 700; color: #FF3131; opacity: 0.8;">BPM</span></div></div></div>""", unsafe_allow_html=True)
 
     with tabs[2]: # PROGNOSE
         st.markdown(f"### // {t('PROGNOSE', 'PREDICTION')}")
-        f_d, f_cs, f_dr = (500, 1.02, 0.02) if level_select=="Elite" else (350, 1.0, 0.04) if level_select=="Ambitioniert" else (150, 0.96, 0.08)
-        for dist, name in [(5000, "5K SPRINT"), (10000, "10K POWER"), (21097, t("HALBMARATHON", "HALF MARATHON")), (42195, t("MARATHON", "FULL MARATHON"))]:
-            v_eff = metrics_t1["lt2"] * f_cs / 3.6
-            t_s = (dist-f_d)/v_eff if dist<=10000 else dist/(v_eff*(1-(f_dr*(dist/v_eff/3600/2))))
+        for name, t_s, dist in forecast_rows(metrics_t1["lt2"], level_select, t):
             st.markdown(f'<div class="set-card blue-neon" style="min-height: auto;"><span class="card-title" style="margin-bottom: 12px;">{name}</span><div style="display: flex; align-items: baseline;"><span class="card-val-big" style="color:#00F2FF;">{fmt_time(t_s)}</span><span class="uni-pace" style="padding-left: 15px;">{fmt_pace((dist/t_s)*3.6)} /KM</span></div></div>', unsafe_allow_html=True)
 
     with tabs[3]: # SET CARD
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+
+# ==========================================
+# ATHLETEN-ARCHIV: Tests + vorberechnete Engine-Ergebnisse (SQLite)
+# ==========================================
+DEFAULT_DB = os.environ.get("VECTRX_DB", "vectrx_athletes.db")
+
+# Skalare Ergebnisse aus calculate_metrics, die pro Test gespeichert werden
+METRIC_COLS = ("fatmax", "lt1", "lt2", "hf_fatmax", "hf_lt1", "hf_lt2",
+               "vlamax_val", "vlamax_label", "stab", "vo2max")
+STAGE_COLS = ("speeds", "lactates", "heart_rates")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS athletes (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    birthday TEXT NOT NULL DEFAULT '',
+    sport TEXT,
+    gender TEXT,
+    squad TEXT,
+    UNIQUE (first_name, last_name, birthday)
+);
+CREATE INDEX IF NOT EXISTS idx_athletes_squad ON athletes (squad);
+
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    athlete_id INTEGER NOT NULL REFERENCES athletes (id) ON DELETE CASCADE,
+    test_date TEXT NOT NULL,
+    protocol TEXT NOT NULL DEFAULT 'run',
+    weight_kg REAL, height_cm REAL, shoulder_width_cm REAL,
+    v_max REAL, is_all_out INTEGER,
+    speeds BLOB, lactates BLOB, heart_rates BLOB,
+    fatmax REAL, lt1 REAL, lt2 REAL,
+    hf_fatmax INTEGER, hf_lt1 INTEGER, hf_lt2 INTEGER,
+    vlamax_val REAL, vlamax_label TEXT, stab REAL, vo2max REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tests_athlete_date ON tests (athlete_id, test_date);
+"""
+
+
+class AthleteStore:
+    """
+    Lokales Archiv für Athleten und Tests. Stufen liegen als float64-Blobs vor,
+    die Engine-Ergebnisse als eigene Spalten: "letzte N Tests" und Trends sind
+    Index-Lookups über (athlete_id, test_date), ohne neu zu rechnen.
+    Eine Verbindung, per Lock serialisiert (für st.cache_resource geeignet).
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        with self._con:
+            if path != ":memory:":
+                self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA foreign_keys=ON")
+            self._con.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- ATHLETEN ---
+    def upsert_athlete(self, first_name, last_name, birthday="", sport=None, gender=None, squad=None):
+        """Legt den Athleten an (Name + Geburtstag eindeutig) oder aktualisiert Stammdaten. Gibt die ID zurück."""
+        with self._lock, self._con:
+            self._con.execute(
+                "INSERT INTO athletes (first_name, last_name, birthday, sport, gender, squad) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (first_name, last_name, birthday) DO UPDATE SET "
+                "sport = COALESCE(excluded.sport, sport), gender = COALESCE(excluded.gender, gender), "
+                "squad = COALESCE(excluded.squad, squad)",
+                (first_name, last_name, birthday or "", sport, gender, squad))
+            return self._con.execute(
+                "SELECT id FROM athletes WHERE first_name = ? AND last_name = ? AND birthday = ?",
+                (first_name, last_name, birthday or "")).fetchone()[0]
+
+    def find_athlete(self, first_name, last_name, birthday=""):
+        with self._lock:
+            row = self._con.execute(
+                "SELECT * FROM athletes WHERE first_name = ? AND last_name = ? AND birthday = ?",
+                (first_name, last_name, birthday or "")).fetchone()
+        return dict(row) if row else None
+
+    # --- TESTS ---
+    def save_test(self, athlete_id, speeds, lactates, heart_rates, metrics, test_date=None, protocol="run",
+                  weight_kg=None, height_cm=None, shoulder_width_cm=None, v_max=None, is_all_out=True):
+        """Speichert Stufen + Ergebnis-Dict von calculate_metrics. Gibt die Test-ID zurück."""
+        test_date = (test_date or date.today()).isoformat() if not isinstance(test_date, str) else test_date
+        stages = [np.asarray(x, dtype=np.float64).tobytes() for x in (speeds, lactates, heart_rates)]
+        values = [_plain(metrics.get(k)) for k in METRIC_COLS]
+        cols = ("athlete_id", "test_date", "protocol", "weight_kg", "height_cm", "shoulder_width_cm",
+                "v_max", "is_all_out") + STAGE_COLS + METRIC_COLS
+        row = [athlete_id, test_date, protocol, weight_kg, height_cm, shoulder_width_cm,
+               v_max, int(bool(is_all_out))] + stages + values
+        with self._lock, self._con:
+            cur = self._con.execute(
+                f"INSERT INTO tests ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", row)
+            return cur.lastrowid
+
+    def last_tests(self, athlete_id, n=5, before=None):
+        """Die letzten n Tests (neueste zuerst), optional nur vor einem Datum (ISO)."""
+        sql = "SELECT * FROM tests WHERE athlete_id = ?"
+        args = [athlete_id]
+        if before is not None:
+            sql += " AND test_date < ?"
+            args.append(before if isinstance(before, str) else before.isoformat())
+        sql += " ORDER BY test_date DESC, id DESC LIMIT ?"
+        args.append(int(n))
+        with self._lock:
+            rows = self._con.execute(sql, args).fetchall()
+        return [_test_dict(r) for r in rows]
+
+    def trend(self, athlete_id, metrics=("lt2", "vo2max", "vlamax_val")):
+        """Zeitreihe je Kennzahl: {"test_date": [...], "lt2": ndarray, ...} (älteste zuerst)."""
+        cols = _metric_cols(metrics)
+        with self._lock:
+            rows = self._con.execute(
+                f"SELECT test_date, {', '.join(cols)} FROM tests WHERE athlete_id = ? ORDER BY test_date, id",
+                (athlete_id,)).fetchall()
+        return _columns(rows, cols)
+
+    def squad_trend(self, squad, metrics=("lt2", "vo2max", "vlamax_val")):
+        """Wie trend(), aber für alle Athleten einer Gruppe; zusätzliche Spalten athlete_id und name."""
+        cols = _metric_cols(metrics)
+        with self._lock:
+            rows = self._con.execute(
+                f"SELECT t.test_date, t.athlete_id, a.first_name || ' ' || a.last_name AS name, "
+                f"{', '.join('t.' + c for c in cols)} FROM athletes a JOIN tests t ON t.athlete_id = a.id "
+                f"WHERE a.squad = ? ORDER BY t.athlete_id, t.test_date, t.id", (squad,)).fetchall()
+        out = _columns(rows, cols)
+        out["athlete_id"] = np.array([r["athlete_id"] for r in rows], dtype=np.int64)
+        out["name"] = [r["name"] for r in rows]
+        return out
+
+
+def _plain(val):
+    if isinstance(val, np.generic):
+        return val.item()
+    return val
+
+
+def _metric_cols(metrics):
+    unknown = [m for m in metrics if m not in METRIC_COLS or m == "vlamax_label"]
+    if unknown:
+        raise ValueError(f"Unbekannte Kennzahl(en): {', '.join(unknown)}")
+    return list(metrics)
+
+
+def _columns(rows, cols):
+    out = {"test_date": [r["test_date"] for r in rows]}
+    for c in cols:
+        out[c] = np.array([np.nan if r[c] is None else r[c] for r in rows], dtype=np.float64)
+    return out
+
+
+def _test_dict(row):
+    test = dict(row)
+    for col in STAGE_COLS:
+        test[col] = np.frombuffer(test[col], dtype=np.float64) if test[col] is not None else np.array([])
+    test["is_all_out"] = bool(test["is_all_out"])
+    return test
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import scipy
+from scipy.interpolate import UnivariateSpline
+
+import core_engine
+from core_engine import (
+    _generate_output, calculate_metrics, hyrox_protocol_engine, hyrox_protocol_engine_batch,
+    lt2_bootstrap, run_protocol_engine, run_protocol_engine_batch, solve_dmax,
+)
+
+# ==========================================
+# SYNTHETISCHE STUFENTESTS
+# ==========================================
+def synthetic_run_columns(n, seed=42):
+    """
+    Realistische Lauf-Stufentests als Spalten (ragged): 4-12 Stufen, exponentieller
+    Laktat-Verlauf + Messrauschen, HF linear mit Rauschen.
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(4, 13, n)
+    test_ids = np.repeat(np.arange(n), lengths)
+    stage = np.arange(len(test_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    v0, step = rng.uniform(7.0, 11.0, n), rng.uniform(1.0, 2.0, n)
+    speeds = v0[test_ids] + stage * step[test_ids]
+    lactates = np.clip(0.9 + 0.03 * np.exp(0.38 * (speeds - v0[test_ids] + 4.0))
+                       + rng.normal(0, 0.15, len(speeds)), 0.3, None)
+    heart_rates = 95 + 5.0 * speeds + rng.normal(0, 2.0, len(speeds))
+    return {
+        "speeds": speeds.round(1), "lactates": lactates.round(2), "heart_rates": heart_rates.round(),
+        "lengths": lengths, "weight_kg": rng.uniform(50, 95, n).round(1),
+        "height_cm": rng.uniform(160, 200, n).round(), "shoulder_width_cm": rng.uniform(38, 50, n).round(),
+    }
+
+
+def synthetic_hyrox_columns(n, seed=42):
+    """HYROX-Tests: 3 Stufen (N x 3) plus Bike-Watt, Peak- und Flush-Laktat."""
+    rng = np.random.default_rng(seed)
+    speeds = rng.uniform(8.0, 11.0, (n, 1)) + np.arange(3) * rng.uniform(1.0, 2.0, (n, 1))
+    lactates = 1.0 + 0.05 * np.exp(0.35 * (speeds - 4.0)) + rng.normal(0, 0.2, (n, 3))
+    heart_rates = 90 + 5.5 * speeds + rng.normal(0, 2.0, (n, 3))
+    peak = rng.uniform(8, 16, n)
+    return {
+        "speeds": speeds.round(1), "lactates": np.clip(lactates, 0.5, None).round(2), "heart_rates": heart_rates.round(),
+        "weight_kg": rng.uniform(55, 100, n).round(1), "bike_watt_avg": rng.uniform(220, 520, n).round(),
+        "lactate_peak": peak.round(1), "lactate_flush_recovery": (peak * rng.uniform(0.5, 1.1, n)).round(1),
+    }
+
+
+def run_payloads(cols):
+    offsets = np.concatenate(([0], np.cumsum(cols["lengths"])))
+    return [{
+        "protocol": "run",
+        "speeds_kmh": cols["speeds"][a:b].tolist(), "lactates_mmol": cols["lactates"][a:b].tolist(),
+        "heart_rates_bpm": cols["heart_rates"][a:b].tolist(), "weight_kg": float(cols["weight_kg"][i]),
+        "height_cm": float(cols["height_cm"][i]), "shoulder_width_cm": float(cols["shoulder_width_cm"][i]),
+    } for i, (a, b) in enumerate(zip(offsets[:-1], offsets[1:]))]
+
+
+def hyrox_payloads(cols):
+    return [{
+        "protocol": "hyrox",
+        "speeds_kmh": cols["speeds"][i].tolist(), "lactates_mmol": cols["lactates"][i].tolist(),
+        "heart_rates_bpm": cols["heart_rates"][i].tolist(), "weight_kg": float(cols["weight_kg"][i]),
+        "bike_watt_avg": float(cols["bike_watt_avg"][i]), "lactate_peak": float(cols["lactate_peak"][i]),
+        "lactate_flush_recovery": float(cols["lactate_flush_recovery"][i]),
+    } for i in range(len(cols["speeds"]))]
+
+
+# ==========================================
+# BENCHMARK-FÄLLE
+# ==========================================
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_cases(n, seed):
+    """Liefert {name: (max_n_kategorie, callable)} für n Elemente (Daten vorab erzeugt)."""
+    run_cols, hyrox_cols = synthetic_run_columns(n, seed), synthetic_hyrox_columns(n, seed)
+    cases = {
+        "run_protocol_engine_batch": ("spline", lambda: run_protocol_engine_batch(
+            run_cols["speeds"], run_cols["lactates"], run_cols["heart_rates"], run_cols["lengths"],
+            run_cols["weight_kg"], run_cols["height_cm"], run_cols["shoulder_width_cm"])),
+        "hyrox_protocol_engine_batch": ("vector", lambda: hyrox_protocol_engine_batch(
+            hyrox_cols["speeds"], hyrox_cols["lactates"], hyrox_cols["heart_rates"], hyrox_cols["weight_kg"],
+            hyrox_cols["bike_watt_avg"], hyrox_cols["lactate_peak"], hyrox_cols["lactate_flush_recovery"])),
+    }
+    if n <= _LIMITS["loop"]:
+        runs, hyroxs = run_payloads(run_cols), hyrox_payloads(hyrox_cols)
+        app_args = [(np.array(p["speeds_kmh"]), np.array(p["lactates_mmol"]), np.array(p["heart_rates_bpm"]),
+                     p["speeds_kmh"][-1]) for p in runs]
+        outs = [(p["speeds_kmh"][-1] * 0.85, p["heart_rates_bpm"][-1] * 0.9) for p in runs]
+        cases.update({
+            "run_protocol_engine": ("loop", lambda: [run_protocol_engine(p) for p in runs]),
+            "hyrox_protocol_engine": ("loop", lambda: [hyrox_protocol_engine(p) for p in hyroxs]),
+            "calculate_metrics": ("loop", lambda: [calculate_metrics(*a, is_all_out=True) for a in app_args]),
+            "_generate_output": ("loop", lambda: [_generate_output("PURE RUNNER", v, v, int(hr), 55.0) for v, hr in outs]),
+        })
+    return cases
+
+
+_LIMITS = {"loop": 10_000, "spline": 100_000, "vector": 1_000_000}
+
+
+def bench_sizes(sizes, repeat=3, seed=42):
+    """Zeitmessung aller Engine-Pfade über die Batch-Größen (Cache deaktiviert)."""
+    core_engine.configure_cache(maxsize=0)
+    results = []
+    for n in sizes:
+        for name, (kind, fn) in bench_cases(n, seed).items():
+            if n > _LIMITS[kind]:
+                continue
+            secs = _timed(fn, repeat if n <= 10_000 else 1)
+            results.append({"name": name, "n": n, "seconds": round(secs, 6),
+                            "us_per_item": round(secs / n * 1e6, 3), "items_per_s": round(n / secs, 1)})
+            print(f"  {name:<28} n={n:<8} {secs / n * 1e6:10.2f} us/item", file=sys.stderr)
+    return results
+
+
+def bench_single_latency(repeat=200, seed=42):
+    """Latenz eines Einzelaufrufs (Median/p95 in us), ohne und mit Cache-Treffer."""
+    run = run_payloads(synthetic_run_columns(1, seed))[0]
+    hyrox = hyrox_payloads(synthetic_hyrox_columns(1, seed))[0]
+    out = {}
+    for label, maxsize in (("cold", 0), ("cached", 512)):
+        core_engine.configure_cache(maxsize=maxsize)
+        for name, fn in (("run_protocol_engine", lambda: run_protocol_engine(run)),
+                         ("hyrox_protocol_engine", lambda: hyrox_protocol_engine(hyrox))):
+            fn()
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - t0) * 1e6)
+            out[f"{name}[{label}]"] = {"p50_us": round(float(np.percentile(samples, 50)), 2),
+                                       "p95_us": round(float(np.percentile(samples, 95)), 2)}
+    core_engine.configure_cache(maxsize=0)
+    return out
+
+
+def bench_dmax(n=2000, repeat=3, seed=42):
+    """Dmax Grid-Suche vs. analytischer Solver: Laufzeit und Übereinstimmung."""
+    cols = synthetic_run_columns(n, seed)
+    offsets = np.concatenate(([0], np.cumsum(cols["lengths"])))
+    splines = []
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        v, l = cols["speeds"][a:b], cols["lactates"][a:b]
+        splines.append((UnivariateSpline(v, l, s=0.5), v[0], v[-1]))
+
+    def run(solver, precision):
+        out = []
+
+        def solve_all():
+            out[:] = [solve_dmax(spl, lo, hi, solver=solver, precision=precision) for spl, lo, hi in splines]
+
+        secs = _timed(solve_all, repeat)
+        return np.array(out), secs / n * 1e6
+
+    grid, t_grid = run("grid", 2)
+    analytic, t_analytic = run("analytic", 4)
+    lo = np.array([lo for _, lo, _ in splines])
+    hi = np.array([hi for _, _, hi in splines])
+    step = (hi - lo) / 99
+    # Konkave Kurven ohne Punkt unter der Sehne: Dmax undefiniert, beide Solver landen
+    # auf einem Endpunkt (Grid je nach Rundungsrauschen links oder rechts)
+    degenerate = np.isclose(analytic, lo.round(4)) | np.isclose(analytic, hi.round(4))
+    diff = np.abs(grid - analytic)[~degenerate]
+    step = step[~degenerate]
+    return {
+        "tests": n,
+        "degenerate_tests": int(degenerate.sum()),
+        "grid_us_per_call": round(t_grid, 2),
+        "analytic_us_per_call": round(t_analytic, 2),
+        "speedup": round(t_grid / t_analytic, 2),
+        "max_abs_diff_kmh": round(float(diff.max()), 4),
+        "median_abs_diff_kmh": round(float(np.median(diff)), 4),
+        "within_one_grid_step": round(float(np.mean(diff <= step + 0.005)), 4),
+    }
+
+
+def bench_bootstrap(n_boot=5000, tests=20, refits=500, seed=42):
+    """
+    LT2-Konfidenzintervall per Bootstrap: Zeit pro Test (Budget < 200 ms) und Abgleich
+    mit echten Spline-Refits (gleiches Rauschen, refits Stück) für die Intervallgrenzen.
+    """
+    cols = synthetic_run_columns(tests, seed)
+    offsets = np.concatenate(([0], np.cumsum(cols["lengths"])))
+    rng = np.random.default_rng(seed)
+    times, diffs = [], []
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        v, l, h = cols["speeds"][a:b], cols["lactates"][a:b], cols["heart_rates"][a:b]
+        t0 = time.perf_counter()
+        res = lt2_bootstrap(v, l, h, n_boot=n_boot, seed=seed)
+        times.append((time.perf_counter() - t0) * 1000)
+
+        order = np.argsort(v)
+        v, l = v[order], l[order]
+        fitted = UnivariateSpline(v, l, s=0.5)(v)
+        v_fine = np.linspace(v[0], v[-1], 100)
+        ref = [v_fine[core_engine._dmax_index(v_fine, np.clip(UnivariateSpline(v, y, s=0.5)(v_fine), 0.5, None))]
+               for y in fitted + rng.normal(0, res["noise_sd"], (refits, len(v)))]
+        diffs.append(np.abs(np.percentile(ref, [2.5, 97.5]) - res["lt2_ci_kmh"]).max())
+    return {"n_boot": n_boot, "tests": tests,
+            "ms_per_test_p50": round(float(np.percentile(times, 50)), 2),
+            "ms_per_test_max": round(float(np.max(times)), 2),
+            "ci_vs_refit_max_abs_diff_kmh": round(float(np.max(diffs)), 3),
+            "ci_vs_refit_median_abs_diff_kmh": round(float(np.median(diffs)), 3)}
+
+
+# ==========================================
+# BASELINE-VERGLEICH
+# ==========================================
+def compare_to_baseline(report, baseline, tolerance=0.2):
+    """Vergleicht us_per_item je (name, n); Regression = langsamer als baseline * (1 + tolerance)."""
+    base = {(r["name"], r["n"]): r["us_per_item"] for r in baseline.get("sizes", [])}
+    rows = []
+    for r in report["sizes"]:
+        ref = base.get((r["name"], r["n"]))
+        if ref is None or ref <= 0:
+            continue
+        ratio = r["us_per_item"] / ref
+        rows.append({"name": r["name"], "n": r["n"], "baseline_us": ref, "current_us": r["us_per_item"],
+                     "ratio": round(ratio, 3), "regression": ratio > 1.0 + tolerance})
+    return rows
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "scipy": scipy.__version__,
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VECTR-X Engine Benchmark & Regressions-Timing")
+    parser.add_argument("--sizes", default="1,10,100,1000,10000,100000,1000000",
+                        help="Batch-Größen (kommagetrennt)")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (Bestzeit zählt)")
+    parser.add_argument("--max-loop-n", type=int, default=_LIMITS["loop"],
+                        help="Obergrenze für Einzelaufruf-Schleifen")
+    parser.add_argument("--max-spline-n", type=int, default=_LIMITS["spline"],
+                        help="Obergrenze für Spline-Batch (ein Fit pro Test)")
+    parser.add_argument("--dmax-n", type=int, default=2000, help="Tests für den Dmax-Solver-Vergleich")
+    parser.add_argument("--bootstrap-n", type=int, default=5000, help="Replikate für den LT2-Bootstrap")
+    parser.add_argument("--out", default=None, help="JSON-Report schreiben (Default: stdout)")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Gespeicherte Baseline zum Vergleich")
+    parser.add_argument("--save-baseline", action="store_true", help="Report als neue Baseline speichern")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Erlaubte Verlangsamung (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    _LIMITS["loop"], _LIMITS["spline"] = args.max_loop_n, args.max_spline_n
+    sizes = [int(float(x)) for x in args.sizes.split(",")]
+
+    report = {
+        "environment": environment(),
+        "single_call": bench_single_latency(),
+        "sizes": bench_sizes(sizes, args.repeat),
+        "dmax": bench_dmax(args.dmax_n, args.repeat),
+        "bootstrap": bench_bootstrap(args.bootstrap_n),
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as fh:
+            report["baseline_comparison"] = compare_to_baseline(report, json.load(fh), args.tolerance)
+        regressions = [r for r in report["baseline_comparison"] if r["regression"]]
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            fh.write(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['name']} n={r['n']}: {r['baseline_us']} -> {r['current_us']} us/item "
+              f"(x{r['ratio']})", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
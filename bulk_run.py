@@ -0,0 +1,265 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import core_engine
+from core_engine import vectrx_api_handler
+from export_engine import PROTOCOLS, SCHEMA, ResultFrame, hyrox_frame, run_frame
+
+# ==========================================
+# BULK-RUNNER: Archive (CSV/Parquet) neu bewerten
+# ==========================================
+# Stufen-Spalten: in CSV als "10,12,14,16" (wie im Share-Link), in Parquet auch als Liste
+LIST_COLS = ("speeds_kmh", "lactates_mmol", "heart_rates_bpm")
+NUM_COLS = ("weight_kg", "height_cm", "shoulder_width_cm", "v_max_all_out",
+            "bike_watt_avg", "lactate_peak", "lactate_flush_recovery")
+ZONE_COUNT = 5
+RESULT_COLS = (["metabolic_type", "raw_lt2_kmh", "final_pace_kmh", "target_pace_min_km",
+                "lt2_heart_rate", "vo2max_estimate"]
+               + [f"zone{i}_{k}" for i in range(1, ZONE_COUNT + 1) for k in ("pace", "hr")]
+               + ["error"])
+# Engine-Status ohne Ergebnis -> Meldung wie in vectrx_api_handler
+REJECTED = {core_engine.STATUS_TOO_FEW_STAGES: core_engine.MSG_RUN_STAGES,
+            core_engine.STATUS_INVALID_PACES: core_engine.MSG_INVALID_PACES}
+
+
+def _parse_stages(val):
+    if isinstance(val, str):
+        return [float(x) for x in val.split(",") if x.strip()]
+    # Leere Zellen: None/NaN (object/float) bzw. pd.NA (dtype "string")
+    if val is None or val is pd.NA or (isinstance(val, float) and np.isnan(val)):
+        return []
+    return [float(x) for x in val]
+
+
+def _row_payload(row, default_protocol):
+    protocol = row.get("protocol")
+    payload = {"protocol": default_protocol if protocol is None or pd.isna(protocol) else str(protocol)}
+    for col in LIST_COLS:
+        payload[col] = _parse_stages(row.get(col))
+    for col in NUM_COLS:
+        val = row.get(col)
+        if val is not None and not pd.isna(val):
+            payload[col] = float(val)
+    return payload
+
+
+def _init_worker():
+    # Archive enthalten kaum Duplikate: RAM-Cache in den Workern abschalten
+    core_engine.configure_cache(maxsize=0)
+
+
+def score_chunk(chunk, default_protocol="run"):
+    """Bewertet einen DataFrame-Chunk zeilenweise; Fehler landen in der Spalte 'error'."""
+    out = {col: [] for col in RESULT_COLS}
+    for row in chunk.to_dict("records"):
+        try:
+            res = vectrx_api_handler(_row_payload(row, default_protocol))
+            err = res.get("message") if res.get("status") == "error" else None
+        except Exception as exc:
+            res, err = {}, f"{type(exc).__name__}: {exc}"
+        zones = res.get("zones", []) if err is None else []
+        for col in RESULT_COLS[:6]:
+            out[col].append(res.get(col) if err is None else None)
+        for i in range(ZONE_COUNT):
+            zone = zones[i] if i < len(zones) else {}
+            out[f"zone{i + 1}_pace"].append(zone.get("pace"))
+            out[f"zone{i + 1}_hr"].append(zone.get("hr"))
+        out["error"].append(err)
+
+    result = pd.DataFrame({
+        col: pd.Series(vals, index=chunk.index,
+                       dtype="float64" if col in ("raw_lt2_kmh", "final_pace_kmh", "lt2_heart_rate", "vo2max_estimate") else "string")
+        for col, vals in out.items()
+    })
+    return pd.concat([chunk.drop(columns=[c for c in RESULT_COLS if c in chunk.columns]), result], axis=1)
+
+
+def score_chunk_columnar(chunk, default_protocol="run"):
+    """
+    Spaltenweise Variante: Batch-Engines statt Einzelaufrufen, Ergebnis als numerische
+    Spalten (export_engine.SCHEMA) ohne Dict pro Zeile. Zeilen, die keine Engine
+    annimmt (Stufen nicht lesbar oder uneinheitlich, Hyrox ohne 3 Stufen), bekommen
+    status -1 und 'error'; von der Engine abgelehnte Zeilen ihren Status und 'error'.
+    Protokolle und Fehlertexte wie score_chunk: alles außer "run" rechnet als Hyrox.
+    """
+    n = len(chunk)
+    protocol = (chunk["protocol"].fillna(default_protocol).astype(str).to_numpy() if "protocol" in chunk
+                else np.full(n, default_protocol))
+    is_run = protocol == "run"
+    error = np.full(n, None, dtype=object)
+    stages = {col: [[] for _ in range(n)] for col in LIST_COLS}
+    for col in LIST_COLS:
+        if col not in chunk:
+            continue
+        for i, val in enumerate(chunk[col]):
+            try:
+                stages[col][i] = _parse_stages(val)
+            except (TypeError, ValueError) as exc:
+                error[i] = error[i] or f"{type(exc).__name__}: {exc}"
+    lengths = np.array([len(v) for v in stages["speeds_kmh"]], dtype=np.intp)
+    for i in np.flatnonzero([e is None for e in error]):
+        msg = core_engine.stage_error("run" if is_run[i] else "hyrox", stages["speeds_kmh"][i],
+                                      stages["lactates_mmol"][i], stages["heart_rates_bpm"][i])
+        # Zu kurze Läufe rechnet die Batch-Engine mit (STATUS_TOO_FEW_STAGES, gleiche Meldung)
+        if msg is not None and msg != core_engine.MSG_RUN_STAGES:
+            error[i] = msg
+    accepted = np.array([e is None for e in error], dtype=bool)
+
+    def num(col, default):
+        return chunk[col].astype(float).fillna(default).to_numpy() if col in chunk else np.full(n, default)
+
+    def flat(col, rows):
+        return np.array([x for i in rows for x in stages[col][i]], dtype=float)
+
+    cols = {name: np.full(n, np.nan if np.dtype(dtype).kind == "f" else -1, dtype=dtype) for name, dtype in SCHEMA}
+    # Protokoll aus der Eingabe, auch für Zeilen ohne Ergebnis
+    cols["protocol_code"][:] = np.where(is_run, PROTOCOLS.index("run"), PROTOCOLS.index("hyrox"))
+
+    parts = []
+    run = np.flatnonzero(accepted & is_run)
+    if len(run):
+        # vMax wie im Einzel-Modus: ohne Angabe die letzte Stufe
+        last = np.array([stages["speeds_kmh"][i][-1] if lengths[i] else 0.0 for i in run])
+        v_max = np.where(np.isnan(num("v_max_all_out", np.nan)[run]), last, num("v_max_all_out", np.nan)[run])
+        parts.append((run, run_frame(flat("speeds_kmh", run), flat("lactates_mmol", run), flat("heart_rates_bpm", run),
+                                     lengths[run], num("weight_kg", 75.0)[run], num("height_cm", 180.0)[run],
+                                     num("shoulder_width_cm", 45.0)[run], v_max)))
+    hyrox = np.flatnonzero(accepted & ~is_run)
+    if len(hyrox):
+        parts.append((hyrox, hyrox_frame(flat("speeds_kmh", hyrox), flat("lactates_mmol", hyrox),
+                                         flat("heart_rates_bpm", hyrox), num("weight_kg", 0.0)[hyrox],
+                                         num("bike_watt_avg", 0.0)[hyrox], num("lactate_peak", 0.0)[hyrox],
+                                         num("lactate_flush_recovery", 0.0)[hyrox])))
+    for rows, frame in parts:
+        for name in cols:
+            cols[name][rows] = frame[name]
+    # Ohne Ergebnis wie im zeilenweisen Pfad: Meldung statt Typ (NO_ROOT/LINEAR_FIT liefern Werte)
+    for code, message in REJECTED.items():
+        rejected = cols["status"] == code
+        error[rejected] = message
+        cols["metabolic_type_code"][rejected] = -1
+
+    result = ResultFrame(cols).to_pandas()
+    result.index = chunk.index
+    result["error"] = pd.Series(error, index=chunk.index, dtype="string")
+    return pd.concat([chunk.drop(columns=[c for c in result.columns if c in chunk.columns]), result], axis=1)
+
+
+def iter_chunks(path, chunk_size):
+    """Liest das Archiv chunkweise, ohne es komplett in den Speicher zu laden."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet benötigt pyarrow (pip install pyarrow).")
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={c: "string" for c in LIST_COLS})
+
+
+def count_rows(path):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+        except ImportError:
+            return None
+    return None
+
+
+class ChunkWriter:
+    """Hängt Ergebnis-Chunks an eine CSV- oder Parquet-Datei an."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self._writer.schema, safe=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_bulk(input_path, output_path, workers=None, chunk_size=5000, default_protocol="run", progress=True,
+             columnar=False):
+    """
+    Streamt das Archiv chunkweise durch einen ProcessPool. Höchstens 2 Chunks pro
+    Worker sind gleichzeitig unterwegs, die Ausgabe bleibt in Eingabereihenfolge.
+    columnar=True nutzt die Batch-Engines und schreibt numerische Ergebnis-Spalten.
+    """
+    score = score_chunk_columnar if columnar else score_chunk
+    workers = workers or os.cpu_count() or 1
+    total = count_rows(input_path)
+    writer = ChunkWriter(output_path)
+    done = errors = 0
+    t0 = time.perf_counter()
+
+    def report():
+        rate = done / max(time.perf_counter() - t0, 1e-9)
+        pct = f" ({done / total * 100:5.1f}%)" if total else ""
+        print(f"\r{done} Zeilen{pct} | {rate:,.0f} Zeilen/s | {errors} Fehler", end="", file=sys.stderr, flush=True)
+
+    pending = deque()
+
+    def drain(limit):
+        nonlocal done, errors
+        while len(pending) > limit:
+            res = pending.popleft().result()
+            writer.write(res)
+            done += len(res)
+            errors += int(res["error"].notna().sum())
+            if progress: report()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for chunk in iter_chunks(input_path, chunk_size):
+                pending.append(pool.submit(score, chunk, default_protocol))
+                drain(2 * workers - 1)
+            drain(0)
+    finally:
+        writer.close()
+    if progress:
+        print(file=sys.stderr)
+    return {"rows": done, "errors": errors, "seconds": round(time.perf_counter() - t0, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VECTR-X Bulk-Analyse für CSV/Parquet-Testarchive")
+    parser.add_argument("input", help="Eingabe (.csv oder .parquet)")
+    parser.add_argument("output", help="Ausgabe (.csv oder .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Default: alle Kerne)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Zeilen pro Chunk")
+    parser.add_argument("--protocol", default="run", choices=["run", "hyrox"],
+                        help="Protokoll für Zeilen ohne 'protocol'-Spalte")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Batch-Engines, numerische Spalten (Zonen als Grenzen statt Text)")
+    parser.add_argument("--quiet", action="store_true", help="Keine Fortschrittsanzeige")
+    args = parser.parse_args()
+
+    summary = run_bulk(args.input, args.output, args.workers, args.chunk_size, args.protocol, not args.quiet,
+                       args.columnar)
+    print(f"{summary['rows']} Zeilen in {summary['seconds']}s, {summary['errors']} Fehler")
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ==========================================
+# CHART-RENDERING: Laktat/HF-Kurve (gecachte PNGs + Vega-Lite)
+# ==========================================
+BG = '#0A0A0B'
+GRID = '#1C1C1E'
+SPINE = '#2C2C2E'
+TEXT = '#E0E0E0'
+LACTATE = '#FFCC00'
+ARCHIVE = '#6E3CBC'
+POINTS = '#FF00FF'
+HR = '#FF3131'
+
+
+class ChartTemplate:
+    """
+    Einmal gestylte Figure (ax + ax2) mit festen Linien-Objekten. Bei neuen Daten
+    werden nur Linien-Daten und Achsgrenzen aktualisiert, nicht die Achsen neu gebaut.
+    Matplotlib ist nicht thread-sicher, daher serialisiert ein Lock das Rendern.
+    """
+
+    def __init__(self, figsize=(10, 4.2), dpi=200):
+        from matplotlib.figure import Figure
+
+        self.dpi = dpi
+        self.lock = threading.Lock()
+        self.fig = Figure(figsize=figsize, facecolor=BG)
+        ax = self.fig.add_subplot(111)
+        ax.set_facecolor(BG)
+        ax.set_xlabel("SPEED (KM/H)", color=TEXT, fontsize=9, fontweight='bold', labelpad=8)
+        ax.set_ylabel("LACTATE (MMOL)", color=LACTATE, fontsize=9, fontweight='bold', labelpad=8)
+        ax.tick_params(axis='x', colors=TEXT, labelsize=9)
+        ax.tick_params(axis='y', colors=LACTATE, labelsize=9)
+        for spine in ax.spines.values(): spine.set_color(SPINE)
+
+        self.archive_line, = ax.plot([], [], '--', color=ARCHIVE, lw=1.5, alpha=0.5)
+        self.live_line, = ax.plot([], [], '-', color=LACTATE, lw=2.5)
+        self.points = ax.scatter([], [], color=POINTS, s=40, edgecolors='white', zorder=6)
+
+        ax2 = ax.twinx()
+        self.hr_line, = ax2.plot([], [], ':', color=HR, alpha=0.6, lw=1.5, label="HF")
+        ax2.set_ylabel("HF (BPM)", color=HR, fontsize=9, fontweight='bold', rotation=270, labelpad=15)
+        ax2.tick_params(axis='y', colors=HR, labelsize=9)
+        ax2.spines['right'].set_color(SPINE)
+
+        ax.grid(True, color=GRID, lw=0.5)
+        self.ax, self.ax2 = ax, ax2
+
+    def render(self, live, archive=None, live_label="LIVE", archive_label="ARCHIV", fmt="png"):
+        """live/archive: dict mit v_fine, l_fine, h_fine, v_orig, l_orig. Gibt PNG/SVG-Bytes zurück."""
+        with self.lock:
+            self.live_line.set_data(live["v_fine"], live["l_fine"])
+            self.live_line.set_label(live_label)
+            self.points.set_offsets(np.column_stack([live["v_orig"], live["l_orig"]]))
+            self.hr_line.set_data(live["v_fine"], live["h_fine"])
+            if archive is not None:
+                self.archive_line.set_data(archive["v_fine"], archive["l_fine"])
+                self.archive_line.set_label(archive_label)
+            else:
+                self.archive_line.set_data([], [])
+                self.archive_line.set_label("_nolegend_")
+            self.archive_line.set_visible(archive is not None)
+
+            # relim() berücksichtigt nur Linien, die Messpunkte werden nachgetragen
+            self.ax.relim(visible_only=True)
+            self.ax.update_datalim(self.points.get_offsets())
+            self.ax.autoscale_view()
+            self.ax2.relim(visible_only=True)
+            self.ax2.autoscale_view()
+
+            legend = self.ax.get_legend()
+            if legend is not None:
+                legend.remove()
+            self.ax.legend(loc='upper left', frameon=False, labelcolor=TEXT, fontsize=9)
+
+            buf = io.BytesIO()
+            self.fig.savefig(buf, format=fmt, dpi=self.dpi, bbox_inches="tight", facecolor=BG)
+            return buf.getvalue()
+
+
+class ChartCache:
+    """LRU der gerenderten Bilder, Schlüssel = Hash der Kurven-Arrays und Labels."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._template = None
+
+    @staticmethod
+    def key(live, archive, labels, fmt):
+        h = hashlib.sha1(fmt.encode())
+        for curves in (live, archive):
+            if curves is None:
+                h.update(b"-")
+                continue
+            for name in ("v_fine", "l_fine", "h_fine", "v_orig", "l_orig"):
+                h.update(np.ascontiguousarray(curves[name], dtype=float).tobytes())
+        h.update("|".join(labels).encode())
+        return h.hexdigest()
+
+    def render(self, live, archive=None, live_label="LIVE", archive_label="ARCHIV", fmt="png"):
+        key = self.key(live, archive, (live_label, archive_label), fmt)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            if self._template is None:
+                self._template = ChartTemplate()
+        img = self._template.render(live, archive, live_label, archive_label, fmt)
+        with self._lock:
+            self._data[key] = img
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return img
+
+
+_CHART_CACHE = ChartCache()
+
+
+def render_lactate_chart(live, archive=None, live_label="LIVE", archive_label="ARCHIV", fmt="png"):
+    """Gecachtes Bild der Laktat/HF-Kurve (PNG oder SVG als Bytes)."""
+    return _CHART_CACHE.render(live, archive, live_label, archive_label, fmt)
+
+
+def lactate_chart_spec(live, archive=None, live_label="LIVE", archive_label="ARCHIV"):
+    """
+    Vega-Lite-Spec für st.vega_lite_chart: gleiche Kurven, clientseitig gerendert,
+    Zoom/Pan über gebundene Skalen ohne Server-Redraw.
+    """
+    def rows(curves, series):
+        return [{"speed": round(float(v), 3), "lactate": round(float(l), 3), "hr": round(float(h), 1), "series": series}
+                for v, l, h in zip(curves["v_fine"], curves["l_fine"], curves["h_fine"])]
+
+    values = rows(live, live_label) + (rows(archive, archive_label) if archive is not None else [])
+    points = [{"speed": float(v), "lactate": float(l)} for v, l in zip(live["v_orig"], live["l_orig"])]
+    x = {"field": "speed", "type": "quantitative", "title": "SPEED (KM/H)", "scale": {"zero": False}}
+    series_scale = {"domain": [live_label, archive_label], "range": [LACTATE, ARCHIVE]}
+
+    return {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "background": BG,
+        "height": 380,
+        "config": {"axis": {"gridColor": GRID, "domainColor": SPINE, "labelColor": TEXT, "titleColor": TEXT},
+                   "legend": {"labelColor": TEXT, "titleColor": TEXT, "orient": "top-left"},
+                   "view": {"stroke": SPINE}},
+        "layer": [
+            # Laktat-Kurven und Messpunkte teilen sich die linke Achse
+            {"layer": [
+                {"data": {"values": values},
+                 "params": [{"name": "zoom", "select": "interval", "bind": "scales"}],
+                 "mark": {"type": "line", "strokeWidth": 2.5},
+                 "encoding": {"x": x,
+                              "y": {"field": "lactate", "type": "quantitative", "title": "LACTATE (MMOL)",
+                                    "axis": {"titleColor": LACTATE, "labelColor": LACTATE}},
+                              "color": {"field": "series", "type": "nominal", "scale": series_scale, "title": None},
+                              "strokeDash": {"field": "series", "type": "nominal", "legend": None,
+                                             "scale": {"domain": [live_label, archive_label], "range": [[1, 0], [6, 4]]}}}},
+                {"data": {"values": points},
+                 "mark": {"type": "point", "filled": True, "size": 60, "color": POINTS, "stroke": "white"},
+                 "encoding": {"x": x, "y": {"field": "lactate", "type": "quantitative"}}},
+            ]},
+            {"data": {"values": [r for r in values if r["series"] == live_label]},
+             "mark": {"type": "line", "strokeDash": [2, 2], "color": HR, "opacity": 0.6},
+             "encoding": {"x": x,
+                          "y": {"field": "hr", "type": "quantitative", "title": "HF (BPM)", "scale": {"zero": False},
+                                "axis": {"orient": "right", "titleColor": HR, "labelColor": HR}}}},
+        ],
+        "resolve": {"scale": {"y": "independent"}},
+    }
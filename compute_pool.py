@@ -0,0 +1,132 @@
+import concurrent.futures as cf
+import os
+import threading
+import time
+
+import engine_profiling as profiling
+from core_engine import cache_get, calculate_metrics, metrics_cache_key
+from engine_profiling import Histogram
+
+# ==========================================
+# COMPUTE-POOL: geteilte Rechenkapazität für alle App-Sessions eines Prozesses
+# ==========================================
+# Streamlit rechnet jede Session in ihrem eigenen Skript-Thread. Der Pool begrenzt die
+# gleichzeitigen Engine-/Chart-Läufe (max_workers), lehnt bei voller Warteschlange ab
+# (max_queue), führt identische laufende Anfragen zusammen (gleicher Schlüssel = ein
+# Future) und bricht das Warten nach `timeout` Sekunden ab. Die Arbeit selbst läuft
+# dann weiter und landet im Ergebnis-Cache, ein Rerun ist also schnell.
+
+
+class PoolFull(RuntimeError):
+    """Warteschlange voll: Anfrage abgelehnt statt unbegrenzt zu stauen."""
+
+
+class ComputePool:
+    def __init__(self, max_workers=None, max_queue=64, timeout=30.0):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = cf.ThreadPoolExecutor(self.max_workers, thread_name_prefix="vectrx-compute")
+        self._lock = threading.RLock()
+        self._inflight = {}
+        self._queued = 0
+        self._active = 0
+        self._peak_queue = 0
+        self.counters = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0,
+                         "timeouts": 0, "rejected": 0, "cache_hits": 0}
+        self.wait_ms = Histogram()
+        self.run_ms = Histogram()
+
+    @classmethod
+    def from_env(cls):
+        """VECTRX_POOL_WORKERS / VECTRX_POOL_QUEUE / VECTRX_POOL_TIMEOUT (s)."""
+        return cls(max_workers=int(os.environ.get("VECTRX_POOL_WORKERS", 0)) or None,
+                   max_queue=int(os.environ.get("VECTRX_POOL_QUEUE", 64)),
+                   timeout=float(os.environ.get("VECTRX_POOL_TIMEOUT", 30)))
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Future für fn(*args, **kwargs). Läuft bereits eine Anfrage mit demselben
+        Schlüssel, kommt deren Future zurück (key=None: keine Zusammenführung).
+        """
+        with self._lock:
+            fut = self._inflight.get(key) if key is not None else None
+            if fut is not None:
+                self.counters["deduplicated"] += 1
+                profiling.count("pool_deduplicated")
+                return fut
+            if self._queued >= self.max_queue:
+                self.counters["rejected"] += 1
+                profiling.count("pool_rejected")
+                raise PoolFull(f"Compute-Pool ausgelastet ({self._queued} Anfragen in der Warteschlange).")
+            self._queued += 1
+            self._peak_queue = max(self._peak_queue, self._queued)
+            self.counters["submitted"] += 1
+            fut = self._executor.submit(self._run, fn, time.perf_counter(), args, kwargs)
+            if key is not None:
+                self._inflight[key] = fut
+                fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+        return fut
+
+    def run(self, key, fn, *args, timeout=None, **kwargs):
+        """submit() und auf das Ergebnis warten; TimeoutError nach `timeout` (Default: Pool-Timeout)."""
+        fut = self.submit(key, fn, *args, **kwargs)
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return fut.result(limit)
+        except cf.TimeoutError:
+            with self._lock:
+                self.counters["timeouts"] += 1
+            profiling.count("pool_timeouts")
+            raise TimeoutError(f"Berechnung nach {limit:g}s abgebrochen.") from None
+
+    def metrics(self, speeds, lactates, heart_rates, v_max, is_all_out=True, weight_kg=75.0, height_cm=180.0,
+                shoulder_width_cm=45.0, dmax_solver="grid", dmax_precision=2, timeout=None):
+        """calculate_metrics über den Pool; Cache-Treffer direkt ohne Warteschlange."""
+        if len(speeds) < 4:
+            return None
+        args = (speeds, lactates, heart_rates, v_max, is_all_out, weight_kg, height_cm, shoulder_width_cm,
+                dmax_solver, dmax_precision)
+        key = metrics_cache_key(*args)
+        hit, metrics = cache_get(key)
+        if hit:
+            with self._lock:
+                self.counters["cache_hits"] += 1
+            return metrics
+        return self.run(("metrics", key), calculate_metrics, *args, timeout=timeout)
+
+    def _run(self, fn, t_submit, args, kwargs):
+        t_start = time.perf_counter()
+        wait = (t_start - t_submit) * 1000.0
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self.wait_ms.observe(wait)
+        profiling.observe("pool_wait", wait)
+        ok = False
+        try:
+            res = fn(*args, **kwargs)
+            ok = True
+            return res
+        finally:
+            took = (time.perf_counter() - t_start) * 1000.0
+            with self._lock:
+                self._active -= 1
+                self.run_ms.observe(took)
+                self.counters["completed" if ok else "failed"] += 1
+            profiling.observe("pool_run", took)
+
+    def _forget(self, key, fut):
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    def stats(self):
+        """Warteschlange, laufende Jobs, Zähler und Warte-/Laufzeit-Histogramme (ms)."""
+        with self._lock:
+            return {"workers": self.max_workers, "queue_depth": self._queued, "peak_queue_depth": self._peak_queue,
+                    "active": self._active, "in_flight_keys": len(self._inflight), **self.counters,
+                    "wait_ms": self.wait_ms.summary(), "run_ms": self.run_ms.summary()}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,76 +1,297 @@
 import numpy as np
-from scipy.interpolate import UnivariateSpline
+from collections import OrderedDict
+import copy
+import hashlib
+import json
 import math
+import os
+import pickle
+import threading
+
+import engine_profiling as profiling
+
+# Status-Codes der Batch-Engines (pro Zeile statt früher Returns)
+STATUS_OK = 0
+STATUS_TOO_FEW_STAGES = 1
+STATUS_INVALID_PACES = 2      # doppelte Speeds, keine Parabel möglich (kein Ergebnis)
+STATUS_NO_ROOT = 3            # Diskriminante < 0, Fallback auf Stufe 2 (Ergebnis vorhanden)
+STATUS_LINEAR_FIT = 4         # Parabel entartet zur Geraden, lineare Lösung (Ergebnis vorhanden)
+
+# Metabolic-Type-Codes der Batch-Ausgabe
+METABOLIC_TYPES = ("DIESEL / ENDURANCE", "TURBO / POWER")
+
+# Fehlermeldungen der Stufen-Prüfung (Einzel-Engines und Bulk-Runner identisch)
+MSG_RUN_STAGES = "Der Lauf-Modus benötigt mindestens 4 Stufen."
+MSG_HYROX_STAGES = "Hyrox-Modus benötigt exakt 3 Stufen."
+MSG_STAGE_MISMATCH = "Speed, Laktat und HF brauchen gleich viele Stufen."
+MSG_INVALID_PACES = "Paces ungültig."
+
+
+def stage_error(protocol, speeds, lactates, heart_rates):
+    """
+    Prüft Stufenanzahl und -längen, bevor Cache-Key und Engine die Arrays anfassen.
+    Gibt die Fehlermeldung zurück oder None. Alles außer "run" ist Hyrox (wie im API-Handler).
+    Doppelte Speeds im Lauf-Modus lassen keinen Spline zu (bei Hyrox fängt das die Engine ab).
+    """
+    n = len(speeds)
+    if protocol == "run":
+        if n < 4:
+            return MSG_RUN_STAGES
+    elif n != 3:
+        return MSG_HYROX_STAGES
+    if len(lactates) != n or len(heart_rates) != n:
+        return MSG_STAGE_MISMATCH
+    if protocol == "run" and len(set(speeds)) != n:
+        return MSG_INVALID_PACES
+    return None
 
 # ==========================================
 # TEIL A: DIE RUNNER-ENGINE (Dmax & Aerodynamik)
 # ==========================================
-def run_protocol_engine(payload):
+def calculate_metrics(speeds, lactates, heart_rates, v_max, is_all_out=True,
+                      weight_kg=75.0, height_cm=180.0, shoulder_width_cm=45.0,
+                      dmax_solver="grid", dmax_precision=2):
     """
-    Standard-Lauf-Diagnostik für >= 4 Stufen.
-    Nutzt Dmax für die Schwelle und Aerodynamik für VO2max.
+    Gemeinsamer Kern für App und API: ein Spline-Fit für Laktat und HF,
+    daraus alle Schwellen, Zonen und Kurven-Arrays.
+    Gibt None zurück, wenn weniger als 4 Stufen vorliegen.
+    dmax_solver: "grid" (100er Gitter) oder "analytic" (Ableitungs-Nullstelle),
+    dmax_precision: Nachkommastellen der Schwelle.
+    Identische Eingaben kommen aus dem Ergebnis-Cache (siehe TEIL C).
     """
-    speeds = np.array(payload.get('speeds_kmh', []))
-    lactates = np.array(payload.get('lactates_mmol', []))
-    heart_rates = np.array(payload.get('heart_rates_bpm', []))
-    
-    weight = float(payload.get('weight_kg', 75.0))
-    height = float(payload.get('height_cm', 180.0))
-    shoulder_width = float(payload.get('shoulder_width_cm', 45.0))
-    v_max_reached = float(payload.get('v_max_all_out', speeds[-1] if len(speeds) > 0 else 0))
-
+    speeds = np.asarray(speeds, dtype=float)
+    lactates = np.asarray(lactates, dtype=float)
+    heart_rates = np.asarray(heart_rates, dtype=float)
     if len(speeds) < 4:
-        return {"status": "error", "message": "Der Lauf-Modus benötigt mindestens 4 Stufen."}
+        return None
+
+    key = metrics_cache_key(speeds, lactates, heart_rates, v_max, is_all_out, weight_kg, height_cm,
+                            shoulder_width_cm, dmax_solver, dmax_precision)
+    hit, metrics = _RESULT_CACHE.get(key)
+    profiling.count("cache_hit" if hit else "cache_miss")
+    if not hit:
+        metrics = _calculate_metrics_uncached(speeds, lactates, heart_rates, v_max, is_all_out,
+                                              weight_kg, height_cm, shoulder_width_cm,
+                                              dmax_solver, int(dmax_precision))
+        _RESULT_CACHE.put(key, metrics)
+    return metrics
+
 
-    # Sortierung und Spline-Glättung
+def metrics_cache_key(speeds, lactates, heart_rates, v_max, is_all_out=True, weight_kg=75.0, height_cm=180.0,
+                      shoulder_width_cm=45.0, dmax_solver="grid", dmax_precision=2):
+    """Cache-Schlüssel von calculate_metrics (z.B. für Deduplizierung im Compute-Pool)."""
+    return payload_cache_key(speeds, lactates, heart_rates, weight_kg, height_cm, shoulder_width_cm,
+                             v_max, protocol="run", is_all_out=bool(is_all_out),
+                             dmax_solver=dmax_solver, dmax_precision=int(dmax_precision))
+
+
+def _calculate_metrics_uncached(speeds, lactates, heart_rates, v_max, is_all_out,
+                                weight_kg, height_cm, shoulder_width_cm,
+                                dmax_solver="grid", dmax_precision=2):
+    v_max = float(v_max)
+    weight, height, shoulder_width = float(weight_kg), float(height_cm), float(shoulder_width_cm)
+
+    # Sortierung und Spline-Glättung (einziger Fit pro Aufruf)
     idx = np.argsort(speeds)
     speeds, lactates, heart_rates = speeds[idx], lactates[idx], heart_rates[idx]
-    
-    l_spline = UnivariateSpline(speeds, lactates, s=0.5)
-    hr_spline = UnivariateSpline(speeds, heart_rates, s=0.5)
-    
-    v_fine = np.linspace(speeds[0], speeds[-1], 100)
-    l_fine = np.clip(l_spline(v_fine), 0.5, None)
 
-    # Dmax Berechnung (Geometrische Schwelle)
-    v_min, l_min = v_fine[0], l_fine[0]
-    v_end, l_end = v_fine[-1], l_fine[-1]
-    
-    m = (l_end - l_min) / (v_end - v_min) if v_end != v_min else 0
-    b = l_min - m * v_min
-    distances = (m * v_fine + b) - l_fine
-    
-    lt2_kmh = round(v_fine[np.argmax(distances)], 2)
-    lt2_hr = int(hr_spline(lt2_kmh))
+    with profiling.stage("spline_fit"):
+        l_spline = _spline(speeds, lactates)
+        hr_model = HRModel(speeds, heart_rates)
 
-    # VO2max Schätzung (inkl. der "16 km/h Regel" für die Relevanz der Schulterbreite)
-    # Frontalfläche A in m^2
-    area = (height / 100.0) * (shoulder_width / 100.0) * 0.75 
-    p_aero = 0.5 * 1.225 * 0.9 * area * ((v_max_reached / 3.6) ** 3)
-    vo2max_est = round(((0.2 * (v_max_reached * 16.667)) + 3.5) + ((p_aero * 12.0) / weight), 1)
+        v_fine = np.linspace(speeds[0], speeds[-1], 100)
+        l_fine = np.clip(l_spline(v_fine), 0.5, None)
+        h_fine = hr_model(v_fine)
+
+    # LT2 / iANS über Dmax (Geometrische Schwelle)
+    with profiling.stage("dmax"):
+        if dmax_solver == "grid":
+            lt2 = round(float(v_fine[_dmax_index(v_fine, l_fine)]), dmax_precision)
+        else:
+            lt2 = solve_dmax(l_spline, speeds[0], speeds[-1], solver=dmax_solver, precision=dmax_precision)
+
+    # LT1: erster Anstieg um +0.5 mmol über das Laktat-Minimum (max. LT2)
+    i_min = int(np.argmin(l_fine))
+    above = np.flatnonzero(l_fine[i_min:] >= l_fine[i_min] + 0.5)
+    lt1 = round(min(float(v_fine[i_min + above[0]]) if len(above) else lt2, lt2), 2)
+
+    # FatMax: minimales Laktat-Äquivalent (Laktat / Speed) unterhalb LT1
+    fat_mask = v_fine <= lt1
+    fatmax = round(float(v_fine[fat_mask][np.argmin(l_fine[fat_mask] / v_fine[fat_mask])]), 2) if fat_mask.any() else lt1
 
-    return _generate_output("PURE RUNNER", lt2_kmh, lt2_kmh, lt2_hr, vo2max=vo2max_est)
+    hf_fatmax, hf_lt1, hf_lt2 = hr_model.bpm([fatmax, lt1, lt2]).tolist()
+
+    # VLaMax Proxy (Allometrie wie im Hyrox-Modell, Laufleistung ~1.04 W/kg pro m/s)
+    run_watt = 1.04 * weight * (v_max / 3.6)
+    allometric_index = run_watt / (weight ** 0.67) if weight > 0 else 0
+    vlamax_val = round(float(lactates.max()) / allometric_index, 2) if allometric_index > 0 else 0.5
+    vlamax_label = "TURBO / POWER" if vlamax_val >= 0.75 else "HYBRID" if vlamax_val >= 0.45 else "DIESEL / ENDURANCE"
+
+    # FLUSH RATE: Anteil der Schwelle an vMax; ohne All-Out nicht validiert
+    stab = min(100.0, lt2 / v_max * 100.0) if v_max > 0 else 0.0
+    is_stable = bool(is_all_out and stab >= 70.0)
+
+    vo2max = round(_vo2max_aero(v_max, weight, height, shoulder_width), 1)
+
+    return {
+        "fatmax": fatmax, "lt1": lt1, "lt2": lt2,
+        "hf_fatmax": hf_fatmax, "hf_lt1": hf_lt1, "hf_lt2": hf_lt2,
+        "vlamax_val": vlamax_val, "vlamax_label": vlamax_label,
+        "stab": stab, "is_stable": is_stable,
+        "vo2max": vo2max,
+        "v_orig": speeds, "l_orig": lactates, "h_orig": heart_rates,
+        "v_fine": v_fine, "l_fine": l_fine, "h_fine": h_fine,
+        "report": ThresholdResult("PURE RUNNER", lt2, lt2, hf_lt2, vo2max),
+    }
+
+
+@profiling.timed("run_protocol_engine")
+def run_protocol_engine(payload, as_object=False):
+    """
+    Standard-Lauf-Diagnostik für >= 4 Stufen.
+    Nutzt Dmax für die Schwelle und Aerodynamik für VO2max.
+    as_object=True liefert ein ThresholdResult statt des Dicts.
+    bootstrap_replicates > 0 ergänzt das Dict um lt2_ci_kmh / lt2_hr_ci (siehe TEIL E).
+    """
+    speeds = payload.get('speeds_kmh', [])
+    error = stage_error("run", speeds, payload.get('lactates_mmol', []), payload.get('heart_rates_bpm', []))
+    if error:
+        return {"status": "error", "message": error}
+    metrics = calculate_metrics(
+        payload.get('speeds_kmh', []),
+        payload.get('lactates_mmol', []),
+        payload.get('heart_rates_bpm', []),
+        v_max=float(payload.get('v_max_all_out', speeds[-1] if len(speeds) > 0 else 0)),
+        is_all_out=bool(payload.get('is_all_out', True)),
+        weight_kg=float(payload.get('weight_kg', 75.0)),
+        height_cm=float(payload.get('height_cm', 180.0)),
+        shoulder_width_cm=float(payload.get('shoulder_width_cm', 45.0)),
+        dmax_solver=payload.get('dmax_solver', 'grid'),
+        dmax_precision=int(payload.get('dmax_precision', 2)),
+    )
+    if metrics is None:
+        return {"status": "error", "message": MSG_RUN_STAGES}
+    if as_object:
+        return metrics["report"]
+    res = metrics["report"].to_dict()
+    n_boot = int(payload.get('bootstrap_replicates', 0))
+    if n_boot > 0:
+        ci = lt2_bootstrap(metrics["v_orig"], metrics["l_orig"], metrics["h_orig"], n_boot=n_boot,
+                           level=float(payload.get('confidence_level', 0.95)), seed=payload.get('bootstrap_seed'))
+        res.update(lt2_ci_kmh=ci["lt2_ci_kmh"], lt2_hr_ci=ci["lt2_hr_ci"], lt2_sd_kmh=ci["lt2_sd_kmh"])
+    return res
+
+
+def run_protocol_engine_batch(speeds, lactates, heart_rates, lengths,
+                              weight_kg=75.0, height_cm=180.0, shoulder_width_cm=45.0,
+                              v_max_all_out=None, hr_mode="spline"):
+    """
+    Batch-Variante von run_protocol_engine für ganze Kader/Saison-Archive.
+    Eingabe spaltenweise (ragged): alle Stufen hintereinander in speeds/lactates/
+    heart_rates, `lengths` enthält die Stufenzahl pro Test. Biometrie als Skalar
+    oder Array der Länge N. Dmax und Aerodynamik laufen als ein NumPy-Durchgang
+    über die gestapelte (N x 100) Matrix; nur der Spline-Fit bleibt pro Test.
+    hr_mode="linear" ersetzt den HF-Spline durch die lineare Verbindung der Stufen
+    (Bulk-Jobs, bei denen die Spline-Genauigkeit nicht gebraucht wird).
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    lactates = np.asarray(lactates, dtype=float)
+    heart_rates = np.asarray(heart_rates, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    n = len(lengths)
+
+    offsets = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] != len(speeds) or len(lactates) != len(speeds) or len(heart_rates) != len(speeds):
+        raise ValueError("speeds/lactates/heart_rates passen nicht zu lengths.")
+
+    weight = np.broadcast_to(np.asarray(weight_kg, dtype=float), (n,))
+    height = np.broadcast_to(np.asarray(height_cm, dtype=float), (n,))
+    shoulder_width = np.broadcast_to(np.asarray(shoulder_width_cm, dtype=float), (n,))
+    if v_max_all_out is None:
+        # Wie im Einzel-Modus: letzte Stufe in Eingabereihenfolge
+        v_max = np.where(lengths > 0, speeds[np.maximum(offsets[1:] - 1, 0)] if len(speeds) else 0.0, 0.0)
+    else:
+        v_max = np.broadcast_to(np.asarray(v_max_all_out, dtype=float), (n,))
+
+    status = np.where(lengths >= 4, STATUS_OK, STATUS_TOO_FEW_STAGES)
+    ok = np.flatnonzero(status == STATUS_OK)
+
+    # Sortierung aller Tests in einem Schritt (Test-ID als Primärschlüssel)
+    test_ids = np.repeat(np.arange(n), lengths)
+    order = np.lexsort((speeds, test_ids))
+    speeds, lactates, heart_rates = speeds[order], lactates[order], heart_rates[order]
+
+    # Gestapeltes Feingitter (N_ok x 100)
+    v_fine = np.linspace(speeds[offsets[ok]], speeds[offsets[ok + 1] - 1], 100, axis=-1)
+    l_fine = np.empty_like(v_fine)
+    with profiling.stage("batch_spline_fit"):
+        for row, i in enumerate(ok):
+            sl = slice(offsets[i], offsets[i + 1])
+            l_fine[row] = _spline(speeds[sl], lactates[sl])(v_fine[row])
+        hr_model = HRModelBatch(speeds, heart_rates, lengths, mode=hr_mode)
+    l_fine = np.clip(l_fine, 0.5, None)
+
+    # Dmax für alle Tests auf einmal
+    lt2_kmh = np.full(n, np.nan)
+    with profiling.stage("batch_dmax"):
+        lt2_kmh[ok] = np.round(v_fine[np.arange(len(ok)), _dmax_index(v_fine, l_fine)], 2)
+
+    lt2_hr = hr_model.bpm(lt2_kmh)
+
+    vo2max_est = np.full(n, np.nan)
+    vo2max_est[ok] = np.round(_vo2max_aero(v_max[ok], weight[ok], height[ok], shoulder_width[ok]), 1)
+
+    return {
+        "status": status,
+        "lt2_kmh": lt2_kmh,
+        "lt2_heart_rate": lt2_hr,
+        "vo2max_estimate": vo2max_est,
+    }
 
 
 # ==========================================
 # TEIL B: DIE HYBRID-ENGINE (Mader-Sandwich)
 # ==========================================
-def hyrox_protocol_engine(payload):
+@profiling.timed("hyrox_protocol_engine")
+def hyrox_protocol_engine(payload, as_object=False):
     """
     Mader-Heck-Modell für 3 Stufen + Acid Bath (Assault Bike) + Flush.
+    as_object=True liefert ein ThresholdResult statt des Dicts.
     """
+    # Erst prüfen: der Cache-Key stapelt die Stufen und scheitert an ungleichen Längen
+    error = stage_error("hyrox", payload.get('speeds_kmh', []), payload.get('lactates_mmol', []),
+                        payload.get('heart_rates_bpm', []))
+    if error:
+        return {"status": "error", "message": error}
+    # Stufenreihenfolge ist hier relevant (Stufe 1 = Baseline), daher ohne Sortierung im Key
+    key = payload_cache_key(
+        payload.get('speeds_kmh', []), payload.get('lactates_mmol', []), payload.get('heart_rates_bpm', []),
+        payload.get('weight_kg', 0), None, None, None, protocol="hyrox", sort_stages=False,
+        bike_watt_avg=payload.get('bike_watt_avg', 0), lactate_peak=payload.get('lactate_peak', 0),
+        lactate_flush_recovery=payload.get('lactate_flush_recovery', 0),
+    )
+    hit, res = _RESULT_CACHE.get(key)
+    profiling.count("cache_hit" if hit else "cache_miss")
+    if not hit:
+        with profiling.stage("mader_fit"):
+            res = _hyrox_protocol_engine_uncached(payload)
+        _RESULT_CACHE.put(key, res)
+    return res if as_object or not isinstance(res, ThresholdResult) else res.to_dict()
+
+
+def _hyrox_protocol_engine_uncached(payload):
     weight = float(payload.get('weight_kg', 0))
     speeds = payload.get('speeds_kmh', [])
     lactates = payload.get('lactates_mmol', [])
     heart_rates = payload.get('heart_rates_bpm', [])
     
     if len(speeds) != 3:
-        return {"status": "error", "message": "Hyrox-Modus benötigt exakt 3 Stufen."}
+        return {"status": "error", "message": MSG_HYROX_STAGES}
     
     # Klartext-Mapping
     s1_v, s2_v, s3_v = speeds[0], speeds[1], speeds[2]
     s1_l, s2_l, s3_l = lactates[0], lactates[1], lactates[2]
-    s1_h, s2_h, s3_h = heart_rates[0], heart_rates[1], heart_rates[2]
     
     bike_watt = float(payload.get('bike_watt_avg', 0))
     peak_l = float(payload.get('lactate_peak', 0))
@@ -82,7 +303,7 @@ def hyrox_protocol_engine(payload):
 
     # Algebraische Parabel (3 Punkte Lösung)
     denom = (s1_v - s2_v) * (s1_v - s3_v) * (s2_v - s3_v)
-    if denom == 0: return {"status": "error", "message": "Paces ungültig."}
+    if denom == 0: return {"status": "error", "message": MSG_INVALID_PACES}
     
     a = (s3_v * (s2_l - s1_l) + s2_v * (s1_l - s3_l) + s1_v * (s3_l - s2_l)) / denom
     b = ((s3_v**2) * (s1_l - s2_l) + (s2_v**2) * (s3_l - s1_l) + (s1_v**2) * (s2_l - s3_l)) / denom
@@ -91,47 +312,764 @@ def hyrox_protocol_engine(payload):
     # Mader-Schwelle (+1.5 mmol über Baseline)
     target_l = s1_l + 1.5
     disc = (b**2) - (4 * a * (c - target_l))
-    raw_lt2_kmh = (-b + math.sqrt(disc)) / (2 * a) if disc >= 0 else s2_v
+    if a == 0:
+        # Drei kollineare Punkte: Parabel entartet zur Geraden
+        raw_lt2_kmh = (target_l - c) / b if b != 0 else s2_v
+    else:
+        raw_lt2_kmh = (-b + math.sqrt(disc)) / (2 * a) if disc >= 0 else s2_v
 
     # VLaMax Shift & Flush Validierung
     final_kmh = raw_lt2_kmh * (1.0 - (vlamax_proxy * 0.1))
     final_kmh *= 1.02 if (peak_l - flush_l) > 0 else 0.95
 
-    # Puls Interpolation
-    hr_slope = (s3_h - s2_h) / (s3_v - s2_v)
-    lt2_hr = int(s2_h + hr_slope * (final_kmh - s2_v))
+    # Puls: stückweise linear durch alle drei Stufen, außerhalb Randsegment-Steigung
+    lt2_hr = int(HRModel(speeds, heart_rates, mode="linear").bpm(final_kmh))
 
     m_type = "TURBO / POWER" if vlamax_proxy > 0.4 else "DIESEL / ENDURANCE"
-    return _generate_output(m_type, raw_lt2_kmh, final_kmh, lt2_hr)
+    return ThresholdResult(m_type, raw_lt2_kmh, final_kmh, lt2_hr)
+
+
+def hyrox_protocol_engine_batch(speeds, lactates, heart_rates, weight_kg, bike_watt_avg,
+                                lactate_peak, lactate_flush_recovery):
+    """
+    Geschlossene, vektorisierte Variante von hyrox_protocol_engine für ganze Kohorten.
+    speeds/lactates/heart_rates als (N, 3) Matrizen, Athleten-Werte als Skalar oder
+    Array der Länge N. Statt früher Returns gibt es pro Zeile einen Status-Code.
+    """
+    speeds = np.asarray(speeds, dtype=float).reshape(-1, 3)
+    lactates = np.asarray(lactates, dtype=float).reshape(-1, 3)
+    heart_rates = np.asarray(heart_rates, dtype=float).reshape(-1, 3)
+    n = len(speeds)
+    weight = np.broadcast_to(np.asarray(weight_kg, dtype=float), (n,))
+    bike_watt = np.broadcast_to(np.asarray(bike_watt_avg, dtype=float), (n,))
+    peak_l = np.broadcast_to(np.asarray(lactate_peak, dtype=float), (n,))
+    flush_l = np.broadcast_to(np.asarray(lactate_flush_recovery, dtype=float), (n,))
+
+    s1_v, s2_v, s3_v = speeds.T
+    s1_l, s2_l, s3_l = lactates.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Allometrie & VLaMax Proxy
+        allometric_index = np.where(weight > 0, bike_watt / (weight ** 0.67), 0.0)
+        vlamax_proxy = np.where(allometric_index > 0, peak_l / allometric_index, 0.5)
+
+        # Algebraische Parabel (3 Punkte Lösung) für alle Zeilen
+        denom = (s1_v - s2_v) * (s1_v - s3_v) * (s2_v - s3_v)
+        a = (s3_v * (s2_l - s1_l) + s2_v * (s1_l - s3_l) + s1_v * (s3_l - s2_l)) / denom
+        b = ((s3_v**2) * (s1_l - s2_l) + (s2_v**2) * (s3_l - s1_l) + (s1_v**2) * (s2_l - s3_l)) / denom
+        c = (s2_v * s3_v * (s2_v - s3_v) * s1_l + s3_v * s1_v * (s3_v - s1_v) * s2_l + s1_v * s2_v * (s1_v - s2_v) * s3_l) / denom
+
+        # Mader-Schwelle (+1.5 mmol über Baseline)
+        target_l = s1_l + 1.5
+        disc = (b**2) - (4 * a * (c - target_l))
+        quad_root = (-b + np.sqrt(disc)) / (2 * a)
+        lin_root = np.where(b != 0, (target_l - c) / b, s2_v)
+
+    status = np.full(n, STATUS_OK, dtype=np.int8)
+    status[disc < 0] = STATUS_NO_ROOT
+    status[a == 0] = STATUS_LINEAR_FIT
+    status[denom == 0] = STATUS_INVALID_PACES
+
+    raw_lt2_kmh = np.where(status == STATUS_OK, quad_root,
+                           np.where(status == STATUS_LINEAR_FIT, lin_root, s2_v))
+
+    # VLaMax Shift & Flush Validierung
+    final_kmh = raw_lt2_kmh * (1.0 - (vlamax_proxy * 0.1))
+    final_kmh *= np.where((peak_l - flush_l) > 0, 1.02, 0.95)
+
+    # Puls: stückweise linear durch alle drei Stufen (wie hyrox_protocol_engine)
+    lt2_hr = HRModelBatch(speeds.ravel(), heart_rates.ravel(), np.full(n, 3), mode="linear").bpm(final_kmh)
+
+    invalid = status == STATUS_INVALID_PACES
+    for arr in (raw_lt2_kmh, final_kmh, lt2_hr):
+        arr[invalid] = np.nan
+
+    return {
+        "status": status,
+        "vlamax_proxy": vlamax_proxy,
+        "metabolic_type_code": (vlamax_proxy > 0.4).astype(np.int8),
+        "raw_lt2_kmh": raw_lt2_kmh,
+        "final_pace_kmh": final_kmh,
+        "lt2_heart_rate": lt2_hr,
+    }
 
 
 # ==========================================
-# HILFSFUNKTIONEN
+# TEIL C: ERGEBNIS-CACHE (Content-Addressed LRU)
 # ==========================================
-def _generate_output(m_type, raw_lt2, final_v, lt2_hr, vo2max=None):
-    def fmt_p(v):
-        s = int((60/v)*60) if v > 0 else 0
-        return f"{s // 60}:{s % 60:02d}"
-    
+class ResultCache:
+    """
+    LRU-Cache für Engine-Ergebnisse mit Treffer-Zählern und optionaler
+    Festplatten-Stufe (ein Pickle pro Schlüssel, höchstens disk_maxsize Dateien;
+    darüber fliegen die am längsten nicht gelesenen). Thread-sicher, da Streamlit
+    jede Browser-Session in einem eigenen Thread ausführt.
+    Werte werden beim Einfügen einmal kopiert und eingefroren: NumPy-Arrays sind danach
+    schreibgeschützt und werden bei jedem Treffer geteilt, nur dict/list-Container
+    werden neu gebaut (kein deepcopy pro Treffer).
+    """
+
+    def __init__(self, maxsize=512, disk_dir=None, disk_maxsize=10000):
+        self.maxsize = int(maxsize)
+        self.disk_dir = disk_dir
+        self.disk_maxsize = int(disk_maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_count = len(self._disk_files())
+
+    def get(self, key):
+        """Gibt (treffer, wert) zurück; Container sind frisch, Arrays schreibgeschützt geteilt."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, _thaw(self._data[key])
+        value = self._disk_read(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self.disk_hits += 1
+            # Pickle liefert wieder beschreibbare Arrays
+            value = _freeze(value)
+            self._store(key, value)
+        return True, _thaw(value)
+
+    def put(self, key, value):
+        value = _freeze(copy.deepcopy(value))
+        with self._lock:
+            self._store(key, value)
+        self._disk_write(key, value)
+
+    def clear(self):
+        """Leert RAM- und Festplatten-Stufe (sonst kämen alte Ergebnisse von der Platte zurück)."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.disk_hits = 0
+            for name in self._disk_files():
+                self._disk_remove(name)
+            self._disk_count = 0
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                    "size": len(self._data), "maxsize": self.maxsize, "disk_dir": self.disk_dir,
+                    "disk_size": self._disk_count, "disk_maxsize": self.disk_maxsize}
+
+    def _store(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _disk_files(self):
+        if not self.disk_dir:
+            return []
+        try:
+            return [name for name in os.listdir(self.disk_dir) if name.endswith(".pkl")]
+        except OSError:
+            return []
+
+    def _disk_remove(self, name):
+        try:
+            os.remove(os.path.join(self.disk_dir, name))
+        except OSError:
+            pass
+
+    def _disk_read(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+            # mtime = letzter Zugriff, danach richtet sich die Verdrängung
+            os.utime(path)
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _disk_write(self, key, value):
+        if not self.disk_dir or self.disk_maxsize <= 0:
+            return
+        path = self._disk_path(key)
+        is_new = not os.path.exists(path)
+        # Atomar schreiben, damit parallele Prozesse keine halben Dateien lesen
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_count += int(is_new)
+            if self._disk_count > self.disk_maxsize:
+                self._disk_evict()
+
+    def _disk_evict(self):
+        """Verdrängt die ältesten Dateien bis 90 % von disk_maxsize (Zählung neu vom Verzeichnis,
+        da sich mehrere Prozesse ein Verzeichnis teilen können). Aufruf unter self._lock."""
+        entries = []
+        for name in self._disk_files():
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.disk_dir, name)), name))
+            except OSError:
+                pass
+        entries.sort()
+        keep = int(self.disk_maxsize * 0.9)
+        for _, name in entries[:max(len(entries) - keep, 0)]:
+            self._disk_remove(name)
+        self._disk_count = min(len(entries), keep)
+
+
+def _freeze(value):
+    """Setzt alle Arrays in dict/list/tuple-Strukturen schreibgeschützt (in place)."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+def _thaw(value):
+    """Neue dict/list-Container um die geteilten (schreibgeschützten) Werte."""
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_thaw(v) for v in value]
+    return value
+
+
+_RESULT_CACHE = ResultCache(disk_dir=os.environ.get("VECTRX_CACHE_DIR") or None,
+                            disk_maxsize=int(os.environ.get("VECTRX_CACHE_DISK_MAX", 10000)))
+
+
+def payload_cache_key(speeds, lactates, heart_rates, weight_kg, height_cm, shoulder_width_cm,
+                      v_max, protocol="run", sort_stages=True, **extra):
+    """
+    Kanonischer SHA-256 über die Messdaten (Stufen nach Speed sortiert),
+    Biometrie, vMax und Protokoll. Reihenfolge der Eingabe spielt keine Rolle.
+    """
+    stages = np.column_stack([np.asarray(speeds, dtype=float),
+                              np.asarray(lactates, dtype=float),
+                              np.asarray(heart_rates, dtype=float)])
+    if sort_stages and len(stages):
+        stages = stages[np.lexsort(stages.T[::-1])]
+
+    def num(x):
+        return x if x is None or isinstance(x, (bool, str)) else float(x)
+
+    canon = {
+        "p": protocol,
+        "st": stages.tolist(),
+        "bio": [num(weight_kg), num(height_cm), num(shoulder_width_cm), num(v_max)],
+        "x": {k: num(v) for k, v in sorted(extra.items())},
+    }
+    return hashlib.sha256(json.dumps(canon, separators=(",", ":")).encode()).hexdigest()
+
+
+def configure_cache(maxsize=512, disk_dir=None, disk_maxsize=10000):
+    """Ersetzt den globalen Ergebnis-Cache (maxsize=0 schaltet die RAM-Stufe ab)."""
+    global _RESULT_CACHE
+    _RESULT_CACHE = ResultCache(maxsize=maxsize, disk_dir=disk_dir, disk_maxsize=disk_maxsize)
+    return _RESULT_CACHE
+
+
+def cache_info():
+    return _RESULT_CACHE.info()
+
+
+def cache_get(key):
+    """Direkter Lookup (treffer, wert) für vorberechnete Ergebnisse unter eigenem Schlüssel."""
+    return _RESULT_CACHE.get(key)
+
+
+def cache_put(key, value):
+    _RESULT_CACHE.put(key, value)
+
+
+def clear_cache():
+    _RESULT_CACHE.clear()
+
+
+# ==========================================
+# TEIL D: ERGEBNIS-OBJEKTE (kompakt, Formatierung erst bei Bedarf)
+# ==========================================
+# (Name, Pace-Faktor auf LT2, HF-Untergrenze, HF-Obergrenze) relativ zur LT2-HF
+ZONE_SPECS = (
+    ("ZONE-1 | RECOVERY",  0.75, None, 0.80),
+    ("ZONE-2 | ENDURANCE", 0.85, 0.80, 0.89),
+    ("ZONE-3 | TEMPO",     0.93, 0.90, 0.94),
+    ("ZONE-4 | THRESHOLD", 1.00, 0.95, 1.00),
+    ("ZONE-5 | MAX",       1.05, 1.00, None),
+)
+
+
+class Zone:
+    """Eine Trainingszone als rohe Zahlen; Pace- und HF-Labels werden erst beim Lesen formatiert."""
+    __slots__ = ("name", "pace_kmh", "hr_low", "hr_high")
+
+    def __init__(self, name, pace_kmh, hr_low, hr_high):
+        self.name, self.pace_kmh, self.hr_low, self.hr_high = name, pace_kmh, hr_low, hr_high
+
+    @property
+    def pace(self):
+        return _fmt_pace(self.pace_kmh)
+
+    @property
+    def hr(self):
+        if self.hr_low is None:
+            return f"<{self.hr_high}"
+        if self.hr_high is None:
+            return f">{self.hr_low}"
+        return f"{self.hr_low}-{self.hr_high}"
+
+    def to_dict(self):
+        return {"name": self.name, "pace": self.pace, "hr": self.hr}
+
+
+class ThresholdResult:
+    """
+    Schwellen-Ergebnis einer Engine mit rohen Floats. to_dict() liefert exakt
+    das bisherige Ausgabeformat von _generate_output.
+    """
+    __slots__ = ("metabolic_type", "raw_lt2_kmh", "final_pace_kmh", "lt2_heart_rate", "vo2max_estimate")
+
+    def __init__(self, metabolic_type, raw_lt2_kmh, final_pace_kmh, lt2_heart_rate, vo2max_estimate=None):
+        self.metabolic_type = metabolic_type
+        self.raw_lt2_kmh = raw_lt2_kmh
+        self.final_pace_kmh = final_pace_kmh
+        self.lt2_heart_rate = lt2_heart_rate
+        self.vo2max_estimate = vo2max_estimate
+
+    @property
+    def target_pace_min_km(self):
+        return _fmt_pace(self.final_pace_kmh)
+
+    @property
+    def zones(self):
+        v, hr = self.final_pace_kmh, self.lt2_heart_rate
+        return [Zone(name, v * f_v if f_v != 1.0 else v,
+                     None if lo is None else int(hr * lo),
+                     None if hi is None else int(hr * hi))
+                for name, f_v, lo, hi in ZONE_SPECS]
+
+    @profiling.timed("generate_output")
+    def to_dict(self):
+        res = {
+            "metabolic_type": self.metabolic_type,
+            "raw_lt2_kmh": round(self.raw_lt2_kmh, 2),
+            "final_pace_kmh": round(self.final_pace_kmh, 2),
+            "target_pace_min_km": self.target_pace_min_km,
+            "lt2_heart_rate": self.lt2_heart_rate,
+            "zones": [z.to_dict() for z in self.zones],
+        }
+        if self.vo2max_estimate: res["vo2max_estimate"] = self.vo2max_estimate
+        return res
+
+
+class ZoneTable:
+    """
+    Struct-of-Arrays für viele Ergebnisse: Zonen-Grenzen als (N x 5) Matrizen
+    (offene HF-Grenzen = -1). Labels nur auf Anfrage.
+    """
+    __slots__ = ("names", "pace_kmh", "hr_low", "hr_high")
+
+    def __init__(self, final_pace_kmh, lt2_heart_rate):
+        v = np.asarray(final_pace_kmh, dtype=float)[:, None]
+        hr = np.asarray(lt2_heart_rate, dtype=float)[:, None]
+        self.names = tuple(spec[0] for spec in ZONE_SPECS)
+        self.pace_kmh = v * np.array([spec[1] for spec in ZONE_SPECS])
+        lo = np.array([-1.0 if spec[2] is None else spec[2] for spec in ZONE_SPECS])
+        hi = np.array([-1.0 if spec[3] is None else spec[3] for spec in ZONE_SPECS])
+        with np.errstate(invalid='ignore'):
+            self.hr_low = np.where(lo < 0, -1, np.nan_to_num(np.trunc(hr * lo), nan=-1)).astype(np.int32)
+            self.hr_high = np.where(hi < 0, -1, np.nan_to_num(np.trunc(hr * hi), nan=-1)).astype(np.int32)
+
+    def __len__(self):
+        return len(self.pace_kmh)
+
+    def zones(self, i):
+        return [Zone(name, float(self.pace_kmh[i, k]),
+                     None if self.hr_low[i, k] < 0 else int(self.hr_low[i, k]),
+                     None if self.hr_high[i, k] < 0 else int(self.hr_high[i, k]))
+                for k, name in enumerate(self.names)]
+
+    def pace_labels(self):
+        return np.array([[_fmt_pace(v) for v in row] for row in self.pace_kmh])
+
+
+# ==========================================
+# TEIL E: UNSICHERHEIT (Bootstrap-Konfidenzintervalle für LT2)
+# ==========================================
+def lt2_bootstrap(speeds, lactates, heart_rates, n_boot=5000, level=0.95, noise_sd=None, noise_cv=0.0,
+                  method="parametric", seed=None, executor=None, chunk_size=1000, return_samples=False):
+    """
+    Konfidenzintervalle für LT2 (Dmax) und die LT2-HF aus n_boot Replikaten.
+
+    Der Basis-Spline (s=0.5) wird als linearer Glätter nachgebaut: gleiche Knoten,
+    gleiche Strafe auf die Sprünge der 3. Ableitung (wie FITPACK), kalibriert auf
+    s=0.5. Damit ist jedes Replikat eine Matrix-Zeile: Feinkurven aller Replikate =
+    Y @ M.T, danach Dmax vektorisiert über die (n_boot x 100)-Matrix. Knoten und
+    Strafgewicht bleiben dabei fix (FITPACK würde pro Replikat neu wählen).
+
+    method: "parametric" = Fit + N(0, sd), sd = noise_sd oder aus den Residuen
+    (mindestens 0.1 mmol), plus noise_cv * Laktat; "residual" = Wild-Bootstrap
+    (Residuen mit zufälligem Vorzeichen). Die Replikate laufen in Blöcken von
+    chunk_size, mit executor (Process-/ThreadPool) parallel; das Ergebnis hängt nur
+    von seed und chunk_size ab, nicht vom Executor.
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    lactates = np.asarray(lactates, dtype=float)
+    heart_rates = np.asarray(heart_rates, dtype=float)
+    if len(speeds) < 4:
+        return None
+    idx = np.argsort(speeds)
+    speeds, lactates, heart_rates = speeds[idx], lactates[idx], heart_rates[idx]
+
+    with profiling.stage("bootstrap_smoother"):
+        l_spline = _spline(speeds, lactates)
+        hr_model = HRModel(speeds, heart_rates)
+        v_fine = np.linspace(speeds[0], speeds[-1], 100)
+        smoother = _spline_smoother(speeds, lactates, l_spline, v_fine)
+        fitted = smoother["obs"] @ lactates
+        residuals = lactates - fitted
+        dof = len(speeds) - np.trace(smoother["obs"])
+        if noise_sd is None:
+            noise_sd = max(math.sqrt(float(residuals @ residuals) / dof) if dof > 0.5 else 0.0, 0.1)
+
+    lt2 = round(float(v_fine[_dmax_index(v_fine, np.clip(l_spline(v_fine), 0.5, None))]), 2)
+    args = (smoother["fine"], v_fine, fitted, residuals, float(noise_sd), float(noise_cv), method)
+
+    with profiling.stage("bootstrap_replicates"):
+        # Gleiche Blöcke und Zufallsströme (SeedSequence.spawn) mit und ohne Executor:
+        # derselbe Seed liefert dieselben Replikate, egal wo sie gerechnet werden
+        sizes = [min(chunk_size, n_boot - i) for i in range(0, int(n_boot), chunk_size)]
+        streams = np.random.SeedSequence(seed).spawn(len(sizes))
+        if executor is None:
+            chunks = [_bootstrap_chunk(*args, size, child) for size, child in zip(sizes, streams)]
+        else:
+            futures = [executor.submit(_bootstrap_chunk, *args, size, child) for size, child in zip(sizes, streams)]
+            chunks = [f.result() for f in futures]
+        samples = np.concatenate(chunks) if chunks else np.empty(0)
+        hr_samples = hr_model(samples)
+
+    alpha = (1.0 - level) / 2.0
+    q = [alpha * 100, (1.0 - alpha) * 100]
     res = {
-        "metabolic_type": m_type,
-        "raw_lt2_kmh": round(raw_lt2, 2),
-        "final_pace_kmh": round(final_v, 2),
-        "target_pace_min_km": fmt_p(final_v),
-        "lt2_heart_rate": lt2_hr,
-        "zones": [
-            {"name": "ZONE-1 | RECOVERY",  "pace": fmt_p(final_v * 0.75), "hr": f"<{int(lt2_hr * 0.80)}"},
-            {"name": "ZONE-2 | ENDURANCE", "pace": fmt_p(final_v * 0.85), "hr": f"{int(lt2_hr * 0.80)}-{int(lt2_hr * 0.89)}"},
-            {"name": "ZONE-3 | TEMPO",     "pace": fmt_p(final_v * 0.93), "hr": f"{int(lt2_hr * 0.90)}-{int(lt2_hr * 0.94)}"},
-            {"name": "ZONE-4 | THRESHOLD", "pace": fmt_p(final_v),        "hr": f"{int(lt2_hr * 0.95)}-{int(lt2_hr * 1.00)}"},
-            {"name": "ZONE-5 | MAX",       "pace": fmt_p(final_v * 1.05), "hr": f">{int(lt2_hr * 1.00)}"}
-        ]
+        "lt2_kmh": lt2,
+        "lt2_ci_kmh": [round(float(x), 2) for x in np.percentile(samples, q)],
+        "lt2_sd_kmh": round(float(samples.std()), 3),
+        "lt2_heart_rate": int(hr_model.bpm(lt2)),
+        "lt2_hr_ci": [int(x) for x in np.percentile(hr_samples, q)],
+        "level": level,
+        "n_boot": int(len(samples)),
+        "noise_sd": round(float(noise_sd), 3),
     }
-    if vo2max: res["vo2max_estimate"] = vo2max
+    if return_samples:
+        res["samples_kmh"], res["samples_hr"] = samples, hr_samples
     return res
 
-def vectrx_api_handler(payload):
+
+def _bootstrap_chunk(fine_op, v_fine, fitted, residuals, noise_sd, noise_cv, method, n, seed_seq):
+    """Ein Block Replikate -> LT2-Werte (läuft auch im Worker-Prozess)."""
+    rng = np.random.default_rng(seed_seq)
+    if method == "residual":
+        y = fitted + residuals * rng.choice((-1.0, 1.0), size=(n, len(fitted)))
+    elif method == "parametric":
+        sd = np.sqrt(noise_sd ** 2 + (noise_cv * np.clip(fitted, 0.0, None)) ** 2)
+        y = fitted + rng.standard_normal((n, len(fitted))) * sd
+    else:
+        raise ValueError(f"Unbekannte Bootstrap-Methode: {method}")
+    l_fine = np.clip(y @ fine_op.T, 0.5, None)
+    return v_fine[_dmax_index(v_fine, l_fine)]
+
+
+def _spline_smoother(x, y, spline, v_fine, k=3):
+    """
+    Linearer Operator des Glättungs-Splines bei festen Knoten:
+    {"obs": (n x n) y -> Fit an den Messpunkten, "fine": (100 x n) y -> Feinkurve}.
+    Ohne innere Knoten ist das der kubische Kleinste-Quadrate-Fit; mit inneren
+    Knoten wird p wie bei FITPACK so gewählt, dass die Residuenquadratsumme der des
+    Basis-Fits (~ s) entspricht.
+    """
+    from scipy.interpolate import BSpline
+
+    inner = np.asarray(spline.get_knots()[1:-1], dtype=float)
+    t = np.r_[[x[0]] * (k + 1), inner, [x[-1]] * (k + 1)]
+    n_coef = len(t) - k - 1
+    basis = [BSpline(t, np.eye(n_coef)[i], k) for i in range(n_coef)]
+    B = np.column_stack([b(x) for b in basis])
+    B_fine = np.column_stack([b(v_fine) for b in basis])
+    gram = B.T @ B
+
+    if len(inner) == 0:
+        coef_op = np.linalg.pinv(B)
+    else:
+        # Sprung der 3. Ableitung jedes Basis-Splines an den inneren Knoten
+        edges = np.r_[x[0], inner, x[-1]]
+        left, right = (edges[:-2] + edges[1:-1]) / 2, (edges[1:-1] + edges[2:]) / 2
+        jumps = np.column_stack([b.derivative(3)(right) - b.derivative(3)(left) for b in basis])
+        penalty = jumps.T @ jumps
+
+        def coef_for(p):
+            return np.linalg.solve(gram + penalty / p, B.T)
+
+        # fp(p) fällt monoton in p: Bisektion auf log10(p) bis fp = Residuum des Basis-Fits
+        # (FITPACK stoppt bei |fp - s| < 0.001 s, daher nicht exakt s)
+        target = float(spline.get_residual())
+        lo, hi = -12.0, 12.0
+        for _ in range(80):
+            mid = (lo + hi) / 2
+            r = y - B @ (coef_for(10 ** mid) @ y)
+            if r @ r > target:
+                lo = mid
+            else:
+                hi = mid
+        coef_op = coef_for(10 ** hi)
+
+    return {"obs": B @ coef_op, "fine": B_fine @ coef_op}
+
+
+# ==========================================
+# TEIL F: HF-MODELL (einmal fitten, vektorisiert auswerten)
+# ==========================================
+# Die HF-Kurve wird pro Test einmal gefittet und dann an allen Schwellen-, Zonen- und
+# Prognose-Speeds in einem Array-Aufruf ausgewertet. "spline" ist der Glättungsspline
+# der Runner-Engine, "linear" die billige stückweise lineare Verbindung der Stufen.
+# Außerhalb der Stufen wird in beiden Modi linear mit der Steigung des jeweiligen
+# Randsegments (erste bzw. letzte zwei Stufen) extrapoliert.
+HR_MODES = ("spline", "linear")
+
+
+class HRModel:
+    """HF-Kurve eines Tests. model(v) -> HF als float-Array, model.bpm(v) -> abgeschnittene int-Werte."""
+    __slots__ = ("mode", "speeds", "heart_rates", "_spline", "_lo", "_hi")
+
+    def __init__(self, speeds, heart_rates, mode="spline"):
+        if mode not in HR_MODES:
+            raise ValueError(f"Unbekannter HF-Modus: {mode}")
+        speeds = np.asarray(speeds, dtype=float)
+        heart_rates = np.asarray(heart_rates, dtype=float)
+        if not len(speeds) or len(speeds) != len(heart_rates):
+            raise ValueError("HF-Modell braucht gleich viele Speeds und HF-Werte (min. 1).")
+        idx = np.argsort(speeds, kind="stable")
+        self.speeds, self.heart_rates = speeds[idx], heart_rates[idx]
+        # Spline erst ab 4 Stufen (kubisch), darunter automatisch linear
+        self.mode = mode if len(speeds) >= 4 else "linear"
+        self._spline = _spline(self.speeds, self.heart_rates) if self.mode == "spline" else None
+        # Randsteigungen für die Extrapolation: (v_rand, Steigung)
+        x, y = self.speeds, self.heart_rates
+        self._lo = (x[0], _secant(x[0], x[min(1, len(x) - 1)], y[0], y[min(1, len(y) - 1)]))
+        self._hi = (x[-1], _secant(x[max(len(x) - 2, 0)], x[-1], y[max(len(y) - 2, 0)], y[-1]))
+
+    def __call__(self, v):
+        v = np.asarray(v, dtype=float)
+        (v_lo, m_lo), (v_hi, m_hi) = self._lo, self._hi
+        inside = np.clip(v, v_lo, v_hi)
+        base = self._spline(inside) if self._spline is not None else np.interp(inside, self.speeds, self.heart_rates)
+        return base + np.minimum(v - v_lo, 0.0) * m_lo + np.maximum(v - v_hi, 0.0) * m_hi
+
+    def bpm(self, v):
+        """HF als ganze Schläge (abgeschnitten wie int()); ValueError wie int(), wenn die Kurve NaN liefert."""
+        hr = self(v)
+        if not np.isfinite(hr).all():
+            raise ValueError("cannot convert float NaN to integer")
+        return np.trunc(hr).astype(np.int64)
+
+
+class HRModelBatch:
+    """
+    Viele HF-Kurven auf einmal, Eingabe spaltenweise wie run_protocol_engine_batch.
+    Auswertung mit einer Query-Matrix (N,) oder (N, K) -> gleiche Form; Tests ohne
+    Stufen liefern NaN. Im Modus "linear" komplett ohne Python-Schleife.
+    """
+    __slots__ = ("mode", "lengths", "_x", "_y", "_splines")
+
+    def __init__(self, speeds, heart_rates, lengths, mode="linear"):
+        if mode not in HR_MODES:
+            raise ValueError(f"Unbekannter HF-Modus: {mode}")
+        speeds = np.asarray(speeds, dtype=float)
+        heart_rates = np.asarray(heart_rates, dtype=float)
+        lengths = np.asarray(lengths, dtype=np.intp)
+        n, width = len(lengths), int(lengths.max()) if len(lengths) else 0
+        if lengths.sum() != len(speeds) or len(heart_rates) != len(speeds):
+            raise ValueError("speeds/heart_rates passen nicht zu lengths.")
+        test_ids = np.repeat(np.arange(n), lengths)
+        order = np.lexsort((speeds, test_ids))
+        cols = np.arange(len(speeds)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        # Aufgefüllte (N x max. Stufen) Matrizen; Füllwerte = letzte Stufe des Tests
+        self._x = np.full((n, max(width, 1)), np.nan)
+        self._y = np.full((n, max(width, 1)), np.nan)
+        self._x[test_ids, cols], self._y[test_ids, cols] = speeds[order], heart_rates[order]
+        last = np.maximum(lengths - 1, 0)
+        pad = np.arange(self._x.shape[1]) >= lengths[:, None]
+        self._x = np.where(pad, self._x[np.arange(n), last][:, None], self._x)
+        self._y = np.where(pad, self._y[np.arange(n), last][:, None], self._y)
+        self.mode, self.lengths = mode, lengths
+        self._splines = None
+        if mode == "spline":
+            self._splines = [_spline(self._x[i, :k], self._y[i, :k]) if k >= 4 else None
+                             for i, k in enumerate(lengths)]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __call__(self, v):
+        v = np.asarray(v, dtype=float)
+        q = v.reshape(len(self.lengths), v.size // max(len(self.lengths), 1))
+        rows = np.arange(len(q))[:, None]
+        k = self.lengths[:, None]
+        # Segment je Query: letzte Stufe <= v, auf [1, k-1] begrenzt -> Randsegmente extrapolieren
+        hi = np.clip((self._x[:, None, :] <= q[..., None]).sum(axis=-1), 1, np.maximum(k - 1, 1))
+        hi = np.minimum(hi, np.maximum(k - 1, 0))
+        lo = np.maximum(hi - 1, 0)
+        x0, x1, y0, y1 = self._x[rows, lo], self._x[rows, hi], self._y[rows, lo], self._y[rows, hi]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = y0 + np.where(x1 > x0, (y1 - y0) / (x1 - x0), 0.0) * (q - x0)
+        if self._splines is not None:
+            v_lo, v_hi = self._x[:, :1], self._x[rows[:, 0], np.maximum(self.lengths - 1, 0)][:, None]
+            inside = np.clip(q, v_lo, v_hi)
+            for i, spl in enumerate(self._splines):
+                # NaN nicht an FITPACK geben: splev verliert sonst die Intervallsuche für die übrigen Punkte
+                finite = np.isfinite(inside[i])
+                if spl is not None and finite.any():
+                    # Spline innerhalb, Randsegment-Steigung außerhalb (wie HRModel)
+                    x = inside[i, finite]
+                    out[i, finite] += spl(x) - np.interp(x, self._x[i, :self.lengths[i]], self._y[i, :self.lengths[i]])
+        out[self.lengths == 0] = np.nan
+        return out.reshape(v.shape)
+
+    def bpm(self, v):
+        """Abgeschnittene HF als float-Array (NaN bleibt NaN)."""
+        return np.trunc(self(v))
+
+
+def _secant(x0, x1, y0, y1):
+    return (y1 - y0) / (x1 - x0) if x1 > x0 else 0.0
+
+
+# ==========================================
+# HILFSFUNKTIONEN
+# ==========================================
+@profiling.timed("_generate_output")
+def _generate_output(m_type, raw_lt2, final_v, lt2_hr, vo2max=None):
+    return ThresholdResult(m_type, raw_lt2, final_v, lt2_hr, vo2max).to_dict()
+
+def _fmt_pace(v):
+    s = int((60/v)*60) if v > 0 else 0
+    return f"{s // 60}:{s % 60:02d}"
+
+def _spline(x, y):
+    # scipy erst beim ersten Fit laden: View-Links mit gecachtem Ergebnis brauchen es nie
+    from scipy.interpolate import UnivariateSpline
+    return UnivariateSpline(x, y, s=0.5)
+
+def solve_dmax(l_spline, v_lo, v_hi, solver="grid", precision=2, grid_points=100):
+    """
+    Dmax-Punkt eines Laktat-Splines zwischen v_lo und v_hi (Kurve bei 0.5 mmol gekappt).
+    "grid": Argmax auf dem Feingitter (Auflösung = Gitterschritt).
+    "analytic": Stelle, an der die Tangente die Sehnen-Steigung hat, exakt über
+    die Nullstellen der Spline-Ableitung (s'(v) = Sehnen-Steigung) je Knoten-Intervall.
+    """
+    if solver == "grid":
+        v_fine = np.linspace(v_lo, v_hi, grid_points)
+        l_fine = np.clip(l_spline(v_fine), 0.5, None)
+        return round(float(v_fine[_dmax_index(v_fine, l_fine)]), precision)
+    if solver != "analytic":
+        raise ValueError(f"Unbekannter Dmax-Solver: {solver}")
+
+    # Je Knoten-Intervall ist der Spline ein exaktes kubisches Polynom um die Mitte:
+    # s(mid + u) = c0 + c1*u + c2*u^2 + c3*u^3 (Koeffizienten aus den Ableitungen)
+    knots = [float(x) for x in l_spline.get_knots() if v_lo < x < v_hi]
+    edges = [float(v_lo)] + knots + [float(v_hi)]
+    pieces = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        d0, d1, d2, d3 = (float(x) for x in l_spline.derivatives((lo + hi) / 2))
+        pieces.append(((lo + hi) / 2, (hi - lo) / 2, (d0, d1, d2 / 2, d3 / 6)))
+
+    def cubic(c, u):
+        return c[0] + u * (c[1] + u * (c[2] + u * c[3]))
+
+    # Sehne zwischen den (gekappten) Endpunkten
+    l_lo = max(cubic(pieces[0][2], -pieces[0][1]), 0.5)
+    l_hi = max(cubic(pieces[-1][2], pieces[-1][1]), 0.5)
+    m = (l_hi - l_lo) / (v_hi - v_lo) if v_hi != v_lo else 0
+    b = l_lo - m * v_lo
+
+    # Kandidaten (v, Laktat): Endpunkte und Stellen mit Tangente = Sehne,
+    # d.h. s'(v) - m = 0  ->  3*c3*u^2 + 2*c2*u + (c1 - m) = 0
+    candidates = [(float(v_lo), l_lo), (float(v_hi), l_hi)]
+    clipped = l_lo <= 0.5 or l_hi <= 0.5
+    for mid, half, c in pieces:
+        candidates += [(mid + u, cubic(c, u)) for u in _quadratic_roots(3 * c[3], 2 * c[2], c[1] - m, half)]
+        # Lokale Minima des Splines für die Prüfung auf die 0.5-mmol-Kappung
+        clipped = clipped or any(cubic(c, u) < 0.5 for u in _quadratic_roots(3 * c[3], 2 * c[2], c[1], half))
+
+    # Kappung bei 0.5 mmol: Schnittpunkte mit 0.5 sind ebenfalls Kandidaten (selten)
+    if clipped:
+        for mid, half, c in pieces:
+            r = np.roots([c[3], c[2], c[1], c[0] - 0.5])
+            candidates += [(mid + u, 0.5) for u in r[np.isreal(r)].real if abs(u) <= half]
+
+    # Größter Abstand Sehne - Kurve; bei Gleichstand der kleinste Speed (wie argmax im Gitter)
+    candidates.sort()
+    best_v, best_d = candidates[0][0], -math.inf
+    for v, l in candidates:
+        d = 0.0 if v in (v_lo, v_hi) else (m * v + b) - max(l, 0.5)
+        if d > best_d:
+            best_v, best_d = v, d
+    return round(float(best_v), precision)
+
+def _quadratic_roots(a, b, c, half):
+    """Reelle Nullstellen u von a*u^2 + b*u + c mit |u| <= half."""
+    if abs(a) <= 1e-12 * (abs(b) + abs(c) + 1e-300):
+        roots = [-c / b] if b != 0 else []
+    else:
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return []
+        sq = math.sqrt(disc)
+        roots = [(-b + sq) / (2 * a), (-b - sq) / (2 * a)]
+    return [u for u in roots if abs(u) <= half]
+
+def _dmax_index(v_fine, l_fine):
+    """Index des Dmax-Punkts entlang der letzten Achse (Einzeltest oder N x Gitter)."""
+    v_min, l_min = v_fine[..., :1], l_fine[..., :1]
+    v_end, l_end = v_fine[..., -1:], l_fine[..., -1:]
+    span = v_end - v_min
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = np.where(span != 0, (l_end - l_min) / span, 0.0)
+    b = l_min - m * v_min
+    distances = (m * v_fine + b) - l_fine
+    return np.argmax(distances, axis=-1)
+
+def _vo2max_aero(v_max, weight, height, shoulder_width):
+    """VO2max aus vMax plus Luftwiderstandsanteil (Skalar oder Array)."""
+    # Frontalfläche A in m^2
+    area = (height / 100.0) * (shoulder_width / 100.0) * 0.75
+    p_aero = 0.5 * 1.225 * 0.9 * area * ((v_max / 3.6) ** 3)
+    return ((0.2 * (v_max * 16.667)) + 3.5) + ((p_aero * 12.0) / weight)
+
+@profiling.timed("vectrx_api_handler")
+def vectrx_api_handler(payload, as_object=False):
     protocol = payload.get('protocol', 'hyrox')
     if protocol == 'run':
-        return run_protocol_engine(payload)
-    return hyrox_protocol_engine(payload)
+        return run_protocol_engine(payload, as_object=as_object)
+    return hyrox_protocol_engine(payload, as_object=as_object)
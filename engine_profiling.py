@@ -0,0 +1,250 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# ==========================================
+# ENGINE-PROFILING: Timer, Zähler, Histogramme (opt-in)
+# ==========================================
+# Abgeschaltet kostet jeder Messpunkt nur eine Flag-Abfrage. Eingeschaltet landet
+# jede Stufe (Spline-Fit, Dmax, Engine-Aufruf, ...) in einem Histogramm; Sinks
+# exportieren den Stand als Log, Prometheus-Textdatei oder für das Debug-Panel.
+BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0)
+
+log = logging.getLogger("vectrx.profile")
+
+
+class Histogram:
+    """Kumulative Buckets wie bei Prometheus, dazu Summe und Anzahl (ms)."""
+
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += ms
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        """Obergrenze des Buckets, in dem das q-Quantil liegt (grob, aber ohne Samples)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "sum_ms": round(self.total, 4),
+                "mean_ms": round(self.total / self.count, 4) if self.count else 0.0,
+                "p50_ms": self.quantile(0.5), "p95_ms": self.quantile(0.95), "p99_ms": self.quantile(0.99),
+                "max_ms": round(self.max, 4)}
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.sinks = []
+        self.flush_interval = None
+        self.last_flush = time.monotonic()
+
+
+_STATE = _State()
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        if exc_type is not None:
+            count(f"{self.name}_errors")
+        return False
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def stage(name):
+    """Context-Manager für einen Abschnitt: `with stage("spline_fit"): ...`."""
+    return _Timer(name) if _STATE.enabled else _NO_TIMER
+
+
+def timed(name):
+    """Decorator: misst jeden Aufruf der Funktion unter `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _STATE.enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def count(name, n=1):
+    if not _STATE.enabled:
+        return
+    with _STATE.lock:
+        _STATE.counters[name] = _STATE.counters.get(name, 0) + n
+
+
+def observe(name, ms):
+    if not _STATE.enabled:
+        return
+    with _STATE.lock:
+        hist = _STATE.histograms.get(name)
+        if hist is None:
+            hist = _STATE.histograms[name] = Histogram()
+        hist.observe(ms)
+    if _STATE.flush_interval is not None and time.monotonic() - _STATE.last_flush >= _STATE.flush_interval:
+        flush()
+
+
+# ==========================================
+# STEUERUNG
+# ==========================================
+def enable(*sinks, flush_interval=None):
+    """Schaltet die Messung ein; flush_interval (s) exportiert automatisch an die Sinks."""
+    with _STATE.lock:
+        _STATE.sinks = list(sinks)
+        _STATE.flush_interval = flush_interval
+        _STATE.last_flush = time.monotonic()
+        _STATE.enabled = True
+
+
+def disable():
+    flush()
+    _STATE.enabled = False
+
+
+def is_enabled():
+    return _STATE.enabled
+
+
+def reset():
+    with _STATE.lock:
+        _STATE.histograms.clear()
+        _STATE.counters.clear()
+
+
+def snapshot():
+    """Aktueller Stand: {"stages": {name: summary}, "counters": {...}}."""
+    with _STATE.lock:
+        return {"stages": {k: h.summary() for k, h in sorted(_STATE.histograms.items())},
+                "counters": dict(sorted(_STATE.counters.items()))}
+
+
+def flush():
+    _STATE.last_flush = time.monotonic()
+    if not _STATE.sinks:
+        return
+    snap = snapshot()
+    with _STATE.lock:
+        buckets = {k: (list(h.counts), h.total, h.count) for k, h in _STATE.histograms.items()}
+    for sink in list(_STATE.sinks):
+        try:
+            sink.export(snap, buckets)
+        except Exception:
+            log.exception("Profiling-Sink %s fehlgeschlagen", type(sink).__name__)
+
+
+# ==========================================
+# SINKS
+# ==========================================
+class LogSink:
+    """Schreibt den Snapshot als eine JSON-Zeile ins Log."""
+
+    def __init__(self, logger=log, level=logging.INFO):
+        self.logger, self.level = logger, level
+
+    def export(self, snap, buckets):
+        self.logger.log(self.level, json.dumps(snap))
+
+
+class PrometheusFileSink:
+    """
+    Prometheus-Textformat für den node_exporter textfile collector (atomar ersetzt).
+    "{pid}" im Pfad ergibt eine Datei pro Worker-Prozess (Bulk-Runner, API-Pool).
+    """
+
+    def __init__(self, path, prefix="vectrx"):
+        self.path, self.prefix = path, prefix
+
+    def export(self, snap, buckets):
+        p = self.prefix
+        path = self.path.replace("{pid}", str(os.getpid()))
+        lines = [f"# TYPE {p}_stage_duration_ms histogram"]
+        for name, (counts, total, n) in sorted(buckets.items()):
+            cum = 0
+            for le, c in zip(BUCKETS_MS + ("+Inf",), counts):
+                cum += c
+                lines.append(f'{p}_stage_duration_ms_bucket{{stage="{name}",le="{le}"}} {cum}')
+            lines.append(f'{p}_stage_duration_ms_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{p}_stage_duration_ms_count{{stage="{name}"}} {n}')
+        lines.append(f"# TYPE {p}_events_total counter")
+        for name, val in snap["counters"].items():
+            lines.append(f'{p}_events_total{{event="{name}"}} {val}')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+
+class MemorySink:
+    """Behält den letzten Snapshot, z.B. für das Debug-Panel in der App."""
+
+    def __init__(self):
+        self.last = None
+
+    def export(self, snap, buckets):
+        self.last = snap
+
+
+def enable_from_env():
+    """VECTRX_PROFILE=1 schaltet mit Log-Sink ein, VECTRX_PROFILE_PROM=<datei> ergänzt Prometheus."""
+    if os.environ.get("VECTRX_PROFILE", "").lower() not in ("1", "true", "yes"):
+        return False
+    sinks = [LogSink()]
+    if os.environ.get("VECTRX_PROFILE_PROM"):
+        sinks.append(PrometheusFileSink(os.environ["VECTRX_PROFILE_PROM"]))
+    enable(*sinks, flush_interval=float(os.environ.get("VECTRX_PROFILE_INTERVAL", 60)))
+    return True
+
+
+enable_from_env()
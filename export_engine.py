@@ -0,0 +1,171 @@
+import numpy as np
+
+from core_engine import ZoneTable, hyrox_protocol_engine_batch, run_protocol_engine_batch
+
+# ==========================================
+# EXPORT-ENGINE: Ergebnisse spaltenweise (NumPy / Arrow / Parquet)
+# ==========================================
+# Statt verschachtelter Dicts mit formatierten Strings: je Kennzahl ein
+# zusammenhängendes 1-D-Array. Arrow-Arrays und pandas-Spalten zeigen auf denselben
+# Speicher (keine Kopie), Parquet wird in Row-Groups geschrieben.
+PROTOCOLS = ("run", "hyrox")
+# Codes wie metabolic_type_code der Hyrox-Batch-Engine, ergänzt um den Runner-Typ
+METABOLIC_TYPES = ("DIESEL / ENDURANCE", "TURBO / POWER", "PURE RUNNER")
+PURE_RUNNER = 2
+ZONE_COUNT = 5
+DEFAULT_ROW_GROUP = 64 * 1024
+
+# Spalten -> dtype (Reihenfolge = Reihenfolge im Export). HF als float (NaN = kein Ergebnis),
+# offene HF-Zonengrenzen = -1 wie in ZoneTable.
+SCHEMA = (
+    [("protocol_code", np.int8), ("status", np.int8), ("metabolic_type_code", np.int8),
+     ("raw_lt2_kmh", np.float64), ("final_pace_kmh", np.float64), ("lt2_heart_rate", np.float64),
+     ("vo2max_estimate", np.float64)]
+    + [(f"zone{i}_{k}", np.float64 if k == "pace_kmh" else np.int32)
+       for i in range(1, ZONE_COUNT + 1) for k in ("pace_kmh", "hr_low", "hr_high")]
+)
+CATEGORIES = {"protocol_code": PROTOCOLS, "metabolic_type_code": METABOLIC_TYPES}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as exc:
+        raise ImportError("Arrow/Parquet-Export benötigt pyarrow (pip install pyarrow).") from exc
+    return pa
+
+
+class ResultFrame:
+    """
+    Struct-of-Arrays mit festem Schema (SCHEMA); jede Spalte ein zusammenhängendes
+    1-D-Array. Kategorien (Protokoll, Stoffwechseltyp) als int8-Codes, die Klartexte
+    kommen erst als Dictionary (Arrow) bzw. Categorical (pandas) dazu.
+    """
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        n = {len(v) for v in columns.values()}
+        if len(n) > 1:
+            raise ValueError("Alle Spalten brauchen gleich viele Zeilen.")
+        self.columns = {name: np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in SCHEMA}
+
+    def __len__(self):
+        return len(self.columns["status"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_results(cls, protocol, status, raw_lt2_kmh, final_pace_kmh, lt2_heart_rate,
+                     metabolic_type_code, vo2max_estimate=None):
+        """Baut die Spalten aus Batch-Arrays; Zonengrenzen wie ThresholdResult.zones (via ZoneTable)."""
+        status = np.asarray(status)
+        n = len(status)
+        zones = ZoneTable(final_pace_kmh, lt2_heart_rate)
+        cols = {
+            "protocol_code": np.full(n, PROTOCOLS.index(protocol), dtype=np.int8),
+            "status": status,
+            "metabolic_type_code": metabolic_type_code,
+            "raw_lt2_kmh": raw_lt2_kmh,
+            "final_pace_kmh": final_pace_kmh,
+            "lt2_heart_rate": lt2_heart_rate,
+            "vo2max_estimate": np.full(n, np.nan) if vo2max_estimate is None else vo2max_estimate,
+        }
+        # (N x 5) -> (5 x N): jede Zonen-Spalte wird eine zusammenhängende Zeile
+        for key, mat in (("pace_kmh", zones.pace_kmh), ("hr_low", zones.hr_low), ("hr_high", zones.hr_high)):
+            rows = np.ascontiguousarray(mat.T)
+            for i in range(ZONE_COUNT):
+                cols[f"zone{i + 1}_{key}"] = rows[i]
+        return cls(cols)
+
+    @classmethod
+    def concat(cls, frames):
+        frames = list(frames)
+        return cls({name: np.concatenate([f.columns[name] for f in frames]) if frames else np.empty(0, dtype)
+                    for name, dtype in SCHEMA})
+
+    # ------------------------------------------
+    # Übergabe an Arrow / pandas (ohne Kopie)
+    # ------------------------------------------
+    def to_arrow(self):
+        """pyarrow.Table; numerische Spalten teilen sich den Speicher mit den NumPy-Arrays."""
+        pa = _pyarrow()
+        arrays, names = [], []
+        for name, _ in SCHEMA:
+            arr = pa.array(self.columns[name])
+            if name in CATEGORIES:
+                arr = pa.DictionaryArray.from_arrays(arr, pa.array(CATEGORIES[name]))
+                name = name[:-len("_code")]
+            arrays.append(arr)
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def to_pandas(self, categorical=True):
+        """DataFrame ohne Kopie der Zahlen-Spalten; Codes optional als Categorical."""
+        import pandas as pd
+        data = {}
+        for name, _ in SCHEMA:
+            col = self.columns[name]
+            if categorical and name in CATEGORIES:
+                data[name[:-len("_code")]] = pd.Categorical.from_codes(col, CATEGORIES[name])
+            else:
+                data[name] = col
+        return pd.DataFrame(data, copy=False)
+
+    def write_parquet(self, path, row_group_size=DEFAULT_ROW_GROUP, compression="zstd"):
+        with ParquetExporter(path, compression=compression) as out:
+            out.write(self, row_group_size=row_group_size)
+
+
+class ParquetExporter:
+    """
+    Hängt ResultFrames als Row-Groups an eine Parquet-Datei an (z.B. eine Saison
+    Chunk für Chunk, ohne alles im Speicher zu halten).
+    """
+
+    def __init__(self, path, compression="zstd"):
+        self.path, self.compression = path, compression
+        self._writer = None
+        self.rows = 0
+
+    def write(self, frame, row_group_size=DEFAULT_ROW_GROUP):
+        import pyarrow.parquet as pq
+        table = frame.to_arrow()
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self._writer.write_table(table, row_group_size=row_group_size)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# ==========================================
+# ENGINE -> SPALTEN
+# ==========================================
+def run_frame(speeds, lactates, heart_rates, lengths, weight_kg=75.0, height_cm=180.0,
+              shoulder_width_cm=45.0, v_max_all_out=None, hr_mode="spline"):
+    """run_protocol_engine_batch als ResultFrame (Runner: final = raw LT2, Typ PURE RUNNER)."""
+    res = run_protocol_engine_batch(speeds, lactates, heart_rates, lengths, weight_kg=weight_kg,
+                                    height_cm=height_cm, shoulder_width_cm=shoulder_width_cm,
+                                    v_max_all_out=v_max_all_out, hr_mode=hr_mode)
+    n = len(res["status"])
+    return ResultFrame.from_results("run", res["status"], res["lt2_kmh"], res["lt2_kmh"], res["lt2_heart_rate"],
+                                    np.full(n, PURE_RUNNER, dtype=np.int8), res["vo2max_estimate"])
+
+
+def hyrox_frame(speeds, lactates, heart_rates, weight_kg, bike_watt_avg, lactate_peak, lactate_flush_recovery):
+    """hyrox_protocol_engine_batch als ResultFrame (kein VO2max im Hyrox-Modell)."""
+    res = hyrox_protocol_engine_batch(speeds, lactates, heart_rates, weight_kg, bike_watt_avg,
+                                      lactate_peak, lactate_flush_recovery)
+    return ResultFrame.from_results("hyrox", res["status"], res["raw_lt2_kmh"], res["final_pace_kmh"],
+                                    res["lt2_heart_rate"], res["metabolic_type_code"])
@@ -0,0 +1,326 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import core_engine
+from bench_engine import environment, hyrox_payloads, run_payloads, synthetic_hyrox_columns, synthetic_run_columns
+from core_engine import vectrx_api_handler
+
+# ==========================================
+# LAST-TEST: synthetische Stufentests gegen API-Handler und App (headless)
+# ==========================================
+# Erzeugt realistische Lauf- und Hyrox-Payloads inkl. Grenzfällen, feuert sie mit
+# fester Parallelität auf vectrx_api_handler bzw. app_run.py (streamlit AppTest) und
+# misst Durchsatz, Latenz-Perzentile und Speicher pro Anfrage. Der JSON-Report ist
+# mit einer gespeicherten Baseline vergleichbar (wie bench_engine.py).
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_run.py")
+EDGE_KINDS = ("run_duplicate_speeds", "run_too_few_stages", "hyrox_duplicate_speeds",
+              "hyrox_negative_discriminant", "hyrox_collinear")
+APP_KINDS = ("app_view_legacy", "app_view_share", "app_view_duplicate_speeds", "app_edit")
+
+
+# ==========================================
+# PAYLOADS
+# ==========================================
+def _edge_case(kind, base_run, base_hyrox):
+    p = dict(base_hyrox if kind.startswith("hyrox") else base_run)
+    v = list(p["speeds_kmh"])
+    if kind == "run_duplicate_speeds":
+        v[-1] = v[-2]
+    elif kind == "run_too_few_stages":
+        p = {**p, **{k: p[k][:3] for k in ("speeds_kmh", "lactates_mmol", "heart_rates_bpm")}}
+        return p
+    elif kind == "hyrox_duplicate_speeds":
+        v[2] = v[1]
+    elif kind == "hyrox_negative_discriminant":
+        # Parabel mit Scheitel unter Baseline + 1.5 mmol: Mader-Schwelle ohne Lösung
+        b = p["lactates_mmol"][0]
+        p["lactates_mmol"] = [b, b + 1.0, b + 0.6]
+    elif kind == "hyrox_collinear":
+        b = p["lactates_mmol"][0]
+        p["lactates_mmol"] = [b + k * (v[2] - v[0]) / 2 * 0.8 for k in (0, 1, 2)]
+        v = [v[0], (v[0] + v[2]) / 2, v[2]]
+    p["speeds_kmh"] = v
+    return p
+
+
+def make_payloads(n, seed=42, hyrox_fraction=0.3, edge_fraction=0.1):
+    """[(art, payload)]: gültige Lauf-/Hyrox-Tests, ein Anteil davon als Grenzfall."""
+    rng = np.random.default_rng(seed)
+    runs = run_payloads(synthetic_run_columns(n, seed))
+    hyrox = hyrox_payloads(synthetic_hyrox_columns(n, seed + 1))
+    out = []
+    for i in range(n):
+        if rng.random() < edge_fraction:
+            kind = EDGE_KINDS[rng.integers(len(EDGE_KINDS))]
+            out.append((kind, _edge_case(kind, runs[i], hyrox[i])))
+        elif rng.random() < hyrox_fraction:
+            out.append(("hyrox", hyrox[i]))
+        else:
+            out.append(("run", runs[i]))
+    return out
+
+
+def make_app_sessions(n, seed=42, edge_fraction=0.1, edit_fraction=0.2):
+    """[(art, query_params)]: geteilte Links (Klartext/Binär), Editor-Aufrufe, Grenzfälle."""
+    import share_link
+
+    rng = np.random.default_rng(seed)
+    out = []
+    for i, p in enumerate(run_payloads(synthetic_run_columns(n, seed))):
+        v, l, h = p["speeds_kmh"], p["lactates_mmol"], p["heart_rates_bpm"]
+        r = rng.random()
+        if r < edge_fraction:
+            v = v[:-1] + [v[-2]]
+            kind = "app_view_duplicate_speeds"
+        elif r < edge_fraction + edit_fraction:
+            out.append(("app_edit", {"lvl": "Ambitioniert"}))
+            continue
+        else:
+            kind = "app_view_share" if i % 2 else "app_view_legacy"
+        if kind == "app_view_share":
+            params = {"mode": "view", "d": share_link.encode(v, l, h, p["weight_kg"], p["height_cm"], p["shoulder_width_cm"],
+                                                             first_name=f"Load{i}")}
+        else:
+            params = {"mode": "view", "w": str(p["weight_kg"]), "fn": f"Load{i}",
+                      **{k: ",".join(f"{x:g}" for x in vals) for k, vals in (("v", v), ("l", l), ("hr", h))}}
+        out.append((kind, params))
+    return out
+
+
+# ==========================================
+# EINZELANFRAGEN (laufen im Thread oder Worker-Prozess)
+# ==========================================
+def _init_worker(use_cache, db_path=None):
+    if not use_cache:
+        core_engine.configure_cache(maxsize=0)
+    if db_path:
+        os.environ["VECTRX_DB"] = db_path
+
+
+def _init_app_worker(use_cache, db_path):
+    _init_worker(use_cache, db_path)
+    # Exceptions der Grenzfälle landen im Report, nicht als Traceback im Log
+    logging.getLogger("streamlit").setLevel(logging.CRITICAL)
+    # Erster Lauf importiert Streamlit/App-Module: nicht mitmessen
+    _app_call({"mode": "view", "v": "10,12,14,16", "l": "1,2,4,8", "hr": "120,140,160,180"})
+
+
+def _api_call(payload):
+    t0 = time.perf_counter()
+    try:
+        res = vectrx_api_handler(payload)
+        outcome = "error" if isinstance(res, dict) and res.get("status") == "error" else "ok"
+    except Exception as exc:
+        outcome = f"exception:{type(exc).__name__}"
+    return (time.perf_counter() - t0) * 1000.0, outcome
+
+
+def _app_call(params):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    for k, v in params.items():
+        at.query_params[k] = v
+    # AppTest hängt das Skript als __main__ ein; danach zurücksetzen, sonst findet der
+    # Worker-Prozess die hier definierten Funktionen beim nächsten Job nicht mehr
+    main = sys.modules["__main__"]
+    t0 = time.perf_counter()
+    try:
+        at.run()
+        outcome = (f"exception:{at.exception[0].value.split(':')[0][:40]}" if len(at.exception)
+                   else "error" if len(at.error) else "ok")
+    except Exception as exc:
+        outcome = f"exception:{type(exc).__name__}"
+    finally:
+        sys.modules["__main__"] = main
+    return (time.perf_counter() - t0) * 1000.0, outcome
+
+
+def _memory_pass(call, items):
+    """Speicher-Spitze je Anfrage (tracemalloc, sequentiell, damit die Zuordnung stimmt)."""
+    peaks = defaultdict(list)
+    tracemalloc.start()
+    try:
+        for kind, item in items:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            call(item)
+            peaks[kind].append((tracemalloc.get_traced_memory()[1] - base) / 1024.0)
+    finally:
+        tracemalloc.stop()
+    return {kind: {"n": len(v), "peak_kb_p50": round(float(np.percentile(v, 50)), 1),
+                   "peak_kb_p95": round(float(np.percentile(v, 95)), 1)} for kind, v in sorted(peaks.items())}
+
+
+def _app_memory_pass(items):
+    return _memory_pass(_app_call, items)
+
+
+def _rss_kb():
+    # ru_maxrss: Linux KB, macOS Bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+# ==========================================
+# LASTLÄUFE
+# ==========================================
+def _summary(kinds, results, wall_s):
+    lat = np.array([ms for ms, _ in results])
+    outcomes = defaultdict(int)
+    by_kind = defaultdict(list)
+    for kind, (ms, outcome) in zip(kinds, results):
+        outcomes[outcome] += 1
+        by_kind[kind].append((ms, outcome))
+
+    def pct(a):
+        return {"p50": round(float(np.percentile(a, 50)), 3), "p90": round(float(np.percentile(a, 90)), 3),
+                "p95": round(float(np.percentile(a, 95)), 3), "p99": round(float(np.percentile(a, 99)), 3),
+                "max": round(float(a.max()), 3), "mean": round(float(a.mean()), 3)}
+
+    return {
+        "requests": len(results), "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(results) / wall_s, 2) if wall_s > 0 else None,
+        "latency_ms": pct(lat) if len(lat) else {},
+        "outcomes": dict(sorted(outcomes.items())),
+        "by_kind": {kind: {"n": len(v), **pct(np.array([ms for ms, _ in v])),
+                           "not_ok": sum(o != "ok" for _, o in v)} for kind, v in sorted(by_kind.items())},
+    }
+
+
+def run_api_load(items, concurrency, processes=False, use_cache=False):
+    """vectrx_api_handler mit `concurrency` Threads (wie App-Sessions) oder Prozessen (wie api_run)."""
+    kinds, payloads = zip(*items)
+    if processes:
+        ex = ProcessPoolExecutor(concurrency, initializer=_init_worker, initargs=(use_cache,))
+        list(ex.map(_api_call, payloads[:concurrency]))  # Worker hochfahren
+    else:
+        _init_worker(use_cache)
+        ex = ThreadPoolExecutor(concurrency)
+    with ex:
+        t0 = time.perf_counter()
+        results = list(ex.map(_api_call, payloads, chunksize=16 if processes else 1))
+        wall = time.perf_counter() - t0
+    return {"concurrency": concurrency, "executor": "process" if processes else "thread",
+            **_summary(kinds, results, wall), "rss_kb": _rss_kb()}
+
+
+def run_app_load(items, concurrency, use_cache=False, db_path=None):
+    """
+    app_run.py headless über AppTest. AppTest ist nicht thread-sicher (globale Runtime),
+    daher ein Worker-Prozess pro gleichzeitiger Session, wie getrennte Server-Prozesse.
+    """
+    kinds, params = zip(*items)
+    with ProcessPoolExecutor(concurrency, initializer=_init_app_worker, initargs=(use_cache, db_path)) as ex:
+        list(ex.map(time.sleep, [0.0] * concurrency))  # warten, bis alle Worker aufgewärmt sind
+        t0 = time.perf_counter()
+        results = list(ex.map(_app_call, params))
+        wall = time.perf_counter() - t0
+    return {"concurrency": concurrency, "executor": "process", **_summary(kinds, results, wall)}
+
+
+def app_memory(items, use_cache=False, db_path=None):
+    with ProcessPoolExecutor(1, initializer=_init_app_worker, initargs=(use_cache, db_path)) as ex:
+        return ex.submit(_app_memory_pass, items).result()
+
+
+# ==========================================
+# VERGLEICH MIT BASELINE
+# ==========================================
+def compare_to_baseline(report, baseline, tolerance=0.2):
+    """
+    Regression, wenn p95 um mehr als `tolerance` steigt oder der Durchsatz entsprechend fällt.
+    Nur bei gleicher Konfiguration (Anzahl, Mischung, Seed) vergleichbar, sonst leer.
+    """
+    if baseline.get("config") != report["config"]:
+        return []
+    out = []
+    for target, runs in report["targets"].items():
+        base = {r["concurrency"]: r for r in baseline.get("targets", {}).get(target, [])}
+        for r in runs:
+            b = base.get(r["concurrency"])
+            if b is None or not b.get("latency_ms") or not r.get("latency_ms"):
+                continue
+            p95_ratio = r["latency_ms"]["p95"] / b["latency_ms"]["p95"] if b["latency_ms"]["p95"] else None
+            tput_ratio = r["throughput_rps"] / b["throughput_rps"] if b["throughput_rps"] else None
+            out.append({"target": target, "concurrency": r["concurrency"],
+                        "p95_ms": [b["latency_ms"]["p95"], r["latency_ms"]["p95"]],
+                        "throughput_rps": [b["throughput_rps"], r["throughput_rps"]],
+                        "regression": bool((p95_ratio and p95_ratio > 1 + tolerance)
+                                           or (tput_ratio and tput_ratio < 1 / (1 + tolerance)))})
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="VECTR-X Last-Test für API-Handler und App")
+    parser.add_argument("--target", default="both", choices=["api", "app", "both"])
+    parser.add_argument("--concurrency", default="1,4,16", help="Parallelitätsstufen (kommagetrennt)")
+    parser.add_argument("--requests", type=int, default=2000, help="API-Anfragen pro Stufe")
+    parser.add_argument("--app-requests", type=int, default=40, help="App-Sessions pro Stufe")
+    parser.add_argument("--api-processes", action="store_true", help="API über Prozesse statt Threads")
+    parser.add_argument("--hyrox-fraction", type=float, default=0.3, help="Anteil Hyrox-Payloads")
+    parser.add_argument("--edge-fraction", type=float, default=0.1, help="Anteil Grenzfälle")
+    parser.add_argument("--memory-sample", type=int, default=200, help="Anfragen für die Speicher-Messung (0 = aus)")
+    parser.add_argument("--cache", action="store_true", help="Ergebnis-Cache eingeschaltet lassen")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="JSON-Report schreiben (Default: stdout)")
+    parser.add_argument("--baseline", default="load_baseline.json", help="Gespeicherte Baseline zum Vergleich")
+    parser.add_argument("--save-baseline", action="store_true", help="Report als neue Baseline speichern")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Erlaubte Verschlechterung (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.concurrency.split(",")]
+    report = {"environment": environment(),
+              "config": {k: getattr(args, k) for k in ("target", "concurrency", "requests", "app_requests", "api_processes",
+                                                       "hyrox_fraction", "edge_fraction", "cache", "seed")},
+              "targets": {}, "memory": {}}
+
+    if args.target in ("api", "both"):
+        items = make_payloads(args.requests, args.seed, args.hyrox_fraction, args.edge_fraction)
+        report["targets"]["api"] = [run_api_load(items, c, args.api_processes, args.cache) for c in levels]
+        if args.memory_sample:
+            _init_worker(args.cache)
+            report["memory"]["api"] = _memory_pass(_api_call, items[:args.memory_sample])
+
+    if args.target in ("app", "both"):
+        # Editor-Sessions schreiben nichts, das Archiv landet trotzdem nicht im Repo
+        db_path = os.environ.get("VECTRX_DB") or os.path.join(tempfile.mkdtemp(prefix="vectrx-load-"), "load.db")
+        sessions = make_app_sessions(args.app_requests, args.seed, args.edge_fraction)
+        report["targets"]["app"] = [run_app_load(sessions, c, args.cache, db_path) for c in levels]
+        if args.memory_sample:
+            report["memory"]["app"] = app_memory(sessions[:min(args.memory_sample, len(sessions))], args.cache, db_path)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get("config") != report["config"]:
+            print(f"Baseline {args.baseline} hat eine andere Konfiguration, kein Vergleich.", file=sys.stderr)
+        report["baseline_comparison"] = compare_to_baseline(report, baseline, args.tolerance)
+        regressions = [r for r in report["baseline_comparison"] if r["regression"]]
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            fh.write(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['target']} c={r['concurrency']}: p95 {r['p95_ms'][0]} -> {r['p95_ms'][1]} ms, "
+              f"{r['throughput_rps'][0]} -> {r['throughput_rps'][1]} req/s", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
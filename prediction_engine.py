@@ -0,0 +1,121 @@
+import functools
+
+import numpy as np
+
+# ==========================================
+# PROGNOSE- UND ZONEN-ENGINE (vektorisiert)
+# ==========================================
+# Wettkampfzeiten für beliebige Distanzen x Leistungsniveaus x LT2-Arrays in einem
+# Broadcast. Jede Distanz/Niveau-Kombination reduziert sich auf zwei Koeffizienten:
+#   bis 10 km:  t = (d - Startbonus) / v_eff
+#   darüber:    t = d / (v_eff * (1 - Ermüdung * d / v_eff / 7200)) = d / (v_eff - Ermüdung * d / 7200)
+# also t = a / (v_eff - c) mit v_eff = LT2 * Speed-Faktor / 3.6. Die (Niveau x Distanz)-
+# Tabellen für a und c werden je Distanz-Satz einmal berechnet und gecacht.
+
+# Faktoren (Startbonus m, Speed-Faktor, Ermüdungsrate) je Leistungsniveau
+LEVEL_FACTORS = {"Elite": (500, 1.02, 0.02), "Ambitioniert": (350, 1.0, 0.04)}
+LEVEL_DEFAULT = (150, 0.96, 0.08)
+LEVELS = tuple(LEVEL_FACTORS)          # Zeile len(LEVELS) der Tabellen = Default-Niveau
+SHORT_MAX_M = 10000                    # bis hier gilt das Modell ohne Ermüdungsterm
+
+# Standard-Distanzen der App (Meter, Kurzname)
+RACE_DISTANCES = ((5000, "5K"), (10000, "10K"), (21097, "HM"), (42195, "M"))
+
+
+@functools.lru_cache(maxsize=64)
+def _tables(distances):
+    """(a, c, f_cs) für ein Distanz-Tupel: a, c als (Niveaus+1 x D), f_cs als (Niveaus+1,)."""
+    d = np.asarray(distances, dtype=float)
+    factors = np.array([LEVEL_FACTORS[name] for name in LEVELS] + [LEVEL_DEFAULT], dtype=float)
+    f_d, f_cs, f_dr = factors[:, :1], factors[:, 1], factors[:, 2:]
+    short = d <= SHORT_MAX_M
+    a = np.where(short, d - f_d, d)
+    c = np.where(short, 0.0, f_dr * d / 7200)
+    for arr in (a, c, f_cs):
+        arr.flags.writeable = False
+    return a, c, f_cs
+
+
+def level_index(level):
+    """Tabellenzeile(n) für Niveau-Namen (Skalar oder Array); unbekannt = Default-Niveau."""
+    names, inverse = np.unique(np.asarray(level, dtype=str), return_inverse=True)
+    rows = np.array([LEVELS.index(n) if n in LEVELS else len(LEVELS) for n in names], dtype=np.intp)
+    return rows[inverse].reshape(np.shape(level))
+
+
+def predict_times(lt2, distances=None, level="Ambitioniert"):
+    """
+    Prognostizierte Zeiten in s mit Form lt2.shape + (D,). `level` ist ein Name oder
+    ein zu lt2 passendes Array von Namen (ganzer Kader mit gemischten Niveaus).
+    Nicht erreichbare Langdistanzen (Ermüdung >= Tempo) werden NaN.
+    """
+    distances = tuple(d for d, _ in RACE_DISTANCES) if distances is None else tuple(float(d) for d in distances)
+    a, c, f_cs = _tables(distances)
+    lt2 = np.asarray(lt2, dtype=float)
+    rows = np.broadcast_to(level_index(level), lt2.shape)
+    v_eff = lt2 * f_cs[rows] / 3.6
+    denom = v_eff[..., None] - c[rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom > 0, a[rows] / denom, np.nan)
+
+
+def prediction_grid(lt2, distances=None, level="Ambitioniert"):
+    """Zeiten (s) und Durchschnittstempo (km/h) für alle LT2-Werte x Distanzen."""
+    d = np.asarray([d for d, _ in RACE_DISTANCES] if distances is None else distances, dtype=float)
+    time_s = predict_times(lt2, d, level)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed_kmh = d / time_s * 3.6
+    return {"distances_m": d, "time_s": time_s, "speed_kmh": speed_kmh}
+
+
+# ==========================================
+# TRAININGSZONEN (FatMax/LT1/LT2-basiert, wie im ZONEN-Tab)
+# ==========================================
+# (Untergrenze, Obergrenze) als (Anker, Faktor) bzw. (Anker, HF-Offset); None = offen
+ZONE_NAMES = ("RECOVERY", "LONG RUN", "TEMPO", "THRESHOLD", "HIT")
+_SPEED_BOUNDS = ((None, ("fatmax", 0.9)), (("fatmax", 0.9), ("lt1", 1.0)), (("lt1", 1.0), ("lt2", 0.95)),
+                 (("lt2", 0.95), ("lt2", 1.05)), (("lt2", 1.05), None))
+_HR_BOUNDS = ((None, ("hf_fatmax", 1.0, -10)), (("hf_fatmax", 1.0, -10), ("hf_lt1", 1.0, 0)),
+              (("hf_lt1", 1.0, 0), ("hf_lt2", 0.95, 0)), (("hf_lt2", 0.95, 0), ("hf_lt2", 1.03, 0)),
+              (("hf_lt2", 1.03, 0), None))
+
+
+def zone_bounds(fatmax, lt1, lt2, hf_fatmax, hf_lt1, hf_lt2):
+    """
+    Zonengrenzen für Arrays von Athleten: speed_low/speed_high (km/h, offen = NaN)
+    und hr_low/hr_high (bpm, offen = -1) jeweils mit Form (N, 5).
+    """
+    anchors = {k: np.atleast_1d(np.asarray(v, dtype=float)) for k, v in
+               (("fatmax", fatmax), ("lt1", lt1), ("lt2", lt2),
+                ("hf_fatmax", hf_fatmax), ("hf_lt1", hf_lt1), ("hf_lt2", hf_lt2))}
+    n = np.broadcast_shapes(*(a.shape for a in anchors.values()))
+
+    def speed(bound):
+        return np.full(n, np.nan) if bound is None else anchors[bound[0]] * bound[1]
+
+    def hr(bound):
+        # HF-Grenzen werden wie bisher abgeschnitten (int)
+        return np.full(n, -1.0) if bound is None else np.trunc(anchors[bound[0]] * bound[1]) + bound[2]
+
+    def monotonic(edges):
+        # LT1 kann über 0.95 * LT2 liegen: innere Grenzen von oben her kappen, damit jede
+        # Zone low <= high hat (TEMPO schrumpft dann auf einen Punkt statt sich umzudrehen)
+        return np.fmin.accumulate(edges[..., ::-1], axis=-1)[..., ::-1]
+
+    speed_edges = monotonic(np.stack([np.broadcast_to(speed(hi), n) for _, hi in _SPEED_BOUNDS[:-1]], axis=-1))
+    hr_edges = monotonic(np.stack([np.broadcast_to(hr(hi), n) for _, hi in _HR_BOUNDS[:-1]], axis=-1))
+    open_speed, open_hr = np.full(n + (1,), np.nan), np.full(n + (1,), -1.0)
+    return {
+        "names": ZONE_NAMES,
+        "speed_low": np.concatenate([open_speed, speed_edges], axis=-1),
+        "speed_high": np.concatenate([speed_edges, open_speed], axis=-1),
+        "hr_low": np.concatenate([open_hr, hr_edges], axis=-1).astype(np.int32),
+        "hr_high": np.concatenate([hr_edges, open_hr], axis=-1).astype(np.int32),
+    }
+
+
+def pace_seconds(speed_kmh):
+    """Pace in s/km (ganzzahlig abgeschnitten wie fmt_pace), 0 für Speeds <= 0.1."""
+    v = np.asarray(speed_kmh, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(v > 0.1, np.trunc(3600 / v), 0).astype(np.int64)
@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import struct
+
+import numpy as np
+
+from core_engine import cache_get, cache_put
+
+# ==========================================
+# SHARE-LINK: kompaktes Binärformat für "SEND TO ATHLETE"
+# ==========================================
+# Aufbau v1 (little endian), danach base64url ohne Padding:
+#   B version | B flags (bit0 Digest, bit1 All-Out) | B Stufen n
+#   4x H Biometrie: Gewicht, Größe, Schulterbreite (0.1), vMax (0.01)
+#   n x H Speed (0.01 km/h) | n x H Laktat (0.01 mmol) | n x B HF (bpm)
+#   5x Text (B Länge + UTF-8): Vorname, Nachname, Geburtstag, Sportart, Geschlecht
+#   optional 8 Byte Digest = SHA-256(Nutzdaten)[:8] -> Schlüssel des vorberechneten Ergebnisses
+VERSION = 1
+FLAG_DIGEST = 0x01
+FLAG_ALL_OUT = 0x02
+DIGEST_BYTES = 8
+TEXT_FIELDS = ("first_name", "last_name", "birthday", "sport", "gender")
+_HEAD = struct.Struct("<BBBHHHH")
+
+
+class ShareLink:
+    """Dekodierter Link: Stufen als Arrays, Biometrie, Stammdaten, optional Digest."""
+
+    __slots__ = ("speeds", "lactates", "heart_rates", "weight_kg", "height_cm", "shoulder_width_cm",
+                 "v_max", "is_all_out", "first_name", "last_name", "birthday", "sport", "gender", "digest")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def cached_metrics(self):
+        """Vorberechnetes Ergebnis zum Digest (oder None): View-Modus ohne Engine-Lauf."""
+        if self.digest is None:
+            return None
+        hit, metrics = cache_get(_cache_key(self.digest))
+        return metrics if hit else None
+
+
+def _fixed(values, scale, dtype):
+    arr = np.rint(np.asarray(values, dtype=np.float64) * scale)
+    info = np.iinfo(dtype)
+    if arr.size and (arr.min() < info.min or arr.max() > info.max):
+        raise ValueError(f"Wert außerhalb des Link-Bereichs (max. {info.max / scale:g}).")
+    return arr.astype(dtype)
+
+
+def _cache_key(digest):
+    return f"share-{digest.hex()}"
+
+
+def encode(speeds, lactates, heart_rates, weight_kg=75.0, height_cm=180.0, shoulder_width_cm=45.0,
+           v_max=None, is_all_out=True, first_name="", last_name="", birthday="", sport="", gender="",
+           metrics=None):
+    """
+    Packt einen Test in den kompakten Link-Token. Mit `metrics` (Ergebnis von
+    calculate_metrics) wird ein Digest angehängt und das Ergebnis im Cache
+    hinterlegt, sofern die Quantisierung verlustfrei ist (App-Eingaben: 0.1er Schritte).
+    """
+    n = len(speeds)
+    if not n == len(lactates) == len(heart_rates) or n > 255:
+        raise ValueError("Speed, Laktat und HF brauchen gleich viele Stufen (max. 255).")
+    v_max = speeds[-1] if v_max is None else v_max
+    bio = [_fixed([weight_kg, height_cm, shoulder_width_cm], 10, np.uint16), _fixed([v_max], 100, np.uint16)]
+    v_q, l_q, h_q = _fixed(speeds, 100, np.uint16), _fixed(lactates, 100, np.uint16), _fixed(heart_rates, 1, np.uint8)
+
+    body = bytearray(_HEAD.pack(VERSION, FLAG_ALL_OUT if is_all_out else 0, n, *bio[0].tolist(), int(bio[1][0])))
+    body += v_q.astype("<u2").tobytes() + l_q.astype("<u2").tobytes() + h_q.tobytes()
+    for text in (first_name, last_name, birthday, sport, gender):
+        # Auf 255 Bytes kürzen, ohne ein Mehrbyte-Zeichen (Umlaut) zu zerschneiden
+        encoded = str(text or "").encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+        body += bytes([len(encoded)]) + encoded
+
+    raw = (speeds, lactates, heart_rates, [weight_kg, height_cm, shoulder_width_cm], [v_max])
+    if metrics is not None and _lossless(raw, (v_q / 100, l_q / 100, h_q, bio[0] / 10, bio[1] / 100)):
+        body[1] |= FLAG_DIGEST
+        digest = hashlib.sha256(body).digest()[:DIGEST_BYTES]
+        cache_put(_cache_key(digest), metrics)
+        body += digest
+    return base64.urlsafe_b64encode(bytes(body)).rstrip(b"=").decode("ascii")
+
+
+def decode(token):
+    """Gegenstück zu encode(); ValueError bei kaputten oder unbekannten Links."""
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, flags, n, w, h, s, vmax = _HEAD.unpack_from(data)
+    except (ValueError, struct.error, TypeError) as exc:
+        raise ValueError("Ungültiger Share-Link.") from exc
+    if version != VERSION:
+        raise ValueError(f"Share-Link Version {version} wird nicht unterstützt.")
+
+    pos = _HEAD.size
+    try:
+        speeds = np.frombuffer(data, "<u2", n, pos) / 100.0
+        lactates = np.frombuffer(data, "<u2", n, pos + 2 * n) / 100.0
+        heart_rates = np.frombuffer(data, np.uint8, n, pos + 4 * n).astype(np.float64)
+        pos += 5 * n
+        texts = []
+        for _ in TEXT_FIELDS:
+            size = data[pos]
+            texts.append(data[pos + 1:pos + 1 + size].decode("utf-8"))
+            pos += 1 + size
+    except (ValueError, IndexError, UnicodeDecodeError) as exc:
+        raise ValueError("Ungültiger Share-Link.") from exc
+
+    digest = None
+    if flags & FLAG_DIGEST:
+        digest = data[pos:pos + DIGEST_BYTES]
+        # Digest nur akzeptieren, wenn er zu den Nutzdaten passt
+        if len(digest) != DIGEST_BYTES or hashlib.sha256(data[:pos]).digest()[:DIGEST_BYTES] != digest:
+            digest = None
+
+    return ShareLink(speeds=speeds, lactates=lactates, heart_rates=heart_rates,
+                     weight_kg=w / 10.0, height_cm=h / 10.0, shoulder_width_cm=s / 10.0, v_max=vmax / 100.0,
+                     is_all_out=bool(flags & FLAG_ALL_OUT), digest=digest, **dict(zip(TEXT_FIELDS, texts)))
+
+
+def _lossless(raw, quantized):
+    return all(np.allclose(np.asarray(a, dtype=np.float64), b, rtol=0, atol=1e-9) for a, b in zip(raw, quantized))
@@ -0,0 +1,18 @@
+import pytest
+
+from core_engine import MSG_HYROX_STAGES, MSG_RUN_STAGES, MSG_STAGE_MISMATCH, vectrx_api_handler
+
+
+@pytest.mark.parametrize("payload, message", [
+    ({"protocol": "hyrox", "speeds_kmh": [10, 12], "lactates_mmol": [1, 2, 3], "heart_rates_bpm": [130, 140, 150]},
+     MSG_HYROX_STAGES),
+    ({"protocol": "hyrox", "speeds_kmh": [10, 12, 14], "lactates_mmol": [1, 2], "heart_rates_bpm": [130, 140, 150]},
+     MSG_STAGE_MISMATCH),
+    ({"protocol": "run", "speeds_kmh": [10, 12, 14, 16], "lactates_mmol": [1, 2, 3], "heart_rates_bpm": [1, 2, 3, 4]},
+     MSG_STAGE_MISMATCH),
+    ({"protocol": "run", "speeds_kmh": [10, 12, 14], "lactates_mmol": [1, 2, 3, 4], "heart_rates_bpm": [1, 2, 3, 4]},
+     MSG_RUN_STAGES),
+])
+def test_mismatched_stages_return_error_dict(payload, message):
+    # Vor dem Cache-Key geprüft: kein ValueError aus np.column_stack
+    assert vectrx_api_handler(payload) == {"status": "error", "message": message}
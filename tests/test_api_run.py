@@ -0,0 +1,54 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api_run import ApiServer, _json_safe, run_batch
+from core_engine import vectrx_api_handler
+
+RUN = {"protocol": "run", "speeds_kmh": [10, 12, 14, 16, 18], "lactates_mmol": [1.2, 1.8, 3.5, 6.5, 7.8],
+       "heart_rates_bpm": [135, 148, 162, 178, 184]}
+
+
+def test_json_safe_and_run_batch():
+    assert _json_safe({"a": [np.float64(np.nan), 1.5], "b": np.array([np.inf, 2.0]), "c": (1, "x")}) == \
+        {"a": [None, 1.5], "b": [None, 2.0], "c": [1, "x"]}
+    # Ein kaputter Payload reißt den Batch nicht mit
+    ok, bad = run_batch([RUN, {"speeds_kmh": None}])
+    assert ok == vectrx_api_handler(RUN)
+    assert bad["status"] == "error" and bad["message"].startswith("TypeError")
+
+
+async def _request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode() if not isinstance(body, bytes) else body
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+                 + data)
+    await writer.drain()
+    head, _, payload = (await reader.read()).partition(b"\r\n\r\n")
+    writer.close()
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_server_batches_and_routes():
+    async def scenario():
+        server = await ApiServer("127.0.0.1", 0, workers=2, window_ms=20, executor=ThreadPoolExecutor(2)).start()
+        try:
+            payloads = [{**RUN, "weight_kg": 60 + i} for i in range(6)]
+            replies = await asyncio.gather(*(_request(server.port, "POST", "/analyze", p) for p in payloads))
+            other = [await _request(server.port, "GET", "/analyze"),
+                     await _request(server.port, "GET", "/nope"),
+                     await _request(server.port, "POST", "/analyze", b"[1, 2]"),
+                     await _request(server.port, "POST", "/analyze", b"{kaputt")]
+            metrics = await _request(server.port, "GET", "/metrics")
+        finally:
+            await server.stop()
+        return payloads, replies, other, metrics
+
+    payloads, replies, other, (code, metrics) = asyncio.run(scenario())
+    assert [(200, vectrx_api_handler(p)) for p in payloads] == replies
+    assert [c for c, _ in other] == [405, 404, 400, 400]
+    assert code == 200 and metrics["requests"] == 8 and metrics["errors"] == 2
+    # Gleichzeitige Requests landen in gemeinsamen Micro-Batches
+    assert metrics["batches"] < 6
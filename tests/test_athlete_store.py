@@ -0,0 +1,56 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from athlete_store import AthleteStore
+from core_engine import calculate_metrics
+
+SPEEDS, LACTATES, HRS = [10.0, 12.0, 14.0, 16.0], [1.1, 1.6, 3.2, 6.0], [130.0, 142.0, 158.0, 171.0]
+
+
+@pytest.fixture
+def store():
+    with AthleteStore(":memory:") as s:
+        yield s
+
+
+def test_upsert_keeps_one_athlete_and_merges_fields(store):
+    a = store.upsert_athlete("Eva", "Muster", "1990-01-01", sport="run")
+    b = store.upsert_athlete("Eva", "Muster", "1990-01-01", squad="A")
+    assert a == b
+    assert store.find_athlete("Eva", "Muster", "1990-01-01")["sport"] == "run"
+    assert store.find_athlete("Eva", "Muster", "1990-01-01")["squad"] == "A"
+    assert store.find_athlete("Eva", "Muster") is None
+
+
+def test_save_and_query_tests(store):
+    aid = store.upsert_athlete("Eva", "Muster", squad="A")
+    metrics = calculate_metrics(SPEEDS, LACTATES, HRS, 17.0)
+    for day, shift in (("2026-01-10", 0.0), ("2026-03-10", 0.5), ("2026-02-10", 0.2)):
+        store.save_test(aid, np.array(SPEEDS) + shift, LACTATES, HRS, {**metrics, "lt2": metrics["lt2"] + shift},
+                        test_date=day, weight_kg=60.0, v_max=17.0)
+    store.save_test(aid, SPEEDS, LACTATES, HRS, metrics, test_date=date(2026, 4, 1), is_all_out=False)
+
+    last = store.last_tests(aid, n=2)
+    assert [t["test_date"] for t in last] == ["2026-04-01", "2026-03-10"]
+    assert last[0]["is_all_out"] is False and last[1]["weight_kg"] == 60.0
+    np.testing.assert_array_equal(last[1]["speeds"], np.array(SPEEDS) + 0.5)
+    assert last[1]["hf_lt2"] == metrics["hf_lt2"] and last[1]["vlamax_label"] == metrics["vlamax_label"]
+    assert [t["test_date"] for t in store.last_tests(aid, before="2026-03-10")] == ["2026-02-10", "2026-01-10"]
+
+    trend = store.trend(aid, metrics=("lt2",))
+    assert trend["test_date"] == ["2026-01-10", "2026-02-10", "2026-03-10", "2026-04-01"]
+    np.testing.assert_allclose(trend["lt2"], metrics["lt2"] + np.array([0.0, 0.2, 0.5, 0.0]))
+
+
+def test_squad_trend_and_unknown_metric(store):
+    for name in ("Eva", "Tom"):
+        aid = store.upsert_athlete(name, "Muster", squad="A")
+        store.save_test(aid, SPEEDS, LACTATES, HRS, {"lt2": 14.0}, test_date="2026-01-01")
+    store.upsert_athlete("Ina", "Muster", squad="B")
+    out = store.squad_trend("A", metrics=("lt2", "vo2max"))
+    assert out["name"] == ["Eva Muster", "Tom Muster"]
+    assert out["lt2"].tolist() == [14.0, 14.0] and np.isnan(out["vo2max"]).all()
+    with pytest.raises(ValueError):
+        store.trend(1, metrics=("vlamax_label",))
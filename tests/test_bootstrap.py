@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from core_engine import lt2_bootstrap
+
+V = [10, 12, 14, 16, 18]
+L = [1.2, 1.8, 3.5, 6.5, 7.8]
+HR = [135, 148, 162, 178, 184]
+
+
+def test_same_seed_same_ci_with_and_without_executor():
+    inline = lt2_bootstrap(V, L, HR, n_boot=2500, seed=7, chunk_size=1000, return_samples=True)
+    with ThreadPoolExecutor(3) as ex:
+        pooled = lt2_bootstrap(V, L, HR, n_boot=2500, seed=7, chunk_size=1000, executor=ex, return_samples=True)
+    assert inline["lt2_ci_kmh"] == pooled["lt2_ci_kmh"]
+    assert inline["lt2_hr_ci"] == pooled["lt2_hr_ci"]
+    assert (inline["samples_kmh"] == pooled["samples_kmh"]).all()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_run import run_bulk, score_chunk
+from core_engine import vectrx_api_handler
+
+CSV = """protocol,speeds_kmh,lactates_mmol,heart_rates_bpm,weight_kg,bike_watt_avg,lactate_peak,lactate_flush_recovery
+run,"10,12,14,16,18","1.2,1.8,3.5,6.5,7.8","135,148,162,178,184",70,,,
+run,"9,11,13,15","1.0,1.5,2.6,5.1","128,141,156,170",,,,
+run,,,,,,,
+run,"10,12,14","1,2,3","130,140,150",,,,
+run,"10,12,14,16","1,2,3","130,140,150,160",,,,
+run,"10,x,14,16","1,2,3,4","1,2,3,4",,,,
+run,"10,12,14,14","1,2,3,4","130,140,150,160",,,,
+hyrox,"10,10,12","1,2,3","130,140,150",80,300,12,8
+hyrox,"10,12,14","1,2,3.5","130,140,150",80,300,12,8
+hyrox,"10,12","1,2,3","130,140,150",80,300,12,8
+bike,"10,12,14","1.5,2.2,4.0","130,145,160",75,280,11,7
+,"10,12,14,16","1.1,1.6,3.2,6.0","130,142,158,171",,,,
+"""
+# Zonen unterscheiden sich bewusst (Text vs. numerische Grenzen), der Rest muss gleich sein
+NUMERIC = ("raw_lt2_kmh", "final_pace_kmh", "lt2_heart_rate", "vo2max_estimate")
+
+
+def test_columnar_matches_row_mode(tmp_path):
+    src = tmp_path / "archiv.csv"
+    src.write_text(CSV, encoding="utf-8")
+    out = {}
+    for columnar in (False, True):
+        dst = tmp_path / f"out_{columnar}.csv"
+        stats = run_bulk(str(src), str(dst), workers=1, chunk_size=5, progress=False, columnar=columnar)
+        assert stats["rows"] == 12
+        out[columnar] = pd.read_csv(dst)
+    row, col = out[False], out[True]
+
+    assert row["error"].fillna("").tolist() == col["error"].fillna("").tolist()
+    assert row["metabolic_type"].fillna("").tolist() == col["metabolic_type"].fillna("").tolist()
+    for c in NUMERIC:
+        np.testing.assert_allclose(row[c].to_numpy(float), col[c].to_numpy(float).round(2),
+                                   atol=0.011, equal_nan=True, err_msg=c)
+    # "bike" und leeres Protokoll rechnen wie im API-Handler als Hyrox bzw. Lauf
+    assert row["error"].isna().tolist() == [True, True] + [False] * 6 + [True, False, True, True]
+
+
+def test_row_mode_matches_api_handler():
+    # Stufen als Listen wie aus Parquet, alte Ergebnis-Spalten werden ersetzt
+    chunk = pd.DataFrame({"athlete": ["a", "b"],
+                          "speeds_kmh": [[10.0, 12.0, 14.0, 16.0], [10.0, 12.0, 14.0]],
+                          "lactates_mmol": [[1.1, 1.6, 3.2, 6.0], [1.0, 2.0, 3.5]],
+                          "heart_rates_bpm": [[130.0, 142.0, 158.0, 171.0], [130.0, 140.0, 150.0]],
+                          "protocol": [None, "hyrox"], "weight_kg": [70.0, 80.0], "bike_watt_avg": [np.nan, 300.0],
+                          "lactate_peak": [np.nan, 12.0], "lactate_flush_recovery": [np.nan, 8.0],
+                          "error": ["alt", "alt"]}, index=[7, 9])
+    out = score_chunk(chunk)
+    assert out.index.tolist() == [7, 9] and out["athlete"].tolist() == ["a", "b"]
+    assert list(out.columns).count("error") == 1 and out["error"].isna().all()
+    stages = ("speeds_kmh", "lactates_mmol", "heart_rates_bpm")
+    payloads = [{"protocol": "run", "weight_kg": 70.0, **{k: chunk[k].iloc[0] for k in stages}},
+                {"protocol": "hyrox", "weight_kg": 80.0, "bike_watt_avg": 300.0, "lactate_peak": 12.0,
+                 "lactate_flush_recovery": 8.0, **{k: chunk[k].iloc[1] for k in stages}}]
+    for i, payload in enumerate(payloads):
+        expected = vectrx_api_handler(payload)
+        assert out["metabolic_type"].iloc[i] == expected["metabolic_type"]
+        assert out["final_pace_kmh"].iloc[i] == expected["final_pace_kmh"]
+        assert out["target_pace_min_km"].iloc[i] == expected["target_pace_min_km"]
+        assert [out[f"zone{k}_hr"].iloc[i] for k in range(1, 6)] == [z["hr"] for z in expected["zones"]]
+
+
+def test_parquet_output_keeps_input_order(tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = [("run", f"{9 + i * 0.1:.1f},12,14,16", "1.1,1.6,3.2,6.0", "130,142,158,171") for i in range(23)]
+    src = tmp_path / "archiv.csv"
+    pd.DataFrame(rows, columns=["protocol", "speeds_kmh", "lactates_mmol", "heart_rates_bpm"]).to_csv(src, index=False)
+    stats = run_bulk(str(src), str(tmp_path / "out.parquet"), workers=2, chunk_size=4, progress=False)
+    assert stats == {**stats, "rows": 23, "errors": 0}
+    out = pd.read_parquet(tmp_path / "out.parquet")
+    assert out["speeds_kmh"].tolist() == [r[1] for r in rows]
+    assert out["raw_lt2_kmh"].notna().all()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from core_engine import run_protocol_engine
+from export_engine import PURE_RUNNER, SCHEMA, ResultFrame, hyrox_frame, run_frame
+
+RUNS = [([10.0, 12.0, 14.0, 16.0, 18.0], [1.2, 1.8, 3.5, 6.5, 7.8], [135.0, 148.0, 162.0, 178.0, 184.0]),
+        ([9.0, 11.0, 13.0], [1.0, 1.5, 2.6], [128.0, 141.0, 156.0]),
+        ([9.0, 11.0, 13.0, 15.0], [1.0, 1.5, 2.6, 5.1], [128.0, 141.0, 156.0, 170.0])]
+
+
+def _frame():
+    cat = lambda j: np.concatenate([r[j] for r in RUNS])
+    return run_frame(cat(0), cat(1), cat(2), [len(r[0]) for r in RUNS])
+
+
+def test_run_frame_matches_scalar_report():
+    frame = _frame()
+    assert [name for name, _ in SCHEMA] == list(frame.columns)
+    assert frame["status"].tolist() == [0, 1, 0]
+    assert (frame["metabolic_type_code"] == PURE_RUNNER).all()
+    for i in (0, 2):
+        v, l, h = RUNS[i]
+        report = run_protocol_engine({"speeds_kmh": v, "lactates_mmol": l, "heart_rates_bpm": h}, as_object=True)
+        assert frame["raw_lt2_kmh"][i] == report.raw_lt2_kmh
+        assert frame["lt2_heart_rate"][i] == report.lt2_heart_rate
+        for k, zone in enumerate(report.zones, start=1):
+            assert frame[f"zone{k}_pace_kmh"][i] == pytest.approx(zone.pace_kmh)
+            assert frame[f"zone{k}_hr_low"][i] == (-1 if zone.hr_low is None else zone.hr_low)
+            assert frame[f"zone{k}_hr_high"][i] == (-1 if zone.hr_high is None else zone.hr_high)
+    # Kein Ergebnis: NaN bzw. offene HF-Grenzen
+    assert np.isnan(frame["raw_lt2_kmh"][1]) and frame["zone3_hr_low"][1] == -1
+
+
+def test_frame_shape_and_concat():
+    frame = _frame()
+    hyrox = hyrox_frame([10.0, 12.0, 14.0], [1.0, 2.0, 3.5], [130.0, 140.0, 150.0], 80.0, 300.0, 12.0, 8.0)
+    both = ResultFrame.concat([frame, hyrox])
+    assert len(both) == 4 and both["protocol_code"].tolist() == [0, 0, 0, 1]
+    assert all(col.flags.c_contiguous and col.dtype == dtype for (_, dtype), col in zip(SCHEMA, both.columns.values()))
+    assert len(ResultFrame.concat([])) == 0
+    with pytest.raises(ValueError):
+        ResultFrame({"status": np.zeros(2), "raw_lt2_kmh": np.zeros(3)})
+
+
+def test_pandas_shares_memory():
+    frame = _frame()
+    df = frame.to_pandas()
+    assert np.shares_memory(df["raw_lt2_kmh"].to_numpy(), frame["raw_lt2_kmh"])
+    assert df["protocol"].tolist() == ["run"] * 3 and df["metabolic_type"][0] == "PURE RUNNER"
+    assert frame.to_pandas(categorical=False)["protocol_code"].tolist() == [0, 0, 0]
+
+
+def test_arrow_and_parquet_roundtrip(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    frame = _frame()
+    table = frame.to_arrow()
+    assert table.column("metabolic_type").to_pylist() == ["PURE RUNNER"] * 3
+    np.testing.assert_array_equal(table.column("raw_lt2_kmh").to_numpy(), frame["raw_lt2_kmh"])
+
+    path = str(tmp_path / "res.parquet")
+    frame.write_parquet(path, row_group_size=2)
+    meta = pq.ParquetFile(path).metadata
+    assert meta.num_rows == 3 and meta.num_row_groups == 2
+    back = pq.read_table(path).to_pandas()
+    np.testing.assert_array_equal(back["lt2_heart_rate"].to_numpy(), frame["lt2_heart_rate"])
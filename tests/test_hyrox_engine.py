@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from core_engine import STATUS_INVALID_PACES, STATUS_LINEAR_FIT, hyrox_protocol_engine, hyrox_protocol_engine_batch
+
+# Drei kollineare Laktatwerte: die Parabel entartet zur Geraden (a == 0)
+COLLINEAR = {"protocol": "hyrox", "speeds_kmh": [10.0, 12.0, 14.0], "lactates_mmol": [1.0, 2.0, 3.0],
+             "heart_rates_bpm": [140, 155, 170], "weight_kg": 80.0, "bike_watt_avg": 300.0,
+             "lactate_peak": 12.0, "lactate_flush_recovery": 8.0}
+
+
+def _batch(payloads):
+    cols = {k: np.array([p[k] for p in payloads], dtype=float) for k in payloads[0] if k != "protocol"}
+    return hyrox_protocol_engine_batch(cols["speeds_kmh"], cols["lactates_mmol"], cols["heart_rates_bpm"],
+                                       cols["weight_kg"], cols["bike_watt_avg"], cols["lactate_peak"],
+                                       cols["lactate_flush_recovery"])
+
+
+def _synthetic(n, seed=5):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        v = np.sort(rng.uniform(9, 16, 3)).round(1)
+        base = rng.uniform(0.8, 2.0)
+        out.append({"protocol": "hyrox", "speeds_kmh": v.tolist(),
+                    "lactates_mmol": (base + np.array([0, 1, 3]) * rng.uniform(0.5, 1.5)).round(1).tolist(),
+                    "heart_rates_bpm": [float(x) for x in np.sort(rng.integers(130, 190, 3))],
+                    "weight_kg": float(rng.uniform(55, 95)), "bike_watt_avg": float(rng.uniform(200, 400)),
+                    "lactate_peak": float(rng.uniform(8, 16)), "lactate_flush_recovery": float(rng.uniform(4, 12))})
+    return out
+
+
+def test_collinear_stages_use_linear_solve():
+    # Gerade l = 0.5 * v - 4, Mader-Schwelle bei 1.0 + 1.5 mmol -> 13 km/h
+    assert hyrox_protocol_engine(COLLINEAR)["raw_lt2_kmh"] == pytest.approx(13.0)
+
+
+def test_batch_matches_scalar():
+    payloads = _synthetic(200) + [COLLINEAR]
+    res = _batch(payloads)
+    assert res["status"][-1] == STATUS_LINEAR_FIT
+    for i, p in enumerate(payloads):
+        single = hyrox_protocol_engine(p)
+        if single.get("status") == "error":
+            assert res["status"][i] == STATUS_INVALID_PACES
+            continue
+        assert round(float(res["raw_lt2_kmh"][i]), 2) == single["raw_lt2_kmh"]
+        assert round(float(res["final_pace_kmh"][i]), 2) == single["final_pace_kmh"]
+        assert int(res["lt2_heart_rate"][i]) == single["lt2_heart_rate"]
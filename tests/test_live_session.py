@@ -0,0 +1,41 @@
+import pytest
+
+from core_engine import calculate_metrics
+from live_session import LiveSession
+
+STAGES = [(10.0, 1.2, 135), (12.0, 1.8, 148), (14.0, 3.5, 162), (16.0, 6.5, 178), (18.0, 7.8, 184)]
+
+
+def test_feed_add_remove_sequence():
+    session = LiveSession(v_max=19.0)
+    # Stufen in beliebiger Reihenfolge: bisect hält sie sortiert
+    updates = list(session.feed([STAGES[1], STAGES[0], STAGES[3], STAGES[2]]))
+    assert [u["status"] for u in updates] == ["waiting", "provisional", "provisional", "fitted"]
+    assert [u["stage_count"] for u in updates] == [1, 2, 3, 4]
+    assert [s[0] for s in session.stages] == [10.0, 12.0, 14.0, 16.0]
+
+    update = session.add_stage(*STAGES[4])
+    full = calculate_metrics(*map(list, zip(*STAGES)), 19.0)
+    # Voller Refit: identisch mit der Auswertung aller Stufen am Stück
+    assert update["lt2"] == full["lt2"] and update["hf_lt2"] == full["hf_lt2"]
+
+    # Korrektur bei gleichem Speed ersetzt die Messung
+    update = session.add_stage(14.0, 3.0, 160)
+    assert len(session) == 5 and session.stages[2] == (14.0, 3.0, 160.0)
+
+    update = session.remove_stage(18.0)
+    assert update["stage_count"] == 4 and update["status"] == "fitted"
+    update = session.remove_stage(16.0)
+    assert update["status"] == "provisional" and update["lt2"] is not None
+    # Unbekannter Speed ändert nichts
+    assert session.remove_stage(11.0)["stage_count"] == 3
+    assert session.last_update["stage_count"] == 3
+
+
+def test_provisional_thresholds_interpolate_linearly():
+    session = LiveSession()
+    session.add_stage(10, 1.0, 130)
+    update = session.add_stage(12, 3.0, 150)
+    # Baseline 1.0: +0.5 bei 10.5 km/h, +1.5 bei 11.5 km/h
+    assert update["lt1"] == pytest.approx(10.5) and update["lt2"] == pytest.approx(11.5)
+    assert update["hf_lt1"] == 135 and update["hf_lt2"] == 145
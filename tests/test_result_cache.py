@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from core_engine import ResultCache
+
+
+def _pkl(path):
+    return [n for n in os.listdir(path) if n.endswith(".pkl")]
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = ResultCache(maxsize=0, disk_dir=str(tmp_path), disk_maxsize=10)
+    for i in range(25):
+        cache.put(f"k{i}", {"i": i})
+        assert len(_pkl(tmp_path)) <= 10
+    # Neueste Einträge bleiben, älteste sind verdrängt
+    assert cache.get("k24") == (True, {"i": 24})
+    assert cache.get("k0") == (False, None)
+
+
+def test_disk_eviction_keeps_recently_read(tmp_path):
+    cache = ResultCache(maxsize=0, disk_dir=str(tmp_path), disk_maxsize=4)
+    for i in range(4):
+        cache.put(f"k{i}", i)
+        os.utime(tmp_path / f"k{i}.pkl", (1000 + i, 1000 + i))
+    assert cache.get("k0") == (True, 0)  # Lesen frischt k0 auf
+    cache.put("k4", 4)
+    assert cache.get("k0") == (True, 0)
+    assert cache.get("k1") == (False, None)
+
+
+def test_clear_removes_disk_entries(tmp_path):
+    cache = ResultCache(maxsize=8, disk_dir=str(tmp_path))
+    cache.put("k", {"lt2": 12.0})
+    cache.clear()
+    assert _pkl(tmp_path) == []
+    assert cache.get("k") == (False, None)
+    # Auch eine neue Instanz auf demselben Verzeichnis findet nichts mehr
+    assert ResultCache(disk_dir=str(tmp_path)).get("k") == (False, None)
+
+
+def test_hits_share_read_only_arrays(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    value = {"v_fine": np.arange(3.0), "zones": [{"name": "Z1"}]}
+    cache.put("k", value)
+    value["v_fine"][0] = 99.0  # Aufrufer behält seine beschreibbare Kopie
+    _, a = cache.get("k")
+    _, b = cache.get("k")
+    assert a["v_fine"][0] == 0.0 and a["v_fine"] is b["v_fine"]
+    with pytest.raises(ValueError):
+        a["v_fine"][0] = 1.0
+    # Container sind je Treffer neu
+    a["zones"][0]["name"] = "X"
+    assert cache.get("k")[1]["zones"][0]["name"] == "Z1"
+
+    # Auch von der Platte gelesene Werte sind eingefroren
+    disk = ResultCache(maxsize=0, disk_dir=str(tmp_path))
+    assert not disk.get("k")[1]["v_fine"].flags.writeable
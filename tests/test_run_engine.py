@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core_engine import STATUS_OK, STATUS_TOO_FEW_STAGES, run_protocol_engine, run_protocol_engine_batch
+
+
+def _synthetic(n, seed=3):
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        k = int(rng.integers(4, 9))
+        v = 8.0 + np.arange(k) * rng.uniform(1.0, 2.0)
+        base = rng.uniform(0.8, 1.6)
+        out.append({"speeds_kmh": v.round(1).tolist(),
+                    "lactates_mmol": (base + 0.05 * np.exp(rng.uniform(0.5, 0.9) * (v - v[0]))).round(1).tolist(),
+                    "heart_rates_bpm": (120 + 6 * (v - v[0]) + rng.normal(0, 2, k)).round().tolist(),
+                    "weight_kg": float(rng.uniform(55, 95)), "height_cm": float(rng.uniform(160, 200)),
+                    "shoulder_width_cm": float(rng.uniform(38, 50))})
+    return out
+
+
+def _batch(payloads, **kw):
+    cat = lambda k: np.concatenate([p[k] for p in payloads])
+    col = lambda k: np.array([p[k] for p in payloads])
+    return run_protocol_engine_batch(cat("speeds_kmh"), cat("lactates_mmol"), cat("heart_rates_bpm"),
+                                     [len(p["speeds_kmh"]) for p in payloads], col("weight_kg"),
+                                     col("height_cm"), col("shoulder_width_cm"), **kw)
+
+
+def test_batch_matches_scalar():
+    payloads = _synthetic(100)
+    res = _batch(payloads)
+    assert (res["status"] == STATUS_OK).all()
+    for i, p in enumerate(payloads):
+        single = run_protocol_engine(p)
+        assert res["lt2_kmh"][i] == single["raw_lt2_kmh"]
+        assert int(res["lt2_heart_rate"][i]) == single["lt2_heart_rate"]
+        assert res["vo2max_estimate"][i] == pytest.approx(single["vo2max_estimate"])
+
+
+def test_unsorted_input_and_short_tests():
+    payloads = _synthetic(3)
+    # Stufen in umgekehrter Reihenfolge: gleiches Ergebnis, vMax bleibt die letzte Eingabe-Stufe
+    shuffled = [{**p, **{k: p[k][::-1] for k in ("speeds_kmh", "lactates_mmol", "heart_rates_bpm")}}
+                for p in payloads]
+    vmax = [p["speeds_kmh"][-1] for p in payloads]
+    a, b = _batch(payloads, v_max_all_out=vmax), _batch(shuffled, v_max_all_out=vmax)
+    np.testing.assert_array_equal(a["lt2_kmh"], b["lt2_kmh"])
+    np.testing.assert_array_equal(a["lt2_heart_rate"], b["lt2_heart_rate"])
+
+    short = {**payloads[0], **{k: payloads[0][k][:3] for k in ("speeds_kmh", "lactates_mmol", "heart_rates_bpm")}}
+    res = _batch([payloads[1], short, payloads[2]])
+    assert res["status"].tolist() == [STATUS_OK, STATUS_TOO_FEW_STAGES, STATUS_OK]
+    assert np.isnan(res["lt2_kmh"][1]) and np.isnan(res["vo2max_estimate"][1])
+    assert res["lt2_kmh"][2] == a["lt2_kmh"][2]
@@ -0,0 +1,13 @@
+import share_link
+
+V, L, HR = [10, 12, 14, 16], [1.2, 1.8, 3.5, 6.5], [135, 148, 162, 178]
+
+
+def test_long_umlaut_name_truncated_on_character_boundary():
+    # "ab" + 200 x "ü" = 402 Bytes: ein reiner Byte-Schnitt bei 255 trifft mitten in ein "ü"
+    name = "ab" + "ü" * 200
+    data = share_link.decode(share_link.encode(V, L, HR, first_name=name))
+    first = data.first_name
+    assert name.startswith(first)
+    assert "�" not in first
+    assert len(first.encode("utf-8")) <= 255
@@ -0,0 +1,28 @@
+import numpy as np
+
+import threshold_engine
+from core_engine import clear_cache
+
+SPEEDS = np.array([10.0, 12.0, 14.0, 16.0, 18.0])
+LACTATES = np.array([1.2, 1.8, 3.5, 6.5, 7.8])
+HRS = np.array([135.0, 148.0, 162.0, 178.0, 184.0])
+
+
+def test_rerun_hits_cache_without_refit(monkeypatch):
+    clear_cache()
+    calls = []
+    batch = threshold_engine.threshold_methods_batch
+    monkeypatch.setattr(threshold_engine, "threshold_methods_batch", lambda *a, **kw: calls.append(1) or batch(*a, **kw))
+
+    first = threshold_engine.threshold_methods(SPEEDS, LACTATES, HRS)
+    # Gleiche Stufen in anderer Reihenfolge: derselbe kanonische Schlüssel
+    again = threshold_engine.threshold_methods(SPEEDS[::-1], LACTATES[::-1], HRS[::-1])
+    assert again == first and len(calls) == 1
+    assert first["dmax"]["heart_rate"] is not None
+
+    # Ohne HF ist ein anderer Eintrag
+    no_hr = threshold_engine.threshold_methods(SPEEDS, LACTATES)
+    assert len(calls) == 2 and no_hr["dmax"]["heart_rate"] is None
+    assert threshold_engine.threshold_methods(SPEEDS[:3], LACTATES[:3], HRS[:3]) is None
+    assert threshold_engine.threshold_methods(SPEEDS[:3], LACTATES[:3], HRS[:3]) is None
+    assert len(calls) == 3
@@ -0,0 +1,24 @@
+import math
+
+from view_report import fmt_pace, fmt_time, forecast_rows
+
+
+def t(de, en):
+    return de
+
+
+def test_forecast_rows_low_lt2_renders_placeholders():
+    # Hobby-Niveau mit LT2 1 km/h: Langdistanzen sind nicht erreichbar (NaN)
+    rows = forecast_rows(1.0, "Hobby", t)
+    assert any(math.isnan(t_s) for _, t_s, _ in rows)
+    for _, t_s, dist in rows:
+        time_txt, pace_txt = fmt_time(t_s), fmt_pace(dist / t_s * 3.6)
+        if math.isnan(t_s):
+            assert (time_txt, pace_txt) == ("--:--", "-:--")
+
+
+def test_fmt_time_and_pace_regular_values():
+    assert fmt_time(3725) == "01:02:05"
+    assert fmt_time(1199) == "19:59"
+    assert fmt_pace(12.0) == "5:00"
+    assert fmt_pace(0.0) == "-:--"
@@ -0,0 +1,35 @@
+import numpy as np
+
+from core_engine import calculate_metrics
+from prediction_engine import zone_bounds
+from view_report import zone_rows
+
+# Standard-Protokoll der App (app_run.py ohne URL-Parameter)
+V_DEF = [10, 12, 14, 16, 18]
+L_DEF = [1.2, 1.8, 3.5, 6.5, 7.8]
+HR_DEF = [135, 148, 162, 178, 184]
+
+
+def t(de, en):
+    return de
+
+
+def test_zones_monotonic_on_default_protocol():
+    m = calculate_metrics(np.array(V_DEF, float), np.array(L_DEF, float), np.array(HR_DEF, float), V_DEF[-1])
+    b = zone_bounds(*(m[k] for k in ("fatmax", "lt1", "lt2", "hf_fatmax", "hf_lt1", "hf_lt2")))
+    assert m["lt1"] > 0.95 * m["lt2"]  # genau der Fall, in dem TEMPO früher invertiert war
+    for lo, hi in ((b["speed_low"], b["speed_high"]), (b["hr_low"], b["hr_high"])):
+        # Nachbarzonen teilen sich die Grenze, innere Grenzen steigen nie
+        assert (lo[:, 1:] == hi[:, :-1]).all()
+        assert (np.diff(hi[:, :-1], axis=-1) >= 0).all()
+    for _, _, sp, _, hf in zone_rows(m, t):
+        for txt in (sp, hf):
+            if "-" in txt:
+                lo, hi = map(float, txt.split("-"))
+                assert lo <= hi
+
+
+def test_zone_bounds_unchanged_when_ordered():
+    b = zone_bounds(10.0, 11.0, 14.0, 140, 150, 170)
+    np.testing.assert_allclose(b["speed_high"][0, :4], [9.0, 11.0, 13.3, 14.7])
+    assert b["hr_high"][0, :4].tolist() == [130, 150, 161, 175]
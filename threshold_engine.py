@@ -0,0 +1,190 @@
+import numpy as np
+
+import engine_profiling as profiling
+from core_engine import (STATUS_OK, STATUS_TOO_FEW_STAGES, HRModelBatch, _dmax_index, _spline, cache_get,
+                         cache_put, payload_cache_key)
+
+# ==========================================
+# SCHWELLEN-ENGINE: mehrere Methoden aus einem Fit
+# ==========================================
+# Ein Spline-Fit pro Test liefert das gemeinsame Feingitter (N x 100); alle Methoden
+# sind danach reine NumPy-Operationen über diese Matrix, eine zusätzliche Methode
+# kostet also keinen weiteren Fit.
+GRID_POINTS = 100
+BASELINE_OFFSETS = (0.5, 1.0, 1.5)
+MOD_DMAX_RISE = 0.4          # Modified Dmax: Start vor dem ersten Anstieg > 0.4 mmol
+LOGLOG_MIN_POINTS = 5        # Mindestpunkte je Segment im Log-Log-Modell
+
+
+def method_names(baseline_offsets=BASELINE_OFFSETS):
+    return ["dmax", "mod_dmax", "obla_2", "obla_4", "loglog_lt1"] + [f"bsln+{x:g}" for x in baseline_offsets]
+
+
+def threshold_methods(speeds, lactates, heart_rates=None, baseline_offsets=BASELINE_OFFSETS):
+    """
+    Alle Schwellen-Methoden für einen Test:
+    {"dmax": {"speed_kmh": 13.1, "heart_rate": 162}, ...}; None für nicht definierte
+    Schwellen (z.B. OBLA 4, wenn 4 mmol im Test nicht erreicht werden).
+    Gibt None zurück, wenn weniger als 4 Stufen vorliegen. Ergebnisse liegen im
+    Ergebnis-Cache, ein Streamlit-Rerun mit denselben Messdaten fittet nicht neu.
+    """
+    key = payload_cache_key(speeds, lactates, np.zeros(len(speeds)) if heart_rates is None else heart_rates,
+                            None, None, None, None, protocol="methods",
+                            offsets=",".join(f"{x:g}" for x in baseline_offsets), has_hr=heart_rates is not None)
+    hit, out = cache_get(key)
+    if hit:
+        return out
+    res = threshold_methods_batch(speeds, lactates, heart_rates, [len(speeds)], baseline_offsets)
+    if res["status"][0] != STATUS_OK:
+        cache_put(key, None)
+        return None
+    out = {}
+    for name in method_names(baseline_offsets):
+        v = res[name][0]
+        hr = res.get(f"hr_{name}", [np.nan])[0]
+        out[name] = {"speed_kmh": None if np.isnan(v) else round(float(v), 2),
+                     "heart_rate": None if np.isnan(hr) else int(hr)}
+    cache_put(key, out)
+    return out
+
+
+def threshold_methods_batch(speeds, lactates, heart_rates, lengths, baseline_offsets=BASELINE_OFFSETS,
+                            hr_mode="spline"):
+    """
+    Batch-Variante (Eingabe spaltenweise wie run_protocol_engine_batch).
+    Rückgabe: status (N,), je Methode ein float-Array (N,) in km/h (NaN = nicht
+    definiert) und mit Herzfrequenzen zusätzlich hr_<methode> (HF am Schwellen-Speed,
+    hr_mode wie bei run_protocol_engine_batch).
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    lactates = np.asarray(lactates, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    has_hr = heart_rates is not None
+    heart_rates = np.asarray(heart_rates if has_hr else np.zeros_like(speeds), dtype=float)
+    n = len(lengths)
+
+    offsets = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1] != len(speeds) or len(lactates) != len(speeds) or len(heart_rates) != len(speeds):
+        raise ValueError("speeds/lactates/heart_rates passen nicht zu lengths.")
+
+    status = np.where(lengths >= 4, STATUS_OK, STATUS_TOO_FEW_STAGES)
+    ok = np.flatnonzero(status == STATUS_OK)
+    test_ids = np.repeat(np.arange(n), lengths)
+    order = np.lexsort((speeds, test_ids))
+    speeds, lactates, heart_rates = speeds[order], lactates[order], heart_rates[order]
+
+    # Gemeinsamer Fit: ein Spline pro Test, danach nur noch Gitter-Operationen
+    v_fine = np.linspace(speeds[offsets[ok]], speeds[offsets[ok + 1] - 1], GRID_POINTS, axis=-1)
+    l_fine = np.empty_like(v_fine)
+    with profiling.stage("methods_spline_fit"):
+        for row, i in enumerate(ok):
+            sl = slice(offsets[i], offsets[i + 1])
+            l_fine[row] = _spline(speeds[sl], lactates[sl])(v_fine[row])
+        hr_model = HRModelBatch(speeds, heart_rates, lengths, mode=hr_mode) if has_hr else None
+    l_fine = np.clip(l_fine, 0.5, None)
+
+    rows = np.arange(len(ok))
+    i_min = np.argmin(l_fine, axis=1)
+    l_base = l_fine[rows, i_min]
+
+    with profiling.stage("methods_eval"):
+        found = {
+            "dmax": v_fine[rows, _dmax_index(v_fine, l_fine)],
+            "mod_dmax": _mod_dmax(v_fine, l_fine, _mod_dmax_start(speeds, lactates, offsets, ok)),
+            "obla_2": _first_crossing(v_fine, l_fine, np.full(len(ok), 2.0), i_min),
+            "obla_4": _first_crossing(v_fine, l_fine, np.full(len(ok), 4.0), i_min),
+            "loglog_lt1": _loglog_breakpoint(v_fine, l_fine),
+        }
+        for x in baseline_offsets:
+            found[f"bsln+{x:g}"] = _first_crossing(v_fine, l_fine, l_base + x, i_min)
+
+    names = method_names(baseline_offsets)
+    table = np.full((n, len(names)), np.nan)
+    table[ok] = np.round(np.column_stack([found[name] for name in names]), 2)
+    out = {"status": status, **{name: table[:, j] for j, name in enumerate(names)}}
+    if has_hr:
+        # Ein Aufruf für alle Tests x Methoden (NaN bleibt NaN)
+        hr_table = hr_model.bpm(table)
+        out.update({f"hr_{name}": hr_table[:, j] for j, name in enumerate(names)})
+    return out
+
+
+# ==========================================
+# METHODEN (alle auf dem Feingitter, N x GRID_POINTS)
+# ==========================================
+def _first_crossing(v_fine, l_fine, target, start):
+    """
+    Erster Gitterpunkt ab Index `start`, an dem die Kurve `target` erreicht (sonst NaN).
+    Gleiche Konvention wie LT1 in run_protocol_engine: bsln+0.5 ist dort die LT1.
+    """
+    cols = np.arange(v_fine.shape[1])
+    mask = (l_fine >= target[:, None]) & (cols > start[:, None])
+    j = np.argmax(mask, axis=1)
+    # Liegt schon das Kurvenminimum über dem Zielwert, ist die Schwelle nicht definiert
+    return np.where(mask.any(axis=1) & (l_fine[np.arange(len(j)), start] < target), v_fine[np.arange(len(j)), j], np.nan)
+
+
+def _mod_dmax_start(speeds, lactates, offsets, ok):
+    """Speed der Messung vor dem ersten Anstieg > MOD_DMAX_RISE mmol (Bishop et al.), je Test."""
+    rise = np.diff(lactates) > MOD_DMAX_RISE
+    # Übergänge zwischen zwei Tests zählen nicht
+    rise[offsets[1:-1] - 1] = False
+    first = np.empty(len(ok))
+    for row, i in enumerate(ok):
+        idx = np.flatnonzero(rise[offsets[i]:offsets[i + 1] - 1])
+        first[row] = speeds[offsets[i] + (idx[0] if len(idx) else 0)]
+    return first
+
+
+def _mod_dmax(v_fine, l_fine, v_start):
+    """Dmax mit Sehne ab v_start statt ab der ersten Stufe."""
+    rows = np.arange(len(v_fine))
+    lo, step = v_fine[:, 0], v_fine[:, 1] - v_fine[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_idx = np.where(step > 0, np.clip(np.round((v_start - lo) / step), 0, v_fine.shape[1] - 1), 0).astype(np.intp)
+    v0, l0 = v_fine[rows, s_idx], l_fine[rows, s_idx]
+    span = v_fine[:, -1] - v0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m = np.where(span > 0, (l_fine[:, -1] - l0) / span, 0.0)
+    distances = (m[:, None] * (v_fine - v0[:, None]) + l0[:, None]) - l_fine
+    distances[np.arange(v_fine.shape[1]) < s_idx[:, None]] = -np.inf
+    return v_fine[rows, np.argmax(distances, axis=1)]
+
+
+def _loglog_breakpoint(v_fine, l_fine):
+    """
+    Log-Log-LT1 (Beaver): zwei Geraden in log(Laktat) über log(Speed), Knick mit
+    minimaler Residuenquadratsumme; Schwelle = Schnittpunkt der Geraden.
+    Alle Knick-Kandidaten gleichzeitig über kumulative Summen.
+    """
+    x, y = np.log(v_fine), np.log(l_fine)
+    g = x.shape[1]
+
+    def csum(a):
+        return np.concatenate([np.zeros((len(a), 1)), np.cumsum(a, axis=1)], axis=1)
+
+    sx, sy, sxx, sxy, syy = csum(x), csum(y), csum(x * x), csum(x * y), csum(y * y)
+    k = np.arange(LOGLOG_MIN_POINTS, g - LOGLOG_MIN_POINTS + 1)
+
+    def segment(a, b):
+        n = (b - a).astype(float)
+        mx, my = (sx[:, b] - sx[:, a]) / n, (sy[:, b] - sy[:, a]) / n
+        cxx = (sxx[:, b] - sxx[:, a]) - n * mx * mx
+        cxy = (sxy[:, b] - sxy[:, a]) - n * mx * my
+        cyy = (syy[:, b] - syy[:, a]) - n * my * my
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(cxx > 0, cxy / cxx, 0.0)
+        return slope, my - slope * mx, cyy - slope * cxy
+
+    zeros, ends = np.zeros_like(k), np.full_like(k, g)
+    m1, b1, r1 = segment(zeros, k)
+    m2, b2, r2 = segment(k, ends)
+    best = np.argmin(r1 + r2, axis=1)
+    rows = np.arange(len(x))
+    m1, b1, m2, b2 = m1[rows, best], b1[rows, best], m2[rows, best], b2[rows, best]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = np.where(m1 != m2, (b1 - b2) / (m2 - m1), x[rows, k[best]])
+    # Schnittpunkt außerhalb des Tests: auf den Knick-Kandidaten zurückfallen
+    x_cross = np.where((x_cross >= x[:, 0]) & (x_cross <= x[:, -1]), x_cross, x[rows, k[best]])
+    return np.exp(x_cross)
@@ -0,0 +1,220 @@
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from prediction_engine import RACE_DISTANCES, predict_times, zone_bounds
+
+# ==========================================
+# VIEW-REPORT: schlanker Render-Pfad für geteilte Athleten-Links
+# ==========================================
+# Nur das Nötigste: kein Sidebar-/Editor-Code, kein Webfont, Chart clientseitig (Vega-Lite),
+# scipy wird nur geladen, wenn der Link kein vorberechnetes Ergebnis mitbringt.
+log = logging.getLogger("vectrx.view")
+
+VIEW_CSS = """
+<style>
+[data-testid="stSidebar"], [data-testid="stSidebarNav"], [data-testid="collapsedControl"] {display: none;}
+.vx-head {text-align: center; margin-bottom: 18px; padding: 12px; border-bottom: 1px solid #1C1C1E;}
+.vx-head h2 {color: white; letter-spacing: 4px; margin-bottom: 0;}
+.vx-head p {color: #00F2FF; font-size: 13px; letter-spacing: 2px; margin-top: 6px; opacity: 0.8;}
+.vx-grid {display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 10px;}
+.vx-card {padding: 12px; border-radius: 10px; background: #161618; border: 1px solid #2C2C2E; border-left: 6px solid #00F2FF; margin-bottom: 8px;}
+.vx-lab {color: #8E8E93; font-size: 12px; font-weight: 600; display: block;}
+.vx-val {font-size: 26px; font-weight: 700; color: white;}
+.vx-unit {font-size: 12px; color: #8E8E93; margin-left: 4px;}
+.vx-hf {color: #FF3131; font-weight: 700; font-size: 14px;}
+.vx-row {display: flex; justify-content: space-between; align-items: baseline;}
+</style>
+"""
+
+ZONE_COLORS = ("#00F2FF", "#34C759", "#FFCC00", "#FF9500", "#FF3131")
+ZONE_CLASSES = ("blue-neon", "green-neon", "yellow-neon", "orange-neon", "red-neon")
+FORECAST_NAMES = ("5K SPRINT", "10K POWER", ("HALBMARATHON", "HALF MARATHON"), ("MARATHON", "FULL MARATHON"))
+
+
+def fmt_pace(s):
+    if not math.isfinite(s) or s <= 0.1: return "-:--"
+    sec = 3600 / s
+    return f"{int(sec//60)}:{int(sec%60):02d}"
+
+
+def fmt_time(seconds):
+    # NaN = Distanz mit diesem LT2 nicht erreichbar (predict_times)
+    if not math.isfinite(seconds): return "--:--"
+    h, m, s = int(seconds // 3600), int((seconds % 3600) // 60), int(seconds % 60)
+    return f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+
+
+def zone_rows(metrics, t):
+    """Trainingszonen (CSS-Klasse, Name, Speed-Bereich, Einheit, HF-Bereich) aus FatMax/LT1/LT2."""
+    b = zone_bounds(*(metrics[k] for k in ("fatmax", "lt1", "lt2", "hf_fatmax", "hf_lt1", "hf_lt2")))
+    names = (t("RECOVERY", "RECOVERY"), t("LONG RUN", "LONG RUN"), t("TEMPO", "TEMPO"), t("SCHWELLE", "THRESHOLD"), t("HIT", "HIT"))
+    rows = []
+    for k, (cls, name) in enumerate(zip(ZONE_CLASSES, names)):
+        lo, hi = b["speed_low"][0, k], b["speed_high"][0, k]
+        hl, hh = int(b["hr_low"][0, k]), int(b["hr_high"][0, k])
+        sp = f"< {hi:.1f}" if np.isnan(lo) else f"> {lo:.1f}" if np.isnan(hi) else f"{lo:.1f}-{hi:.1f}"
+        hf = f"< {hh}" if hl < 0 else f"> {hl}" if hh < 0 else f"{hl}-{hh}"
+        rows.append((cls, name, sp, "KM/H", hf))
+    return rows
+
+
+def forecast_rows(lt2, level, t):
+    """Wettkampfprognose (Name, Zeit in s, Distanz in m) für 5K bis Marathon."""
+    times = predict_times(lt2, level=level)
+    return [(name if isinstance(name, str) else t(*name), float(t_s), dist)
+            for name, t_s, (dist, _) in zip(FORECAST_NAMES, times, RACE_DISTANCES)]
+
+
+# ==========================================
+# STARTZEIT-MESSUNG (Time to first Paint)
+# ==========================================
+class ViewTimer:
+    """
+    Zeitmarken eines View-Renders ab Skriptstart (ms). "first_paint" ist der Moment,
+    in dem der Kopf mit Namen und Kennzahlen an den Browser geht. Jeder Lauf wird als
+    JSON geloggt, optional als JSON-Zeile in VECTRX_VIEW_LOG angehängt und fließt in
+    die Prozess-Statistik (timing_summary).
+    """
+
+    _samples = deque(maxlen=1000)
+    _lock = threading.Lock()
+
+    def __init__(self, t_start=None):
+        self.t_start = time.perf_counter() if t_start is None else t_start
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = round((time.perf_counter() - self.t_start) * 1000, 2)
+
+    def finish(self, **info):
+        self.mark("total")
+        record = {"ts": time.time(), **self.marks, **info,
+                  "scipy_loaded": "scipy.interpolate" in sys.modules,
+                  "matplotlib_loaded": "matplotlib" in sys.modules}
+        with self._lock:
+            self._samples.append(record)
+        log.info(json.dumps(record))
+        path = os.environ.get("VECTRX_VIEW_LOG")
+        if path:
+            try:
+                with open(path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+        return record
+
+    @classmethod
+    def timing_summary(cls):
+        """p50/p95 je Marke über die letzten Views dieses Prozesses."""
+        with cls._lock:
+            samples = list(cls._samples)
+        out = {"views": len(samples)}
+        for key in ("metrics", "first_paint", "total"):
+            vals = np.array([s[key] for s in samples if key in s])
+            if len(vals):
+                out[key] = {"p50": round(float(np.percentile(vals, 50)), 2),
+                            "p95": round(float(np.percentile(vals, 95)), 2)}
+        return out
+
+
+# ==========================================
+# RENDERER
+# ==========================================
+def _legacy_inputs(params):
+    """Alte Klartext-Links (fn, ln, w, v, l, hr, ...)."""
+    def get(key, default):
+        val = params.get(key, default)
+        return val[0] if isinstance(val, list) else val
+
+    def floats(key, default):
+        return [float(x) for x in str(get(key, default)).split(",")]
+
+    v = floats("v", "10,12,14,16,18")
+    return {"first_name": get("fn", ""), "last_name": get("ln", ""), "birthday": get("bd", ""),
+            "sport": get("sp", ""), "gender": get("g", ""),
+            "weight_kg": float(get("w", 75.0)), "height_cm": float(get("h", 180.0)),
+            "shoulder_width_cm": float(get("s", 42.0)),
+            "speeds": v, "lactates": floats("l", "1.2,1.8,3.5,6.5,7.8"), "heart_rates": floats("hr", "135,148,162,178,184"),
+            "v_max": v[-1], "is_all_out": str(get("ao", "true")).lower() == "true"}
+
+
+def render(st, params, share=None, t_start=None, compute=None):
+    """
+    Rendert den geteilten Report. share: dekodierter share_link.ShareLink oder None,
+    compute: Ersatz für calculate_metrics (z.B. der geteilte Compute-Pool der App).
+    """
+    timer = ViewTimer(t_start)
+    lang = str(params.get("lang", "GER")).upper()
+    def t(german, english): return english if lang == "ENG" else german
+
+    if share is not None:
+        inp = {name: getattr(share, name) for name in share.__slots__ if name != "digest"}
+    else:
+        inp = _legacy_inputs(params)
+    timer.mark("parse")
+
+    # Vorberechnetes Ergebnis aus dem Digest, sonst Engine (lädt scipy beim ersten Fit)
+    metrics = share.cached_metrics() if share is not None else None
+    from_cache = metrics is not None
+    if metrics is None:
+        if compute is None:
+            from core_engine import calculate_metrics as compute
+        metrics = compute(np.asarray(inp["speeds"], dtype=float), np.asarray(inp["lactates"], dtype=float),
+                          np.asarray(inp["heart_rates"], dtype=float), v_max=inp["v_max"],
+                          is_all_out=inp["is_all_out"], weight_kg=inp["weight_kg"],
+                          height_cm=inp["height_cm"], shoulder_width_cm=inp["shoulder_width_cm"])
+    timer.mark("metrics")
+    if metrics is None:
+        st.error(t("Warten auf Eingabedaten...", "Waiting for input data..."))
+        return timer.finish(digest_hit=from_cache)
+
+    full_n = f"{inp['first_name']} {inp['last_name']}".strip()
+    cards = [
+        ("BASE // FATMAX", metrics["fatmax"], "KM/H", metrics["hf_fatmax"]),
+        (t("SCHWELLE // iANS", "THRESHOLD // iANS"), metrics["lt2"], "KM/H", metrics["hf_lt2"]),
+        ("GLYCO POWER // VLaMAX", metrics["vlamax_val"], "mmol/l/s", None),
+        ("VO2MAX (est.)", metrics["vo2max"], "ML/MIN/KG", None),
+    ]
+    html = [VIEW_CSS,
+            f"<div class='vx-head'><h2>// {full_n.upper() if full_n else 'GUEST'} //</h2>"
+            f"<p>{inp['sport'].upper()} | {inp['gender']} | {inp['birthday']}</p></div><div class='vx-grid'>"]
+    for lab, val, unit, hf in cards:
+        v_disp = f"{int(val)}" if "ML" in unit else f"{val:.2f}"
+        pace = f" <span class='vx-unit'>{fmt_pace(val)} /KM</span>" if unit == "KM/H" else ""
+        hf_html = f"<div class='vx-hf'>{hf} BPM</div>" if hf is not None else ""
+        html.append(f"<div class='vx-card'><span class='vx-lab'>{lab}</span><span class='vx-val'>{v_disp}</span>"
+                    f"<span class='vx-unit'>{unit}</span>{pace}{hf_html}</div>")
+    html.append(f"</div><div class='vx-card' style='text-align:center; border-left-color:#BC13FE;'>"
+                f"<span class='vx-lab'>METABOLIC PROFILE</span><span class='vx-val' style='font-size:18px;'>{metrics['vlamax_label']}</span>"
+                f"<span class='vx-unit'>FLUSH RATE™: {int(metrics['stab'])}%</span></div>")
+    st.markdown("".join(html), unsafe_allow_html=True)
+    timer.mark("first_paint")
+
+    from chart_render import lactate_chart_spec
+    st.vega_lite_chart(spec=lactate_chart_spec(metrics, None, "LIVE"), theme=None, width="stretch")
+
+    zones = "".join(
+        f"<div class='vx-card' style='border-left-color:{color};'><div class='vx-row'><span class='vx-lab'>{name}</span>"
+        f"<span class='vx-hf'>{hf_r} BPM</span></div><span class='vx-val' style='font-size:20px;'>{sp}</span>"
+        f"<span class='vx-unit'>{unit}</span></div>"
+        for color, (_, name, sp, unit, hf_r) in zip(ZONE_COLORS, zone_rows(metrics, t)))
+    level = str(params.get("lvl", "Ambitioniert"))
+    forecast = "".join(
+        f"<div class='vx-card'><span class='vx-lab'>{name}</span><span class='vx-val' style='font-size:20px;'>{fmt_time(t_s)}</span>"
+        f"<span class='vx-unit'>{fmt_pace((dist/t_s)*3.6)} /KM</span></div>"
+        for name, t_s, dist in forecast_rows(metrics["lt2"], level, t))
+    st.markdown(f"<h3>// {t('ZONEN', 'ZONES')}</h3>{zones}<h3>// {t('PROGNOSE', 'PREDICTION')}</h3>"
+                f"<div class='vx-grid'>{forecast}</div>", unsafe_allow_html=True)
+
+    record = timer.finish(digest_hit=from_cache)
+    if str(params.get("debug", "")).lower() == "timing":
+        st.caption(json.dumps({**record, "process": ViewTimer.timing_summary()}))
+    return record